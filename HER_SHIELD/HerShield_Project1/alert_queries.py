@@ -0,0 +1,245 @@
+"""
+Alert listing for the admin console.
+
+Alerts are listed newest first and paged with a keyset cursor: the
+``(created_at, id)`` of the last row shown. Each page is one index range
+scan, however deep into the history it is, unlike ``OFFSET`` paging.
+Filters on status, priority, user and time range each have a
+``(column, created_at)`` index to scan. Exports walk the same cursor in
+chunks, so even a full export only holds one chunk in memory.
+
+Searches by place (radius, bounding box, nearest) read the geohash ranges
+covering the area, with the area's bounds checked in the same query. A
+bounding box lists the newest alerts, so each range query sorts and stops at
+the page size; the radius search keeps only the nearest while it reads.
+"""
+
+import datetime
+import heapq
+import os
+
+from geo import cover_bbox, prefix_ranges, radius_bbox, split_antimeridian, haversine_m
+
+# Rows per page of the console and the JSON API
+page_size = int(os.getenv('ADMIN_PAGE_SIZE', '50'))
+# Largest page a JSON client may ask for
+max_page_size = int(os.getenv('ADMIN_MAX_PAGE_SIZE', '500'))
+# Rows read per query while streaming an export
+export_chunk = int(os.getenv('ADMIN_EXPORT_CHUNK', '1000'))
+
+ALERT_COLUMNS = ('id', 'user_id', 'name', 'location', 'latitude', 'longitude', 'timestamp', 'status',
+                 'priority', 'created_at')
+
+def parse_time(value):
+    """
+    Read a time filter or alert timestamp as a Unix time.
+
+    Accepts Unix times, ISO 8601 dates and datetimes (with or without a
+    ``Z`` suffix) and ``str(datetime)`` output. Times without a zone are
+    taken as server local time, which is what ``datetime.now()`` stored.
+
+    Returns:
+        float: Unix time, or None if the value cannot be read
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def parse_filters(args):
+    """
+    Read the listing filters from query-string arguments.
+
+    Args:
+        args (dict): status, priority, user_id, since and until (Unix time or ISO date)
+
+    Returns:
+        dict: The filters that were given, with times as Unix times
+
+    Raises:
+        ValueError: If user_id, since or until cannot be read
+    """
+    filters = {}
+    for name in ('status', 'priority'):
+        if args.get(name):
+            filters[name] = args[name]
+    if args.get('user_id'):
+        filters['user_id'] = int(args['user_id'])
+    for name in ('since', 'until'):
+        if args.get(name):
+            value = parse_time(args[name])
+            if value is None:
+                raise ValueError(f'Cannot read {name} as a time')
+            # A bare date in "until" means the end of that day
+            if name == 'until' and len(args[name]) == 10:
+                value += 86400
+            filters[name] = value
+    return filters
+
+def encode_cursor(row):
+    """Return the cursor that continues a listing after ``row``."""
+    return f"{row['created_at']!r}:{row['id']}"
+
+def decode_cursor(cursor):
+    """
+    Split a cursor from encode_cursor().
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor()
+    """
+    created_at, alert_id = cursor.rsplit(':', 1)
+    return float(created_at), int(alert_id)
+
+def _query(filters, cursor, limit):
+    clauses, params = [], []
+    for name in ('status', 'priority', 'user_id'):
+        if name in filters:
+            clauses.append(f'{name} = ?')
+            params.append(filters[name])
+    if 'since' in filters:
+        clauses.append('created_at >= ?')
+        params.append(filters['since'])
+    if 'until' in filters:
+        clauses.append('created_at < ?')
+        params.append(filters['until'])
+    if cursor is not None:
+        clauses.append('(created_at, id) < (?, ?)')
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f'''
+        SELECT {', '.join(ALERT_COLUMNS)} FROM alerts
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    '''
+    return sql, params + [limit]
+
+def list_alerts(conn, filters, cursor=None, limit=None):
+    """
+    Read one page of alerts, newest first.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        filters (dict): Result of parse_filters()
+        cursor (str): Continue after this encode_cursor() value
+        limit (int): Rows per page (defaults to ``page_size``)
+
+    Returns:
+        tuple: (list of alert dicts, cursor for the next page or None)
+    """
+    limit = max(1, min(limit or page_size, max_page_size))
+    sql, params = _query(filters, decode_cursor(cursor) if cursor else None, limit + 1)
+    rows = [dict(row) for row in conn.execute(sql, params)]
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+def iter_alerts(conn, filters):
+    """Yield every alert matching ``filters``, newest first, reading ``export_chunk`` rows at a time."""
+    cursor = None
+    while True:
+        sql, params = _query(filters, cursor, export_chunk)
+        rows = conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield row
+        if len(rows) < export_chunk:
+            return
+        cursor = (rows[-1]['created_at'], rows[-1]['id'])
+
+def _in_boxes(conn, boxes, status, limit=None):
+    """
+    Read the alerts inside any of ``boxes`` through the geohash index.
+
+    The box bounds are checked in SQL as well, since the cells overhang the
+    box. With ``limit`` each range query returns only its newest ``limit``
+    alerts, so the union holds the newest ``limit`` overall.
+
+    Yields:
+        dict: Alert rows, newest first within each range
+    """
+    for box in boxes:
+        for low, high in prefix_ranges(cover_bbox(*box)):
+            clauses, params = ['geohash >= ?'], [low]
+            if high is not None:
+                clauses.append('geohash < ?')
+                params.append(high)
+            if status:
+                clauses.insert(0, 'status = ?')
+                params.insert(0, status)
+            clauses += ['latitude BETWEEN ? AND ?', 'longitude BETWEEN ? AND ?']
+            params += box
+            sql = f"SELECT {', '.join(ALERT_COLUMNS)} FROM alerts WHERE {' AND '.join(clauses)}"
+            if limit:
+                sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+                params.append(limit)
+            for row in conn.execute(sql, params):
+                yield dict(row)
+
+def alerts_in_bbox(conn, lat_min, lat_max, lon_min, lon_max, status='active', limit=None):
+    """
+    Find alerts inside a bounding box, newest first.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        lat_min, lat_max (float): Latitude bounds in degrees
+        lon_min, lon_max (float): Longitude bounds; lon_min > lon_max crosses the antimeridian
+        status (str): Only alerts with this status (None for any)
+        limit (int): Most alerts to return (defaults to ``max_page_size``)
+
+    Returns:
+        list: Alert dicts
+    """
+    limit = limit or max_page_size
+    # Ranges and antimeridian halves never overlap, so the per-range top lists are disjoint
+    alerts = _in_boxes(conn, split_antimeridian(lat_min, lat_max, lon_min, lon_max), status, limit)
+    return heapq.nlargest(limit, alerts, key=lambda alert: (alert['created_at'] or 0, alert['id']))
+
+def alerts_within_radius(conn, latitude, longitude, radius_m, status='active', limit=None):
+    """
+    Find alerts within ``radius_m`` metres of a point, nearest first.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        latitude, longitude (float): Centre in degrees
+        radius_m (float): Radius in metres
+        status (str): Only alerts with this status (None for any)
+        limit (int): Most alerts to return (defaults to ``max_page_size``)
+
+    Returns:
+        list: Alert dicts with an added ``distance_m``
+    """
+    def inside():
+        for alert in _in_boxes(conn, split_antimeridian(*radius_bbox(latitude, longitude, radius_m)), status):
+            alert['distance_m'] = haversine_m(latitude, longitude, alert['latitude'], alert['longitude'])
+            if alert['distance_m'] <= radius_m:
+                yield alert
+
+    # Only the nearest ``limit`` are held while the candidates stream past
+    return heapq.nsmallest(limit or max_page_size, inside(), key=lambda alert: alert['distance_m'])
+
+def nearest_alerts(conn, latitude, longitude, k=5, status='active', start_radius_m=1000):
+    """
+    Find the ``k`` alerts nearest to a point.
+
+    Searches a growing radius until it holds ``k`` alerts; anything outside
+    the radius is farther than everything inside, so those are the nearest.
+
+    Returns:
+        list: Up to ``k`` alert dicts with ``distance_m``, nearest first
+    """
+    radius = start_radius_m
+    while True:
+        alerts = alerts_within_radius(conn, latitude, longitude, radius, status, limit=max(k, 1))
+        # Half the Earth's circumference reaches every point
+        if len(alerts) >= k or radius >= 20_040_000:
+            return alerts[:k]
+        radius *= 4
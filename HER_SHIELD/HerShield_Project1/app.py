@@ -1,10 +1,44 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
-from twilio_alert import send_sms, send_emergency_alert, send_alert_confirmation
+from flask import (Flask, render_template, request, redirect, url_for, session, jsonify, flash,
+                   Response, stream_with_context)
+from twilio_alert import get_sms_metrics, format_alert_confirmation, format_location_update
+from db import USERS_DB, close_connections, connection, get_db_connection, get_alert_connection
+from migrations import migrate_all
+from conversation_store import record_turn, recent_turns
+from chat_cache import create_cache, make_key
+from markdown_renderer import MarkdownRenderer, render_markdown
+from chatbot import (CHAT_MODEL_NAME, CHAT_GENERATION_CONFIG, build_prompt, classify, is_emergency,
+                     suggestions_for, fallback_for, count, chat_metrics, generate_with_deadline,
+                     stream_with_deadline)
+import sms_outbox
+from sms_outbox import (start_outbox_worker, enqueue_sms, queue_emergency_alerts,
+                        get_outbox_stats, PRIORITY_SOS, PRIORITY_LOCATION, PRIORITY_CONFIRMATION)
+import live_tracking
+from live_tracking import (new_share_token, parse_fix, record_location, record_locations, locations_since,
+                           wait_for_update, track_between, find_alert, link_expired, active_alert)
+from location_coalescer import (start_alert, check_fix, claim_recipients, start_location_worker,
+                                location_sms_metrics)
+from sos_requests import claim_sos, complete_sos, fail_sos, wait_for_response, sos_metrics
+from user_cache import get_user, get_contacts, invalidate as invalidate_user, user_cache_metrics
+from content import page_response, content_metrics
+from assets import init_assets
+from passwords import hash_new_password, verify_password, upgrade_hash, password_metrics
+from rate_limits import LOGIN_EMAIL, LOGIN_IP, SIGNUP_IP, client_ip, create_limiter
+from offload import offload_metrics
+import alert_queries
+from alert_queries import (ALERT_COLUMNS, parse_filters, list_alerts, iter_alerts, alerts_in_bbox,
+                           alerts_within_radius, nearest_alerts)
+import geo
+from hotspots import start_hotspot_worker, read_tiles
 import sqlite3
 import datetime
+import csv
 import hashlib
+import hmac
+import io
+import json
+import math
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import time
 from functools import wraps
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -14,82 +48,57 @@ load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
+app.teardown_appcontext(close_connections)
+# Hashed, pre-compressed static files from build_assets.py, when they have been built
+init_assets(app)
 
 # Gemini API setup
 gemini_api_key = os.getenv('GEMINI_API_KEY', '188fe0a4de29ce2ecb2ee7cdfe3a2d0b')
-genai.configure(api_key=gemini_api_key)
-
-# Database setup functions
-def get_db_connection():
-    # Create database directory if it doesn't exist
-    os.makedirs('database', exist_ok=True)
-    conn = sqlite3.connect('database/users.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def get_alert_connection():
-    # Create database directory if it doesn't exist
-    os.makedirs('database', exist_ok=True)
-    conn = sqlite3.connect('database/alerts.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+# 'grpc' (the library default) or 'rest'
+gemini_transport = os.getenv('GEMINI_TRANSPORT') or None
+# Alternative API host, e.g. a local stand-in for load tests
+gemini_api_endpoint = os.getenv('GEMINI_API_ENDPOINT')
+genai.configure(api_key=gemini_api_key, transport=gemini_transport,
+                client_options={'api_endpoint': gemini_api_endpoint} if gemini_api_endpoint else None)
+
+# Answers to questions asked without conversation history
+chat_response_cache = create_cache()
+
+# Login and signup attempts per client IP and per email
+rate_limiter = create_limiter()
 
 def init_db():
-    # Create database directory if it doesn't exist
-    os.makedirs('database', exist_ok=True)
-    
-    # Initialize users database
-    conn = sqlite3.connect('database/users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT NOT NULL,
-                  email TEXT UNIQUE NOT NULL,
-                  phone TEXT NOT NULL,
-                  password TEXT NOT NULL)''')
-    
-    # Create emergency contacts table
-    c.execute('''CREATE TABLE IF NOT EXISTS emergency_contacts
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  user_id INTEGER NOT NULL,
-                  name TEXT NOT NULL,
-                  phone TEXT NOT NULL,
-                  relationship TEXT,
-                  priority INTEGER DEFAULT 1,
-                  FOREIGN KEY (user_id) REFERENCES users (id))''')
-    
-    # Create user experiences table
-    c.execute('''CREATE TABLE IF NOT EXISTS user_experiences
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  user_id INTEGER NOT NULL,
-                  title TEXT NOT NULL,
-                  content TEXT NOT NULL,
-                  category TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  likes INTEGER DEFAULT 0,
-                  FOREIGN KEY (user_id) REFERENCES users (id))''')
-    
-    conn.commit()
-    conn.close()
-    
-    # Initialize alerts database
-    conn = sqlite3.connect('database/alerts.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS alerts
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  user_id INTEGER,
-                  name TEXT NOT NULL,
-                  location TEXT NOT NULL,
-                  timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  status TEXT DEFAULT 'active',
-                  priority TEXT DEFAULT 'normal')''')
-    
-    conn.commit()
-    conn.close()
+    # Create or upgrade every database to the latest schema
+    migrate_all()
 
 # Initialize database
 init_db()
 
+# Deliver anything left in the SMS outbox by a previous process
+start_outbox_worker()
+
+# Keep the hotspot map's tile counts up to date with new alerts
+start_hotspot_worker()
+
+def send_held_location(conn, update):
+    """Text an alert's contacts a position the location SMS throttle held back (background job)."""
+    with connection(USERS_DB) as users_conn:
+        contacts = get_contacts(users_conn, update['user_id'])
+    location = {'latitude': update['latitude'], 'longitude': update['longitude']}
+    message = format_location_update(update['name'], location, update['distance_m'], update['tracking_url'])
+    numbers = list(dict.fromkeys(contact['phone'] for contact in contacts))
+    for number in claim_recipients(conn, numbers):
+        enqueue_sms(number, message, PRIORITY_LOCATION,
+                    f"location:{update['alert_id']}:held:{update['recorded_at']}:{number}")
+
+# Send the last known position of a user who stopped reporting during the minimum gap
+start_location_worker(send_held_location)
+
+# Emails of the users allowed into /admin; when unset nobody is, so a missing setting never opens the console
+admin_emails = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+# Bearer token a metrics scraper sends to read /metrics without an admin session; unset allows admins only
+metrics_token = os.getenv('METRICS_TOKEN', '')
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -102,6 +111,33 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Admin console decorator
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('login'))
+        if session.get('email', '').lower() not in admin_emails:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Metrics decorator: an admin session or the scraper's token
+def metrics_access_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        supplied = request.headers.get('Authorization', '').encode()
+        if metrics_token and hmac.compare_digest(supplied, f'Bearer {metrics_token}'.encode()):
+            return f(*args, **kwargs)
+        return admin_required(f)(*args, **kwargs)
+    return decorated_function
+
+def too_many_attempts(template, retry_after):
+    # 429 with the form shown again, so the user can see when to retry
+    seconds = math.ceil(retry_after)
+    flash(f'Too many attempts. Please try again in {seconds} seconds.', 'danger')
+    return render_template(template), 429, {'Retry-After': str(seconds)}
+
 # Routes
 @app.route('/')
 def landing():
@@ -115,18 +151,28 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
+        # Refuse bursts before touching the database or hashing anything
+        # An account's budget is only spent by wrong passwords, so its owner's logins never use it up
+        email_key = email.strip().lower()
+        retry_after = rate_limiter.check((LOGIN_IP, client_ip(request))) or rate_limiter.peek((LOGIN_EMAIL, email_key))
+        if retry_after:
+            return too_many_attempts('login.html', retry_after)
+        
         conn = get_db_connection()
         c = conn.cursor()
         c.execute('SELECT * FROM users WHERE email = ?', (email,))
         user = c.fetchone()
-        conn.close()
         
-        if user and check_password_hash(user[4], password):
+        if user and verify_password(user[4], password):
+            # Passwords hashed under an older cost policy are upgraded while we have them in hand
+            upgrade_hash(conn, user[0], user[4], password)
             session['user_id'] = user[0]
             session['name'] = user[1]
+            session['email'] = user[2]
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
         else:
+            rate_limiter.check((LOGIN_EMAIL, email_key))
             flash('Invalid email or password', 'danger')
     
     return render_template('login.html')
@@ -140,21 +186,23 @@ def signup():
         password = request.form['password']
         confirm_password = request.form['confirm_password']
         
+        retry_after = rate_limiter.check((SIGNUP_IP, client_ip(request)))
+        if retry_after:
+            return too_many_attempts('signup.html', retry_after)
+        
         # Validate password match
         if password != confirm_password:
             flash('Passwords do not match', 'danger')
             return redirect(url_for('signup'))
         
         # Hash password
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_new_password(password)
         
         try:
             conn = get_db_connection()
             c = conn.cursor()
             c.execute('INSERT INTO users (name, email, phone, password) VALUES (?, ?, ?, ?)',
                      (name, email, phone, hashed_password))
-            conn.commit()
-            conn.close()
             
             flash('Account created successfully! Please login.', 'success')
             return redirect(url_for('login'))
@@ -185,13 +233,16 @@ def emergency():
     user = session
     location = request.form['location']
 
-    send_sms(user['name'], location)
+    enqueue_sms(user['name'], location, PRIORITY_SOS)
 
+    point = geo.parse_location(location)
+    latitude, longitude = point if point else (None, None)
     conn = get_alert_connection()
-    conn.execute('INSERT INTO alerts (name, location, timestamp) VALUES (?, ?, ?)',
-                 (user['name'], location, datetime.datetime.now()))
-    conn.commit()
-    conn.close()
+    conn.execute('''
+        INSERT INTO alerts (name, location, timestamp, created_at, latitude, longitude, geohash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (user['name'], location, datetime.datetime.now(), time.time(), latitude, longitude,
+          geo.encode(latitude, longitude) if point else None))
 
     return jsonify({'status': 'success'})
 
@@ -206,11 +257,158 @@ def profile():
     return render_template('profile.html', user=session)
 
 @app.route('/admin')
+@admin_required
 def admin():
-    conn = get_alert_connection()
-    alerts = conn.execute('SELECT * FROM alerts ORDER BY timestamp DESC').fetchall()
-    conn.close()
-    return render_template('admin.html', alerts=alerts)
+    try:
+        filters = parse_filters(request.args)
+        alerts, next_cursor = list_alerts(get_alert_connection(), filters, request.args.get('cursor'))
+    except ValueError as e:
+        flash(f'Invalid filter: {e}', 'danger')
+        filters, alerts, next_cursor = {}, [], None
+    query = {name: value for name, value in request.args.items() if name != 'cursor' and value}
+    return render_template('admin.html', alerts=alerts, next_cursor=next_cursor, query=query,
+                           filters=request.args)
+
+@app.route('/admin/alerts')
+@admin_required
+def admin_alerts():
+    """
+    JSON page of alerts, newest first.
+
+    Takes the same filters as the console (status, priority, user_id, since,
+    until) plus ``limit``. Pass ``next_cursor`` back as ``cursor`` to get
+    the next page.
+    """
+    try:
+        filters = parse_filters(request.args)
+        alerts, next_cursor = list_alerts(get_alert_connection(), filters, request.args.get('cursor'),
+                                          request.args.get('limit', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'alerts': alerts, 'next_cursor': next_cursor})
+
+def _float_args(names):
+    """Read required numeric query arguments; raises ValueError naming the first bad one."""
+    values = []
+    for name in names:
+        value = request.args.get(name, type=float)
+        if value is None:
+            raise ValueError(f'{name} must be a number')
+        values.append(value)
+    return values
+
+def _status_arg():
+    """Spatial searches default to active alerts; ``status=any`` searches every alert."""
+    status = request.args.get('status', 'active')
+    return None if status == 'any' else status
+
+@app.route('/admin/alerts/nearby')
+@admin_required
+def admin_alerts_nearby():
+    """Alerts within ``radius`` metres (default 2000) of ``lat``/``lon``, nearest first."""
+    try:
+        latitude, longitude = _float_args(('lat', 'lon'))
+        radius = request.args.get('radius', 2000, type=float)
+        if not 0 < radius <= 20_040_000:
+            raise ValueError('radius must be between 0 and 20040000 metres')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    alerts = alerts_within_radius(get_alert_connection(), latitude, longitude, radius, _status_arg(),
+                                  request.args.get('limit', type=int))
+    return jsonify({'alerts': alerts})
+
+@app.route('/admin/alerts/nearest')
+@admin_required
+def admin_alerts_nearest():
+    """The ``k`` alerts (default 5) nearest to ``lat``/``lon``."""
+    try:
+        latitude, longitude = _float_args(('lat', 'lon'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    k = max(1, min(request.args.get('k', 5, type=int), alert_queries.max_page_size))
+    return jsonify({'alerts': nearest_alerts(get_alert_connection(), latitude, longitude, k, _status_arg())})
+
+@app.route('/admin/alerts/within')
+@admin_required
+def admin_alerts_within():
+    """Alerts inside the box ``south``, ``north``, ``west``, ``east``, newest first."""
+    try:
+        south, north, west, east = _float_args(('south', 'north', 'west', 'east'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    alerts = alerts_in_bbox(get_alert_connection(), south, north, west, east, _status_arg(),
+                            request.args.get('limit', type=int))
+    return jsonify({'alerts': alerts})
+
+@app.route('/admin/hotspots')
+@admin_required
+def admin_hotspots():
+    """
+    Alert counts per map tile inside the viewport ``south``, ``north``, ``west``, ``east``.
+
+    ``granularity`` (hour or day) with ``since``/``until`` picks the time
+    buckets counted; ``precision`` overrides the tile size chosen for the
+    viewport; ``series=1`` adds each tile's count per bucket.
+    """
+    try:
+        south, north, west, east = _float_args(('south', 'north', 'west', 'east'))
+        times = parse_filters({'since': request.args.get('since'), 'until': request.args.get('until')})
+        tiles = read_tiles(get_alert_connection(), south, north, west, east,
+                           request.args.get('granularity', 'day'), times.get('since'), times.get('until'),
+                           request.args.get('precision', type=int), request.args.get('series') == '1')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(tiles)
+
+@app.route('/admin/alerts/export.<fmt>')
+@admin_required
+def admin_export(fmt):
+    """Stream every alert matching the filters as CSV or NDJSON."""
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Export format must be csv or ndjson'}), 404
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(ALERT_COLUMNS)
+        for row in iter_alerts(get_alert_connection(), filters):
+            if fmt == 'csv':
+                writer.writerow(tuple(row))
+            else:
+                buffer.write(json.dumps(dict(row)) + '\n')
+            # Hand rows to the server a few kilobytes at a time
+            if buffer.tell() > 16384:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=alerts.{fmt}'
+    })
+
+@app.route('/metrics')
+@metrics_access_required
+def metrics():
+    return jsonify({
+        'sms': get_sms_metrics(),
+        'outbox': get_outbox_stats(),
+        'chat_cache': chat_response_cache.metrics(),
+        'chatbot': chat_metrics(),
+        'location_sms': location_sms_metrics(),
+        'sos': sos_metrics(),
+        'user_cache': user_cache_metrics(),
+        'content': content_metrics(),
+        'passwords': password_metrics(),
+        'rate_limits': rate_limiter.metrics(),
+        'worker': offload_metrics()
+    })
 
 from emergency import send_sos_alert
 
@@ -228,17 +426,8 @@ def sos():
         if not location or not timestamp:
             return jsonify({'error': 'Missing location or timestamp'}), 400
 
-        # Get user's emergency contacts
-        conn = get_db_connection()
-        contacts = conn.execute('''
-            SELECT * FROM emergency_contacts 
-            WHERE user_id = ? 
-            ORDER BY priority
-        ''', (session['user_id'],)).fetchall()
-        
-        # Get user details
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-        conn.close()
+        # Get user details and emergency contacts, usually straight from this worker's cache
+        user, contacts = get_user(get_db_connection(), session['user_id'])
 
         if not contacts:
             return jsonify({
@@ -247,57 +436,92 @@ def sos():
                 'contacts_notified': 0
             }), 200
 
-        # Send urgent SMS to emergency contacts using improved Twilio functions
-        notifications_sent = 0
-        for contact in contacts:
-            try:
-                # Send formatted emergency alert with follow-up instructions
-                if send_emergency_alert(
-                    contact['phone'], 
-                    user['name'], 
-                    location, 
-                    timestamp, 
-                    contact['relationship']
-                ):
-                    notifications_sent += 1
-                    print(f"✅ Emergency alert sent to {contact['name']} ({contact['phone']})")
-                else:
-                    print(f"❌ Failed to send emergency alert to {contact['name']} ({contact['phone']})")
-                    
-            except Exception as e:
-                print(f"❌ Error sending SMS to {contact['name']}: {str(e)}")
-                continue
-
-        # Store alert in database with high priority
+        def create_alert(conn):
+            # Store alert in database with high priority
+            share_token = new_share_token()
+            alert_id = conn.execute('''
+                INSERT INTO alerts (user_id, name, location, timestamp, status, priority, share_token, created_at,
+                                    latitude, longitude, geohash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                session['user_id'],
+                user['name'],
+                f"{location['latitude']},{location['longitude']}",
+                timestamp,
+                'active',
+                'high',
+                share_token,
+                time.time(),
+                float(location['latitude']),
+                float(location['longitude']),
+                geo.encode(float(location['latitude']), float(location['longitude']))
+            )).lastrowid
+            return alert_id, share_token
+
+        # Pressing SOS again, or a retried request, attaches to the alert already raised
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         conn = get_alert_connection()
-        conn.execute('''
-            INSERT INTO alerts (user_id, name, location, timestamp, status, priority)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            session['user_id'],
-            user['name'],
-            f"{location['latitude']},{location['longitude']}",
-            timestamp,
-            'active',
-            'high'
-        ))
-        conn.commit()
-        conn.close()
-
-        # Send confirmation SMS to the user who triggered the alert
+        claim = claim_sos(conn, session['user_id'], idempotency_key, timestamp, create_alert)
+        if claim['kind'] == 'repeat':
+            # The repeat press still carries where the user is now
+            alert = active_alert(conn, session['user_id'])
+            try:
+                fix = parse_fix(location)
+            except (KeyError, TypeError, ValueError):
+                fix = None
+            if alert is not None and fix is not None:
+                track_position(conn, alert, session['user_id'], [fix])
+            response = claim['response'] or wait_for_response(conn, claim['request_id'],
+                                                              sms_outbox.confirm_timeout)
+            if response is None:
+                # The first request is still waiting on its contacts
+                response = {
+                    'status': 'success',
+                    'message': 'Emergency alert already in progress',
+                    'contacts_notified': 0,
+                    'contacts_pending': len(contacts),
+                    'total_contacts': len(contacts),
+                    'results': [],
+                    'tracking_url': url_for('track', token=claim['share_token'], _external=True),
+                    'user_confirmed': True
+                }
+            return jsonify(dict(response, duplicate=True))
+
+        alert_id, timestamp = claim['alert_id'], claim['timestamp']
         try:
-            send_alert_confirmation(user['phone'], user['name'], notifications_sent)
-            print(f"✅ Confirmation SMS sent to {user['name']} ({user['phone']})")
-        except Exception as e:
-            print(f"❌ Error sending confirmation SMS to user: {str(e)}")
-
-        return jsonify({
+            tracking_url = url_for('track', token=claim['share_token'], _external=True)
+            if claim['kind'] == 'new':
+                # The alert's track starts at the SOS location
+                record_location(conn, alert_id, float(location['latitude']), float(location['longitude']),
+                                location.get('accuracy'))
+                start_alert(conn, alert_id, float(location['latitude']), float(location['longitude']),
+                            tracking_url=tracking_url)
+
+            # Queue alerts durably; only the first-priority contacts are waited on before responding
+            dispatch = queue_emergency_alerts(contacts, session['user_id'], user['name'], location, timestamp,
+                                              tracking_url=tracking_url)
+            notifications_sent = dispatch['sent']
+
+            # Queue confirmation SMS to the user who triggered the alert
+            enqueue_sms(user['phone'],
+                        format_alert_confirmation(user['name'], notifications_sent + dispatch['pending']),
+                        PRIORITY_CONFIRMATION, f"sos:{session['user_id']}:{timestamp}:confirmation")
+        except Exception:
+            fail_sos(conn, claim['request_id'])
+            raise
+
+        response = {
             'status': 'success',
             'message': 'Emergency alert sent successfully',
             'contacts_notified': notifications_sent,
+            'contacts_pending': dispatch['pending'],
             'total_contacts': len(contacts),
+            'results': dispatch['results'],
+            'tracking_url': tracking_url,
             'user_confirmed': True
-        })
+        }
+        complete_sos(conn, claim['request_id'], session['user_id'], idempotency_key, response)
+        return jsonify(dict(response, duplicate=False))
 
     except Exception as e:
         print(f"Error in SOS route: {str(e)}")
@@ -310,59 +534,30 @@ def update_location():
 
     try:
         data = request.get_json()
-        location = data.get('location')
-        timestamp = data.get('timestamp')
-
-        if not location or not timestamp:
-            return jsonify({'error': 'Missing location or timestamp'}), 400
-
-        # Get user's emergency contacts
-        conn = get_db_connection()
-        contacts = conn.execute('''
-            SELECT * FROM emergency_contacts 
-            WHERE user_id = ? 
-            ORDER BY priority
-        ''', (session['user_id'],)).fetchall()
-        
-        # Get user details
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-        conn.close()
+        # The dashboard sends every fix it has buffered since the last request
+        locations = data.get('locations') or ([data['location']] if data.get('location') else [])
 
-        if not contacts:
-            return jsonify({'error': 'No emergency contacts found'}), 400
-
-        # Send location update to emergency contacts
-        notifications_sent = 0
-        for contact in contacts:
-            try:
-                message = f"📍 Location Update for {user['name']}:\n"
-                message += f"Current Location: https://maps.google.com/?q={location['latitude']},{location['longitude']}\n"
-                message += f"Time: {timestamp}\n"
-                message += "This is an automated location update from HerShield."
-                
-                if send_sms(contact['phone'], message):
-                    notifications_sent += 1
-            except Exception as e:
-                print(f"Error sending location update to {contact['name']}: {str(e)}")
-                continue
+        if not locations:
+            return jsonify({'error': 'Missing location'}), 400
+        if len(locations) > live_tracking.max_batch:
+            return jsonify({'error': f'At most {live_tracking.max_batch} locations per request'}), 400
+        try:
+            fixes = sorted((parse_fix(location) for location in locations), key=lambda fix: fix[3])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Invalid location'}), 400
 
-        # Update location in database
         conn = get_alert_connection()
-        conn.execute('''
-            UPDATE alerts 
-            SET location = ?, timestamp = ?
-            WHERE user_id = ? AND status = 'active'
-        ''', (
-            f"{location['latitude']},{location['longitude']}",
-            timestamp,
-            session['user_id']
-        ))
-        conn.commit()
-        conn.close()
+        alert = active_alert(conn, session['user_id'])
+        if alert is None:
+            return jsonify({'error': 'No active alert'}), 404
+
+        location_id, notifications_sent = track_position(conn, alert, session['user_id'], fixes)
 
         return jsonify({
             'status': 'success',
             'message': 'Location updated successfully',
+            'location_id': location_id,
+            'locations_recorded': len(fixes),
             'notifications_sent': notifications_sent
         })
 
@@ -370,6 +565,128 @@ def update_location():
         print(f"Error in update_location route: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def track_position(conn, alert, user_id, fixes):
+    """
+    Add fixes to an active alert's track and text its contacts if the user has moved or gone quiet.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert (sqlite3.Row): id, name and share_token of the alert
+        user_id (int): The user the alert belongs to
+        fixes (list): parse_fix() tuples, oldest first
+
+    Returns:
+        tuple: (id of the newest location row, number of SMS queued)
+    """
+    location_id = record_locations(conn, alert['id'], fixes)
+    latitude, longitude = fixes[-1][0], fixes[-1][1]
+    location = {'latitude': latitude, 'longitude': longitude}
+    # Nearby-alert searches find the user where they are now, not where the SOS started
+    conn.execute('UPDATE alerts SET latitude = ?, longitude = ?, geohash = ? WHERE id = ?',
+                 (latitude, longitude, geo.encode(latitude, longitude), alert['id']))
+
+    # Contacts follow the live tracking page; they are only texted when the user has moved or gone quiet
+    decision, distance = check_fix(conn, alert['id'], latitude, longitude, recorded_at=fixes[-1][3])
+    notifications_sent = 0
+    if decision in ('moved', 'heartbeat'):
+        contacts = get_contacts(get_db_connection(), user_id)
+        message = format_location_update(alert['name'], location, distance,
+                                         url_for('track', token=alert['share_token'], _external=True))
+        numbers = list(dict.fromkeys(contact['phone'] for contact in contacts))
+        for number in claim_recipients(conn, numbers):
+            enqueue_sms(number, message, PRIORITY_LOCATION, f"location:{alert['id']}:{location_id}:{number}")
+            notifications_sent += 1
+    return location_id, notifications_sent
+
+@app.route('/sos/resolve', methods=['POST'])
+def resolve_sos():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    conn = get_alert_connection()
+    resolved = conn.execute('''
+        UPDATE alerts SET status = 'resolved', resolved_at = ?
+        WHERE user_id = ? AND status = 'active'
+    ''', (time.time(), session['user_id'])).rowcount
+    return jsonify({'status': 'success', 'alerts_resolved': resolved})
+
+@app.route('/track/<token>')
+def track(token):
+    alert = find_alert(get_alert_connection(), token)
+    if alert is None:
+        return "This tracking link is not valid.", 404
+    if link_expired(alert):
+        return "This emergency has ended and its tracking link has expired.", 410
+    return render_template('track.html', token=token, name=alert['name'], status=alert['status'])
+
+@app.route('/track/<token>/points')
+def track_points(token):
+    """Return the part of an alert's trajectory between ``start`` and ``end`` (Unix times) as JSON."""
+    conn = get_alert_connection()
+    alert = find_alert(conn, token)
+    if alert is None:
+        return jsonify({'error': 'Tracking link not found'}), 404
+    if link_expired(alert):
+        return jsonify({'error': 'Tracking link expired', 'status': alert['status']}), 410
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    limit = max(1, min(request.args.get('limit', live_tracking.backlog_limit, type=int), live_tracking.backlog_limit))
+    return jsonify({
+        'status': alert['status'],
+        'points': track_between(conn, alert['id'], start, end, limit)
+    })
+
+@app.route('/track/<token>/events')
+def track_events(token):
+    """
+    Stream an alert's position fixes as Server-Sent Events.
+
+    The first ``locations`` event replays the track so far (or everything
+    after the browser's ``Last-Event-ID`` when it reconnects), later ones
+    carry each new fix. An ``ended`` event follows once the alert is no
+    longer active.
+    """
+    conn = get_alert_connection()
+    alert = find_alert(conn, token)
+    if alert is None:
+        return jsonify({'error': 'Tracking link not found'}), 404
+    if link_expired(alert):
+        return jsonify({'error': 'Tracking link expired', 'status': alert['status']}), 410
+    alert_id = alert['id']
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        after_id = 0
+
+    def generate():
+        last_id = after_id
+        started = last_sent = time.monotonic()
+        while True:
+            fixes = locations_since(conn, alert_id, last_id)
+            if fixes:
+                last_id = fixes[-1]['id']
+                last_sent = time.monotonic()
+                yield sse_event('locations', fixes, event_id=last_id)
+                continue
+
+            status = conn.execute('SELECT status FROM alerts WHERE id = ?', (alert_id,)).fetchone()['status']
+            if status != 'active':
+                yield sse_event('ended', {'status': status})
+                return
+            now = time.monotonic()
+            if now - started > live_tracking.stream_lifetime:
+                # The browser reconnects with Last-Event-ID and carries on
+                return
+            if now - last_sent > live_tracking.keepalive_interval:
+                last_sent = now
+                yield ': keep-alive\n\n'
+            wait_for_update(alert_id, last_id, live_tracking.poll_interval)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/emergency-contacts', methods=['GET', 'POST'])
 def emergency_contacts():
     if 'user_id' not in session:
@@ -398,7 +715,6 @@ def emergency_contacts():
         existing = conn.execute('SELECT * FROM emergency_contacts WHERE user_id = ? AND phone = ?', 
                               (session['user_id'], phone)).fetchone()
         if existing:
-            conn.close()
             flash('A contact with this phone number already exists!', 'danger')
             return redirect(url_for('emergency_contacts'))
         
@@ -406,28 +722,22 @@ def emergency_contacts():
         contact_count = conn.execute('SELECT COUNT(*) FROM emergency_contacts WHERE user_id = ?', 
                                    (session['user_id'],)).fetchone()[0]
         if contact_count >= 10:
-            conn.close()
             flash('Maximum 10 emergency contacts allowed. Please delete some contacts first.', 'warning')
             return redirect(url_for('emergency_contacts'))
         
         try:
             conn.execute('INSERT INTO emergency_contacts (user_id, name, phone, relationship, priority) VALUES (?, ?, ?, ?, ?)',
                         (session['user_id'], name, phone, relationship, priority))
-            conn.commit()
+            invalidate_user(conn, session['user_id'])
             flash('Emergency contact added successfully!', 'success')
         except Exception as e:
             flash('Error adding contact. Please try again.', 'danger')
             print(f"Error adding emergency contact: {e}")
-        finally:
-            conn.close()
         
         return redirect(url_for('emergency_contacts'))
     
     # Get user's emergency contacts
-    conn = get_db_connection()
-    contacts = conn.execute('SELECT * FROM emergency_contacts WHERE user_id = ? ORDER BY priority', 
-                          (session['user_id'],)).fetchall()
-    conn.close()
+    contacts = get_contacts(get_db_connection(), session['user_id'])
     
     # Predefined emergency numbers
     predefined_contacts = [
@@ -449,8 +759,7 @@ def delete_contact(contact_id):
         conn = get_db_connection()
         conn.execute('DELETE FROM emergency_contacts WHERE id = ? AND user_id = ?', 
                     (contact_id, session['user_id']))
-        conn.commit()
-        conn.close()
+        invalidate_user(conn, session['user_id'])
         
         flash('Contact deleted successfully!', 'success')
     except Exception as e:
@@ -487,7 +796,7 @@ def edit_contact(contact_id):
         try:
             conn.execute('UPDATE emergency_contacts SET name = ?, phone = ?, relationship = ?, priority = ? WHERE id = ? AND user_id = ?',
                         (name, phone, relationship, priority, contact_id, session['user_id']))
-            conn.commit()
+            invalidate_user(conn, session['user_id'])
             flash('Contact updated successfully!', 'success')
             return redirect(url_for('emergency_contacts'))
         except Exception as e:
@@ -497,7 +806,6 @@ def edit_contact(contact_id):
     # Get contact details for editing
     contact = conn.execute('SELECT * FROM emergency_contacts WHERE id = ? AND user_id = ?', 
                          (contact_id, session['user_id'])).fetchone()
-    conn.close()
     
     if not contact:
         flash('Contact not found!', 'danger')
@@ -510,300 +818,25 @@ def health_tips():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Health tips data
-    health_tips = [
-        {
-            'category': 'Physical Health',
-            'tips': [
-                'Stay hydrated by drinking at least 8 glasses of water daily',
-                'Exercise for at least 30 minutes every day',
-                'Get 7-8 hours of sleep each night',
-                'Maintain a balanced diet rich in fruits and vegetables',
-                'Practice good posture to prevent back pain'
-            ]
-        },
-        {
-            'category': 'Mental Health',
-            'tips': [
-                'Practice mindfulness and meditation daily',
-                'Take regular breaks from work and screens',
-                'Stay connected with friends and family',
-                'Keep a gratitude journal',
-                'Learn stress management techniques'
-            ]
-        },
-        {
-            'category': 'Safety & Prevention',
-            'tips': [
-                'Carry a small first-aid kit in your bag',
-                'Keep emergency contacts updated',
-                'Learn basic self-defense techniques',
-                'Share your location with trusted contacts when traveling',
-                'Stay aware of your surroundings'
-            ]
-        }
-    ]
-    
-    # Video tutorials
-    video_tutorials = [
-        {
-            'title': 'Basic Self-Defense Techniques',
-            'description': 'Learn essential self-defense moves for women',
-            'url': 'https://www.youtube.com/embed/6ZpY66Xwzp8',
-            'thumbnail': 'https://img.youtube.com/vi/6ZpY66Xwzp8/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Health & Wellness',
-            'description': 'Comprehensive guide to women\'s health and wellness',
-            'url': 'https://www.youtube.com/embed/0zBhTzHj9NU',
-            'thumbnail': 'https://img.youtube.com/vi/0zBhTzHj9NU/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Self Defense - Basic Moves',
-            'description': 'Simple and effective self-defense techniques',
-            'url': 'https://www.youtube.com/embed/8Qn_spdM5Zg',
-            'thumbnail': 'https://img.youtube.com/vi/8Qn_spdM5Zg/maxresdefault.jpg'
-        },
-        {
-            'title': '5 Self Defense Moves Every Woman Should Know',
-            'description': 'Essential self-defense techniques for women',
-            'url': 'https://www.youtube.com/embed/5iPHLrAjgA8',
-            'thumbnail': 'https://img.youtube.com/vi/5iPHLrAjgA8/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Health Tips',
-            'description': 'Important health tips for women',
-            'url': 'https://www.youtube.com/embed/2Gm6Zx5UqQY',
-            'thumbnail': 'https://img.youtube.com/vi/2Gm6Zx5UqQY/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense for Women - Street Safety',
-            'description': 'Street safety and self-defense techniques',
-            'url': 'https://www.youtube.com/embed/3N-Y36KxWfs',
-            'thumbnail': 'https://img.youtube.com/vi/3N-Y36KxWfs/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Health & Fitness',
-            'description': 'Health and fitness tips for women',
-            'url': 'https://www.youtube.com/embed/4K5Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/4K5Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense - Ground Techniques',
-            'description': 'How to defend yourself when on the ground',
-            'url': 'https://www.youtube.com/embed/5L6Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/5L6Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Mental Health',
-            'description': 'Tips for maintaining mental health',
-            'url': 'https://www.youtube.com/embed/6L7Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/6L7Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense with Everyday Objects',
-            'description': 'Using common items for self-defense',
-            'url': 'https://www.youtube.com/embed/7L8Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/7L8Y2xLhJkM/maxresdefault.jpg'
-        }
-    ]
-    
-    return render_template('health_tips.html', health_tips=health_tips, video_tutorials=video_tutorials)
+    return page_response('health_tips')
 
 @app.route('/self-defense')
 def self_defense():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Self-defense tips that will flash
-    defense_tips = [
-        "Always be aware of your surroundings",
-        "Trust your instincts - if something feels wrong, it probably is",
-        "Keep your phone charged and easily accessible",
-        "Learn to use your voice as a weapon - yell 'FIRE!' to attract attention",
-        "Carry a personal safety alarm",
-        "Walk with confidence and purpose",
-        "Keep your hands free and ready to defend yourself",
-        "Learn basic pressure points for self-defense",
-        "Practice situational awareness regularly",
-        "Share your location with trusted contacts when traveling"
-    ]
-    
-    # Self-defense video tutorials
-    defense_videos = [
-        {
-            'title': 'Basic Self-Defense Moves for Women',
-            'description': 'Essential self-defense techniques every woman should know',
-            'url': 'https://www.youtube.com/embed/6ZpY66Xwzp8',
-            'thumbnail': 'https://img.youtube.com/vi/6ZpY66Xwzp8/maxresdefault.jpg'
-        },
-        {
-            'title': 'Women\'s Self-Defense Techniques',
-            'description': 'Learn practical self-defense moves for women',
-            'url': 'https://www.youtube.com/embed/0zBhTzHj9NU',
-            'thumbnail': 'https://img.youtube.com/vi/0zBhTzHj9NU/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense - Basic Techniques',
-            'description': 'Fundamental self-defense moves for women',
-            'url': 'https://www.youtube.com/embed/8Qn_spdM5Zg',
-            'thumbnail': 'https://img.youtube.com/vi/8Qn_spdM5Zg/maxresdefault.jpg'
-        },
-        {
-            'title': '5 Essential Self Defense Moves',
-            'description': 'Must-know self-defense techniques',
-            'url': 'https://www.youtube.com/embed/5iPHLrAjgA8',
-            'thumbnail': 'https://img.youtube.com/vi/5iPHLrAjgA8/maxresdefault.jpg'
-        },
-        {
-            'title': 'Street Safety & Self Defense',
-            'description': 'Staying safe on the streets',
-            'url': 'https://www.youtube.com/embed/3N-Y36KxWfs',
-            'thumbnail': 'https://img.youtube.com/vi/3N-Y36KxWfs/maxresdefault.jpg'
-        },
-        {
-            'title': 'Ground Defense Techniques',
-            'description': 'How to defend yourself when knocked down',
-            'url': 'https://www.youtube.com/embed/5L6Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/5L6Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense with Keys',
-            'description': 'Using keys as a self-defense tool',
-            'url': 'https://www.youtube.com/embed/6L7Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/6L7Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Mental Preparation for Self Defense',
-            'description': 'Developing the right mindset',
-            'url': 'https://www.youtube.com/embed/7L8Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/7L8Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Self Defense in Confined Spaces',
-            'description': 'Techniques for elevators and small spaces',
-            'url': 'https://www.youtube.com/embed/8L9Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/8L9Y2xLhJkM/maxresdefault.jpg'
-        },
-        {
-            'title': 'Advanced Self Defense Combinations',
-            'description': 'Combining multiple techniques effectively',
-            'url': 'https://www.youtube.com/embed/9L0Y2xLhJkM',
-            'thumbnail': 'https://img.youtube.com/vi/9L0Y2xLhJkM/maxresdefault.jpg'
-        }
-    ]
-    
-    return render_template('self_defense.html', defense_tips=defense_tips, defense_videos=defense_videos)
+    return page_response('self_defense')
 
 @app.route('/latest-articles')
 def latest_articles():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Latest articles about women in different fields
-    articles = [
-        {
-            'title': 'Women Breaking Barriers in Tech',
-            'content': 'Women are making significant strides in technology, with more female leaders emerging in major tech companies.',
-            'image': 'https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Technology',
-            'date': '2024-03-15'
-        },
-        {
-            'title': 'Women in Sports: Record-Breaking Achievements',
-            'content': 'Female athletes continue to break records and challenge stereotypes in various sports worldwide.',
-            'image': 'https://images.unsplash.com/photo-1517649763962-0c623066013b?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Sports',
-            'date': '2024-03-14'
-        },
-        {
-            'title': 'Women Entrepreneurs: Success Stories',
-            'content': 'Women-led startups are receiving more funding and recognition in the business world.',
-            'image': 'https://images.unsplash.com/photo-1573497019940-1c28c88b4f3e?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Business',
-            'date': '2024-03-13'
-        },
-        {
-            'title': 'Women in Science: Groundbreaking Research',
-            'content': 'Female scientists are leading innovative research projects and making significant discoveries.',
-            'image': 'https://images.unsplash.com/photo-1581092921461-39b9d08a9b21?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Science',
-            'date': '2024-03-12'
-        },
-        {
-            'title': 'Women in Politics: Global Leadership',
-            'content': 'More women are taking leadership roles in politics and making impactful policy changes.',
-            'image': 'https://images.unsplash.com/photo-1573497019230-a1d49bcfd7a9?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Politics',
-            'date': '2024-03-11'
-        },
-        {
-            'title': 'Women in Arts: Creative Excellence',
-            'content': 'Female artists are gaining recognition and transforming the art world with their unique perspectives.',
-            'image': 'https://images.unsplash.com/photo-1573497019940-1c28c88b4f3e?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Arts',
-            'date': '2024-03-10'
-        },
-        {
-            'title': 'Women in Healthcare: Medical Innovations',
-            'content': 'Women healthcare professionals are pioneering new treatments and improving patient care.',
-            'image': 'https://images.unsplash.com/photo-1573497019940-1c28c88b4f3e?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Healthcare',
-            'date': '2024-03-09'
-        },
-        {
-            'title': 'Women in Education: Shaping Future',
-            'content': 'Female educators are implementing innovative teaching methods and inspiring the next generation.',
-            'image': 'https://images.unsplash.com/photo-1573497019940-1c28c88b4f3e?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80',
-            'category': 'Education',
-            'date': '2024-03-08'
-        }
-    ]
-    
-    return render_template('latest_articles.html', articles=articles)
+    return page_response('latest_articles')
 
 def process_markdown_response(response_text):
     """Process markdown formatting in the response for better display"""
-    import re
-    
-    # Convert markdown to HTML for better display
-    # Bold text
-    response_text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', response_text)
-    
-    # Italic text
-    response_text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', response_text)
-    
-    # Bullet points
-    response_text = re.sub(r'^•\s*(.*?)$', r'<li>\1</li>', response_text, flags=re.MULTILINE)
-    response_text = re.sub(r'^(\d+)\.\s*(.*?)$', r'<li>\1. \2</li>', response_text, flags=re.MULTILINE)
-    
-    # Convert lists to proper HTML
-    lines = response_text.split('\n')
-    processed_lines = []
-    in_list = False
-    
-    for line in lines:
-        if line.strip().startswith('<li>'):
-            if not in_list:
-                processed_lines.append('<ul>')
-                in_list = True
-            processed_lines.append(line)
-        elif in_list and not line.strip().startswith('<li>'):
-            processed_lines.append('</ul>')
-            in_list = False
-            processed_lines.append(line)
-        else:
-            processed_lines.append(line)
-    
-    if in_list:
-        processed_lines.append('</ul>')
-    
-    response_text = '\n'.join(processed_lines)
-    
-    # Convert line breaks to <br> tags
-    response_text = response_text.replace('\n', '<br>')
-    
-    return response_text
+    return render_markdown(response_text)
 
 def get_user_context(user_id=None):
     """Get user context for personalized responses"""
@@ -811,15 +844,12 @@ def get_user_context(user_id=None):
         return {}
     
     try:
-        conn = get_db_connection()
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-        contacts = conn.execute('SELECT COUNT(*) as count FROM emergency_contacts WHERE user_id = ?', (user_id,)).fetchone()
-        conn.close()
-        
+        user, contacts = get_user(get_db_connection(), user_id)
+
         if user:
             return {
                 'name': user['name'],
-                'has_emergency_contacts': contacts['count'] > 0 if contacts else False,
+                'has_emergency_contacts': len(contacts) > 0,
                 'user_id': user_id
             }
     except:
@@ -828,27 +858,11 @@ def get_user_context(user_id=None):
     return {}
 
 def save_conversation_history(user_id, user_input, ai_response, context_used=False):
-    """Save conversation history to database for better context awareness"""
+    """Save conversation history for better context awareness"""
     if not user_id:
         return
     
-    try:
-        conn = get_db_connection()
-        conn.execute('''CREATE TABLE IF NOT EXISTS conversation_history
-                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                         user_id INTEGER NOT NULL,
-                         user_input TEXT NOT NULL,
-                         ai_response TEXT NOT NULL,
-                         context_used BOOLEAN DEFAULT FALSE,
-                         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         FOREIGN KEY (user_id) REFERENCES users (id))''')
-        
-        conn.execute('INSERT INTO conversation_history (user_id, user_input, ai_response, context_used) VALUES (?, ?, ?, ?)',
-                    (user_id, user_input, ai_response, context_used))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Error saving conversation history: {e}")
+    record_turn(user_id, user_input, ai_response, context_used)
 
 def get_conversation_history(user_id, limit=10):
     """Get recent conversation history for context"""
@@ -856,29 +870,54 @@ def get_conversation_history(user_id, limit=10):
         return []
     
     try:
-        conn = get_db_connection()
-        conn.execute('''CREATE TABLE IF NOT EXISTS conversation_history
-                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                         user_id INTEGER NOT NULL,
-                         user_input TEXT NOT NULL,
-                         ai_response TEXT NOT NULL,
-                         context_used BOOLEAN DEFAULT FALSE,
-                         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         FOREIGN KEY (user_id) REFERENCES users (id))''')
-        
-        history = conn.execute('''SELECT user_input, ai_response, timestamp 
-                                 FROM conversation_history 
-                                 WHERE user_id = ? 
-                                 ORDER BY timestamp DESC 
-                                 LIMIT ?''', (user_id, limit)).fetchall()
-        conn.close()
-        
-        return [{'type': 'user', 'content': row[0], 'timestamp': row[2]} for row in history] + \
-               [{'type': 'bot', 'content': row[1], 'timestamp': row[2]} for row in history]
+        history = recent_turns(user_id, limit)
+        return [{'type': 'user', 'content': turn['user_input'], 'timestamp': turn['timestamp']} for turn in history] + \
+               [{'type': 'bot', 'content': turn['ai_response'], 'timestamp': turn['timestamp']} for turn in history]
     except Exception as e:
         print(f"Error getting conversation history: {e}")
         return []
 
+def prepare_chat(user_input, conversation_history):
+    """
+    Build everything needed to answer a chatbot question.
+
+    Args:
+        user_input (str): The user's question
+        conversation_history (str): JSON list of the current session's messages
+
+    Returns:
+        tuple: (history, user_context, full_prompt, cache_key); cache_key is
+        None when the answer depends on conversation history
+    """
+    # Parse conversation history
+    import json
+    try:
+        history = json.loads(conversation_history)
+    except:
+        history = []
+    
+    # Get user context for personalization
+    user_context = get_user_context(session.get('user_id'))
+    
+    # Get saved conversation history if user is logged in
+    if user_context.get('user_id'):
+        saved_history = get_conversation_history(user_context['user_id'], limit=5)
+        if saved_history:
+            # Merge saved history with current session history
+            history = saved_history + history[-5:]  # Keep last 5 from current session
+    
+    full_prompt = build_prompt(user_input, history, user_context)
+    
+    # Context-free questions get the same answer every time, so serve them from the cache
+    cache_key = None
+    if not history:
+        cache_key = make_key(user_input, CHAT_MODEL_NAME, CHAT_GENERATION_CONFIG, {
+            'name': user_context.get('name', 'User'),
+            'has_emergency_contacts': user_context.get('has_emergency_contacts', False)
+        })
+
+    return history, user_context, full_prompt, cache_key
+
 @app.route('/chatbot', methods=['GET', 'POST'])
 def chatbot():
     if request.method == 'POST':
@@ -886,122 +925,34 @@ def chatbot():
         conversation_history = request.form.get('conversation_history', '[]')
         
         try:
-            # Parse conversation history
-            import json
-            try:
-                history = json.loads(conversation_history)
-            except:
-                history = []
-            
-            # Get user context for personalization
-            user_context = get_user_context(session.get('user_id'))
-            
-            # Get saved conversation history if user is logged in
-            if user_context.get('user_id'):
-                saved_history = get_conversation_history(user_context['user_id'], limit=5)
-                if saved_history:
-                    # Merge saved history with current session history
-                    history = saved_history + history[-5:]  # Keep last 5 from current session
-            
-            # Create a comprehensive system prompt with conversation context
-            system_prompt = f"""
-            You are HerShield AI, an intelligent, empathetic, and highly responsive AI assistant designed specifically to help women with any questions, concerns, or challenges they may face. You are warm, supportive, and always prioritize safety and empowerment.
-
-            **Your Core Expertise:**
-            - Women's safety and personal security (primary focus)
-            - Self-defense techniques and strategies
-            - Emergency procedures and crisis management
-            - Physical and mental health for women
-            - Legal rights and resources (especially Indian context)
-            - Personal development and empowerment
-            - Relationship advice and boundaries
-            - Career guidance and workplace issues
-            - General life advice and support
-
-            **Response Guidelines:**
-            1. **Be Comprehensive**: Provide detailed, thorough answers that address all aspects of the question
-            2. **Be Supportive**: Always maintain an empathetic and encouraging tone
-            3. **Be Practical**: Offer actionable advice and concrete steps when applicable
-            4. **Be Accurate**: Provide fact-based information and cite reliable sources when possible
-            5. **Be Safety-Focused**: Prioritize safety in all responses, especially for emergency situations
-            6. **Be Inclusive**: Consider diverse perspectives and experiences
-            7. **Be Professional**: Maintain appropriate boundaries while being warm and approachable
-            8. **Be Contextual**: Reference previous conversation context when relevant
-            9. **Be Proactive**: Anticipate follow-up questions and provide comprehensive information
-            10. **Be Encouraging**: Always end with a supportive or empowering note
-
-            **Emergency Protocol:**
-            - If someone mentions being in immediate danger, emphasize calling emergency services (100 in India)
-            - Encourage using the SOS feature in the HerShield app
-            - Provide clear, step-by-step emergency procedures
-            - Offer immediate, actionable safety advice
-
-            **Response Style:**
-            - Use clear, accessible language
-            - Include relevant emojis for warmth and visual appeal
-            - Structure responses with bullet points or numbered lists when helpful
-            - Provide examples and scenarios when relevant
-            - Use markdown formatting for better readability
-            - Keep responses conversational but informative
-            - Always end with encouragement or a supportive note
-
-            **Context Awareness:**
-            - Remember previous conversation topics
-            - Build on previous advice given
-            - Maintain conversation continuity
-            - Reference earlier points when relevant
-
-            **Smart Features:**
-            - Provide personalized advice based on context
-            - Offer proactive suggestions and tips
-            - Anticipate user needs and concerns
-            - Provide multiple options and alternatives
-            - Include relevant resources and references
-
-            **User Context:**
-            - User Name: {user_context.get('name', 'User')}
-            - Has Emergency Contacts: {user_context.get('has_emergency_contacts', False)}
-            - User ID: {user_context.get('user_id', 'Not logged in')}
-
-            Now, please respond to the user's question with a comprehensive, helpful, and supportive answer that takes into account the conversation history and provides the most relevant and actionable information.
-            """
-            
-            # Build conversation context
-            context = ""
-            if history:
-                context = "\n\n**Conversation History:**\n"
-                for i, msg in enumerate(history[-5:]):  # Last 5 messages for context
-                    if msg.get('type') == 'user':
-                        context += f"User: {msg.get('content', '')}\n"
-                    elif msg.get('type') == 'bot':
-                        context += f"Assistant: {msg.get('content', '')}\n"
-            
-            # Create a comprehensive prompt that includes the system context, conversation history, and user question
-            full_prompt = f"{system_prompt}{context}\n\n**Current User Question:** {user_input}\n\nPlease provide a detailed, comprehensive response that addresses all aspects of this question, considers the conversation context, and offers actionable advice."
-            
+            history, user_context, full_prompt, cache_key = prepare_chat(user_input, conversation_history)
+            # One keyword pass serves the emergency check, fallback and suggestions
+            intents = classify(user_input)
+
             try:
-                # Use Gemini API for intelligent, dynamic responses
-                model = genai.GenerativeModel('gemini-1.5-pro-latest')
-                
-                # Generate response with optimized parameters for better quality
-                response = model.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.7,
-                        top_p=0.9,
-                        top_k=40,
-                        max_output_tokens=2048,
-                    )
-                )
-                
-                # Process and enhance the response
-                ai_response = response.text.strip()
+                ai_response = None
+                if is_emergency(intents):
+                    # Someone may be in danger right now; don't make them wait for the model
+                    count('emergency_shortcuts')
+                    source = 'emergency'
+                else:
+                    ai_response = chat_response_cache.get(cache_key) if cache_key else None
+                    source = 'cache'
+                    if ai_response is None:
+                        # Use Gemini API, but never wait longer than the latency budget
+                        ai_response = generate_with_deadline(full_prompt, on_late=late_answer_handler(cache_key))
+                        source = 'model' if ai_response is not None else 'fallback'
+                        if ai_response is not None and cache_key:
+                            chat_response_cache.set(cache_key, ai_response)
+
+                if ai_response is None:
+                    ai_response = get_enhanced_fallback_response(user_input, history, intents)
                 
                 # Process markdown formatting
                 ai_response = process_markdown_response(ai_response)
                 
                 # Add smart suggestions based on the response
-                suggestions = generate_smart_suggestions(user_input, ai_response)
+                suggestions = generate_smart_suggestions(user_input, ai_response, intents)
                 
                 # Save conversation history if user is logged in
                 if user_context.get('user_id'):
@@ -1012,20 +963,21 @@ def chatbot():
                     'response': ai_response,
                     'suggestions': suggestions,
                     'context_used': len(history) > 0,
-                    'personalized': bool(user_context.get('user_id'))
+                    'personalized': bool(user_context.get('user_id')),
+                    'source': source
                 })
                 
             except Exception as e:
                 print(f"Gemini API error: {str(e)}")
                 # Enhanced fallback responses with better matching
-                fallback_response = get_enhanced_fallback_response(user_input, history)
+                fallback_response = get_enhanced_fallback_response(user_input, history, intents)
                 fallback_response = process_markdown_response(fallback_response)
                 
                 # Save conversation history even for fallback responses
                 if user_context.get('user_id'):
                     save_conversation_history(user_context['user_id'], user_input, fallback_response, len(history) > 0)
                 
-                return jsonify({'response': fallback_response})
+                return jsonify({'response': fallback_response, 'source': 'fallback'})
                 
         except Exception as e:
             print(f"Chatbot error: {str(e)}")
@@ -1033,129 +985,99 @@ def chatbot():
     
     return render_template('chatbot.html')
 
-def generate_smart_suggestions(user_input, ai_response):
+def late_answer_handler(cache_key):
+    """Return a callback that caches a model answer arriving after the deadline."""
+    if not cache_key:
+        return None
+    return lambda text: chat_response_cache.set(cache_key, text) if text else None
+
+def sse_event(event, data, event_id=None):
+    """Format one Server-Sent Events message carrying a JSON payload."""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chatbot/stream', methods=['POST'])
+def chatbot_stream():
+    """
+    Answer a chatbot question as a stream of Server-Sent Events.
+
+    While the model generates, each ``chunk`` event carries the answer so
+    far, already rendered to HTML, so the page can replace the bubble's
+    content as it grows. A final ``done`` event has the same fields as the
+    ``/chatbot`` JSON response. The finished answer is saved to the
+    conversation history like any other.
+    """
+    user_input = request.form['user_input']
+    conversation_history = request.form.get('conversation_history', '[]')
+
+    def generate():
+        try:
+            history, user_context, full_prompt, cache_key = prepare_chat(user_input, conversation_history)
+            intents = classify(user_input)
+        except Exception as e:
+            print(f"Chatbot error: {str(e)}")
+            yield sse_event('done', {'response': "I'm sorry, I'm experiencing some technical difficulties right now. Please try again in a moment! 💪",
+                                     'source': 'fallback'})
+            return
+
+        try:
+            raw_response = None
+            if is_emergency(intents):
+                count('emergency_shortcuts')
+                raw_response = get_enhanced_fallback_response(user_input, history, intents)
+                source = 'emergency'
+            elif cache_key:
+                raw_response = chat_response_cache.get(cache_key)
+                source = 'cache'
+            if raw_response is None:
+                source = 'model'
+                # Completed lines are rendered once; each event re-renders only the last line
+                renderer = MarkdownRenderer()
+                raw_response = ''
+                for text in stream_with_deadline(full_prompt, on_late=late_answer_handler(cache_key)):
+                    if not raw_response:
+                        text = text.lstrip()
+                    raw_response += text
+                    renderer.feed(text)
+                    yield sse_event('chunk', {'html': renderer.html()})
+                raw_response = raw_response.strip()
+                if cache_key and raw_response:
+                    chat_response_cache.set(cache_key, raw_response)
+            ai_response = process_markdown_response(raw_response)
+        except Exception as e:
+            print(f"Gemini API error: {str(e) or type(e).__name__}")
+            # Whatever was streamed so far is replaced by the fallback answer
+            ai_response = process_markdown_response(get_enhanced_fallback_response(user_input, history, intents))
+            source = 'fallback'
+
+        if user_context.get('user_id'):
+            save_conversation_history(user_context['user_id'], user_input, ai_response, len(history) > 0)
+
+        yield sse_event('done', {
+            'response': ai_response,
+            'suggestions': generate_smart_suggestions(user_input, ai_response, intents),
+            'context_used': len(history) > 0,
+            'personalized': bool(user_context.get('user_id')),
+            'source': source
+        })
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx-style proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
+def generate_smart_suggestions(user_input, ai_response, intents=None):
     """Generate smart follow-up suggestions based on user input and AI response"""
-    suggestions = []
-    user_lower = user_input.lower()
-    response_lower = ai_response.lower()
-    
-    # Emergency-related suggestions
-    if any(keyword in user_lower for keyword in ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe']):
-        suggestions.extend([
-            "How to use the SOS feature",
-            "Emergency contact setup",
-            "Self-defense techniques",
-            "Safety planning tips"
-        ])
-    
-    # Safety-related suggestions
-    elif any(keyword in user_lower for keyword in ['safety', 'safe', 'protect', 'security']):
-        suggestions.extend([
-            "Daily safety practices",
-            "Technology safety tips",
-            "Travel safety guidelines",
-            "Self-defense basics"
-        ])
-    
-    # Health-related suggestions
-    elif any(keyword in user_lower for keyword in ['health', 'healthy', 'wellness', 'medical', 'doctor']):
-        suggestions.extend([
-            "Mental health resources",
-            "Physical wellness tips",
-            "Preventive care guide",
-            "Stress management techniques"
-        ])
-    
-    # Relationship-related suggestions
-    elif any(keyword in user_lower for keyword in ['relationship', 'dating', 'partner', 'marriage']):
-        suggestions.extend([
-            "Setting healthy boundaries",
-            "Communication skills",
-            "Red flags to watch for",
-            "Building self-worth"
-        ])
-    
-    # Career-related suggestions
-    elif any(keyword in user_lower for keyword in ['career', 'job', 'work', 'profession']):
-        suggestions.extend([
-            "Career development tips",
-            "Workplace rights",
-            "Salary negotiation",
-            "Professional confidence"
-        ])
-    
-    # General suggestions based on response content
-    else:
-        if 'safety' in response_lower:
-            suggestions.append("More safety tips")
-        if 'health' in response_lower:
-            suggestions.append("Health and wellness resources")
-        if 'confidence' in response_lower:
-            suggestions.append("Building self-confidence")
-        if 'legal' in response_lower:
-            suggestions.append("Legal rights and resources")
-    
-    # Add general helpful suggestions
-    suggestions.extend([
-        "Ask me anything else",
-        "Emergency contacts setup",
-        "Self-defense techniques"
-    ])
-    
-    # Return unique suggestions (max 4)
-    return list(dict.fromkeys(suggestions))[:4]
+    if intents is None:
+        intents = classify(user_input)
+    return suggestions_for(intents, ai_response)
 
-def get_enhanced_fallback_response(user_input, history):
+def get_enhanced_fallback_response(user_input, history, intents=None):
     """Enhanced fallback responses with better context awareness"""
-    user_lower = user_input.lower()
-    
-    # Enhanced fallback responses for when API fails
-    fallback_responses = {
-        'emergency': "🚨 **EMERGENCY RESPONSE** 🚨\n\nIf you're in immediate danger:\n\n1. **Call 100 immediately** - Police emergency number\n2. **Use the SOS button** in this app to alert your emergency contacts\n3. **Find a safe location** - Go to a well-lit, public area\n4. **Stay visible** - Make yourself seen by others\n5. **Trust your instincts** - If something feels wrong, act on it\n\n**Remember**: Your safety is the absolute priority. Don't hesitate to call for help.\n\n💪 You're stronger than you think, and help is always available.",
-        
-        'safety': "🛡️ **COMPREHENSIVE SAFETY GUIDELINES** 🛡️\n\n**Daily Safety Practices:**\n• Trust your instincts - if something feels wrong, it probably is\n• Stay aware of your surroundings at all times\n• Keep your phone charged and easily accessible\n• Share your location with trusted contacts when traveling\n• Carry a personal safety alarm or whistle\n• Learn basic self-defense techniques\n\n**Technology Safety:**\n• Use location-sharing apps with trusted friends\n• Keep emergency contacts updated\n• Consider safety apps like HerShield\n• Be cautious with social media location sharing\n\n**Mental Safety:**\n• Build confidence through self-care\n• Practice situational awareness\n• Develop a safety mindset\n• Trust your judgment\n\n💪 Remember: You have the right to feel safe and secure.",
-        
-        'self defense': "🥋 **SELF-DEFENSE COMPREHENSIVE GUIDE** 🥋\n\n**Mental Preparation:**\n• Develop situational awareness\n• Trust your instincts\n• Stay calm under pressure\n• Be mentally prepared to defend yourself\n\n**Basic Techniques:**\n• **Voice as weapon**: Yell 'FIRE!' to attract attention\n• **Target vulnerable areas**: Eyes, nose, throat, groin\n• **Use your body**: Elbows, knees, head for striking\n• **Create distance**: Push, kick, or run when possible\n\n**Prevention Strategies:**\n• Avoid isolated areas\n• Walk with confidence\n• Keep hands free and ready\n• Learn pressure points\n• Practice basic moves regularly\n\n**Training Recommendations:**\n• Take a self-defense class\n• Practice with a partner\n• Learn martial arts basics\n• Attend women's safety workshops\n\n💪 Knowledge is power - the more you know, the safer you are!",
-        
-        'health': "💪 **WOMEN'S HEALTH & WELLNESS GUIDE** 💪\n\n**Physical Health:**\n• Regular health checkups and screenings\n• Balanced nutrition with adequate vitamins\n• Regular exercise (30+ minutes daily)\n• Adequate sleep (7-9 hours)\n• Stay hydrated (8+ glasses of water)\n\n**Mental Health:**\n• Practice mindfulness and meditation\n• Maintain social connections\n• Seek professional help when needed\n• Practice stress management techniques\n• Set healthy boundaries\n\n**Preventive Care:**\n• Annual gynecological exams\n• Breast self-examinations\n• Bone density screenings\n• Mental health check-ins\n• Regular dental care\n\n**Lifestyle Tips:**\n• Limit alcohol and avoid smoking\n• Practice safe sex\n• Manage stress effectively\n• Prioritize self-care\n• Build a support network\n\n💪 Your health is your foundation - invest in it daily!",
-        
-        'confidence': "💎 **BUILDING UNSTOPPABLE CONFIDENCE** 💎\n\n**Self-Care Foundation:**\n• Practice daily self-love and acceptance\n• Celebrate small wins and achievements\n• Take care of your physical appearance\n• Maintain good posture and body language\n\n**Mental Strength:**\n• Challenge negative self-talk\n• Practice positive affirmations\n• Set and achieve small goals\n• Learn from failures and setbacks\n• Develop a growth mindset\n\n**Social Confidence:**\n• Practice speaking up in safe environments\n• Set and maintain healthy boundaries\n• Surround yourself with supportive people\n• Learn to say 'no' without guilt\n• Express your opinions respectfully\n\n**Professional Confidence:**\n• Develop your skills and expertise\n• Take on new challenges\n• Advocate for yourself at work\n• Build a professional network\n• Ask for what you deserve\n\n**Daily Practices:**\n• Power posing for 2 minutes daily\n• Gratitude journaling\n• Visualization exercises\n• Positive self-talk\n• Regular exercise\n\n💎 Confidence is a skill you can develop - start today!",
-        
-        'mental': "🧠 **MENTAL HEALTH & WELLNESS COMPREHENSIVE GUIDE** 🧠\n\n**Understanding Mental Health:**\n• Mental health is as important as physical health\n• It's okay to not be okay sometimes\n• Seeking help is a sign of strength, not weakness\n• Everyone experiences mental health challenges\n\n**Daily Wellness Practices:**\n• **Mindfulness**: Practice meditation or deep breathing\n• **Gratitude**: Keep a gratitude journal\n• **Movement**: Exercise releases endorphins\n• **Connection**: Maintain meaningful relationships\n• **Sleep**: Prioritize quality sleep\n• **Nutrition**: Eat brain-healthy foods\n\n**Stress Management:**\n• Identify your stress triggers\n• Practice time management\n• Learn to delegate tasks\n• Take regular breaks\n• Use relaxation techniques\n• Set realistic expectations\n\n**When to Seek Help:**\n• Persistent sadness or anxiety\n• Changes in sleep or appetite\n• Difficulty concentrating\n• Withdrawal from activities\n• Thoughts of self-harm\n• Feeling overwhelmed\n\n**Professional Support:**\n• Therapists and counselors\n• Psychiatrists for medication\n• Support groups\n• Crisis hotlines\n• Online therapy platforms\n\n🧠 Remember: Your mental health matters, and you deserve support!",
-        
-        'legal': "⚖️ **WOMEN'S LEGAL RIGHTS & RESOURCES** ⚖️\n\n**Key Legal Protections in India:**\n• **Protection of Women from Domestic Violence Act, 2005**\n• **Sexual Harassment of Women at Workplace Act, 2013**\n• **Maternity Benefit Act, 1961**\n• **Equal Remuneration Act, 1976**\n• **Dowry Prohibition Act, 1961**\n\n**Your Rights Include:**\n• Right to live free from violence and harassment\n• Right to equal pay for equal work\n• Right to maternity benefits\n• Right to file complaints without fear\n• Right to legal aid and support\n\n**Emergency Contacts:**\n• **Women Helpline**: 1091\n• **Domestic Violence Helpline**: 181\n• **Police Emergency**: 100\n• **Child Helpline**: 1098\n\n**Legal Resources:**\n• National Commission for Women\n• State Women Commissions\n• Legal Aid Services\n• Women's Rights Organizations\n• Pro Bono Legal Services\n\n**Steps to Take:**\n• Document incidents with dates and details\n• Keep evidence (photos, messages, medical reports)\n• File complaints with appropriate authorities\n• Seek legal counsel when needed\n• Connect with support groups\n\n⚖️ Knowledge of your rights is your first line of defense!",
-        
-        'transport': "🚌 **PUBLIC TRANSPORT SAFETY COMPREHENSIVE GUIDE** 🚌\n\n**Before Traveling:**\n• Plan your route in advance\n• Share your travel plans with trusted contacts\n• Keep emergency contacts easily accessible\n• Charge your phone fully\n• Carry a personal safety alarm\n\n**While Traveling:**\n• Stay alert and aware of surroundings\n• Keep belongings close and secure\n• Sit near other women when possible\n• Avoid isolated areas of transport\n• Trust your instincts about people\n\n**Safety Strategies:**\n• **Bus Safety**: Sit near the driver or conductor\n• **Train Safety**: Choose women's compartments when available\n• **Metro Safety**: Stay in well-lit areas\n• **Auto/Taxi Safety**: Share ride details with contacts\n• **Walking**: Stay in well-lit, populated areas\n\n**Technology Safety:**\n• Use ride-sharing apps with safety features\n• Share live location with trusted contacts\n• Keep emergency apps ready\n• Use women-only transport options when available\n\n**Emergency Response:**\n• Know emergency numbers by heart\n• Use panic buttons on transport apps\n• Alert authorities if you feel unsafe\n• Exit at the next stop if uncomfortable\n• Call for help immediately if threatened\n\n🚌 Stay safe, stay alert, and trust your instincts!",
-        
-        'relationship': "💕 **HEALTHY RELATIONSHIPS & BOUNDARIES** 💕\n\n**Building Healthy Relationships:**\n• **Communication**: Open, honest, and respectful dialogue\n• **Trust**: Foundation of any strong relationship\n• **Respect**: Mutual respect for boundaries and feelings\n• **Support**: Emotional and practical support for each other\n• **Equality**: Balanced power dynamics\n\n**Setting Boundaries:**\n• **Identify your limits**: Know what you're comfortable with\n• **Communicate clearly**: Express boundaries respectfully\n• **Be consistent**: Maintain boundaries consistently\n• **Respect others**: Honor others' boundaries too\n• **Self-care**: Prioritize your well-being\n\n**Red Flags to Watch For:**\n• Controlling behavior or jealousy\n• Disrespect for your boundaries\n• Emotional or physical abuse\n• Isolation from friends and family\n• Financial control or manipulation\n• Gaslighting or manipulation\n\n**Building Self-Worth:**\n• Practice self-love and acceptance\n• Develop independence and interests\n• Maintain your own friendships\n• Pursue your goals and dreams\n• Don't compromise your values\n\n**Seeking Help:**\n• Talk to trusted friends or family\n• Consider professional counseling\n• Contact domestic violence hotlines\n• Join support groups\n• Prioritize your safety\n\n💕 You deserve relationships that lift you up, not bring you down!",
-        
-        'career': "💼 **WOMEN'S CAREER DEVELOPMENT & EMPOWERMENT** 💼\n\n**Career Planning:**\n• **Self-Assessment**: Identify your strengths and interests\n• **Goal Setting**: Set clear, achievable career goals\n• **Skill Development**: Continuously upgrade your skills\n• **Networking**: Build professional relationships\n• **Mentorship**: Seek guidance from experienced professionals\n\n**Overcoming Challenges:**\n• **Gender Bias**: Address bias professionally and assertively\n• **Work-Life Balance**: Set boundaries and prioritize effectively\n• **Imposter Syndrome**: Recognize your achievements and worth\n• **Salary Negotiation**: Research and advocate for fair compensation\n• **Leadership**: Develop leadership skills and confidence\n\n**Professional Development:**\n• **Continuous Learning**: Stay updated with industry trends\n• **Certifications**: Pursue relevant certifications\n• **Public Speaking**: Develop communication skills\n• **Leadership Training**: Take on leadership opportunities\n• **Mentoring Others**: Share your knowledge and experience\n\n**Workplace Rights:**\n• **Equal Pay**: Advocate for fair compensation\n• **Safe Environment**: Report harassment and discrimination\n• **Maternity Benefits**: Know your rights and benefits\n• **Flexible Work**: Request reasonable accommodations\n• **Professional Growth**: Seek advancement opportunities\n\n**Building Confidence:**\n• **Celebrate Achievements**: Acknowledge your successes\n• **Take Risks**: Step out of your comfort zone\n• **Learn from Failures**: View setbacks as learning opportunities\n• **Self-Advocacy**: Speak up for yourself professionally\n• **Support Network**: Build relationships with other professionals\n\n💼 Your career is your journey - own it with confidence and purpose!"
-    }
-    
-    # Check for emergency keywords first
-    emergency_keywords = ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe', 'scared', 'fear']
-    if any(keyword in user_lower for keyword in emergency_keywords):
-        return fallback_responses['emergency']
-    
-    # Check for other categories with enhanced matching
-    category_keywords = {
-        'safety': ['safety', 'safe', 'protect', 'security', 'secure', 'dangerous', 'unsafe'],
-        'self defense': ['self defense', 'self-defense', 'defend', 'fight', 'protect', 'martial arts', 'attack'],
-        'health': ['health', 'healthy', 'wellness', 'medical', 'doctor', 'exercise', 'diet', 'sick', 'pain'],
-        'confidence': ['confidence', 'confident', 'self-esteem', 'self worth', 'empowerment', 'shy', 'nervous'],
-        'mental': ['mental health', 'mental', 'anxiety', 'depression', 'stress', 'therapy', 'sad', 'worried'],
-        'legal': ['legal', 'rights', 'law', 'lawyer', 'court', 'harassment', 'discrimination', 'abuse'],
-        'transport': ['transport', 'bus', 'train', 'metro', 'travel', 'commute', 'public transport', 'traveling'],
-        'relationship': ['relationship', 'dating', 'marriage', 'partner', 'boyfriend', 'girlfriend', 'love', 'breakup'],
-        'career': ['career', 'job', 'work', 'profession', 'business', 'employment', 'salary', 'promotion']
-    }
-    
-    for category, keywords in category_keywords.items():
-        if any(keyword in user_lower for keyword in keywords):
-            return fallback_responses.get(category, fallback_responses['safety'])
-    
-    # If no specific category matches, provide a general supportive response
-    return "I'm here to help you with any questions or concerns you might have! Whether it's about safety, health, relationships, career, or anything else, I'm ready to provide detailed, supportive guidance. Please feel free to ask me anything - no question is too big or too small. 💪\n\n**Some topics I can help with:**\n• Safety and self-defense\n• Physical and mental health\n• Relationships and boundaries\n• Career development\n• Legal rights and resources\n• Personal growth and confidence\n• Emergency procedures\n• And much more!"
+    if intents is None:
+        intents = classify(user_input)
+    return fallback_for(intents)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,103 @@
+"""
+Serve the fingerprinted static files written by build_assets.py.
+
+``init_assets(app)`` reads static/dist/manifest.json once. From then on
+``url_for('static', filename='css/style.css')`` points at the hashed copy,
+and the static route answers hashed files with a one-year immutable
+Cache-Control, picking the .br or .gz variant the browser accepts. Templates
+also get ``asset_srcset(filename)`` for responsive images.
+
+Without a manifest (nothing built yet, e.g. while developing) URLs and
+static serving stay exactly as Flask does them. After editing anything in
+static/, run ``python build_assets.py`` again.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory, url_for
+
+# Where build_assets.py writes, relative to the static folder
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Cache lifetime for fingerprinted files; their URL changes whenever their content does
+max_age = int(os.getenv('STATIC_MAX_AGE', str(365 * 24 * 3600)))
+
+# Pre-compressed variants in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def load_manifest(static_folder):
+    """
+    Read the manifest written by build_assets.py.
+
+    Args:
+        static_folder (str): The app's static folder
+
+    Returns:
+        dict: Manifest entries by original filename, empty if nothing has been built
+    """
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ No {DIST_DIR}/{MANIFEST_NAME} in {static_folder}; serving static files unhashed "
+              f"(run python build_assets.py)")
+        return {}
+
+def init_assets(app):
+    """
+    Point static URLs at the built files and serve those with long-lived caching.
+
+    Args:
+        app (flask.Flask): The application
+
+    Returns:
+        dict: The manifest in use
+    """
+    manifest = load_manifest(app.static_folder)
+    # Hashed path -> encodings it has pre-compressed variants for
+    built = {}
+    for entry in manifest.values():
+        built[entry['file']] = tuple(entry.get('encodings', ()))
+        for _, variant in entry.get('srcset', ()):
+            built.setdefault(variant, ())
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static':
+            entry = manifest.get(values.get('filename'))
+            if entry is not None:
+                values['filename'] = entry['file']
+
+    def asset_srcset(filename):
+        """Return a srcset value listing the resized copies of an image, or '' if it has none."""
+        entry = manifest.get(filename, {})
+        return ', '.join(f"{url_for('static', filename=variant)} {width}w"
+                         for width, variant in entry.get('srcset', ()))
+
+    def static(filename):
+        if filename not in built:
+            return app.send_static_file(filename)
+
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if encoding in built[filename] and accepted[encoding]:
+                response = send_from_directory(app.static_folder, filename + suffix, max_age=max_age,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename, max_age=max_age)
+        if built[filename]:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+    app.jinja_env.globals['asset_srcset'] = asset_srcset
+    if manifest:
+        print(f"📦 Serving {len(built)} fingerprinted static files")
+    return manifest
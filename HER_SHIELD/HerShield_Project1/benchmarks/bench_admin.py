@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the /admin alert listing at six-figure alert counts.
+
+Seeds a scratch alerts.db and compares several reads:
+- The old handler, which loaded every alert ordered by timestamp.
+- OFFSET paging.
+- Keyset pages from list_alerts(), at the start, deep in the history, and
+  filtered.
+
+Reports time and peak Python memory (tracemalloc) for each. Also times a
+full CSV export through iter_alerts(). It checks that the keyset pages
+walk every alert exactly once, in the same order as the old query.
+
+Usage: python benchmarks/bench_admin.py [alerts]
+"""
+
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def measure(label, func, repeats=5):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    elapsed = (time.perf_counter() - start) / repeats * 1000
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:38s} {elapsed:10.2f} ms   {peak / 1024 / 1024:8.2f} MiB peak")
+
+def seed(conn, alerts):
+    print(f"🌱 Seeding {alerts:,} alerts...")
+    random.seed(2)
+    conn.execute('BEGIN')
+    conn.executemany('''
+        INSERT INTO alerts (user_id, name, location, timestamp, status, priority, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', ((random.randrange(alerts // 10), 'User', '28.61,77.20', f'{1_700_000_000 + i * 30}',
+           'active' if i % 50 == 0 else 'resolved', 'high' if i % 3 else 'normal', 1_700_000_000 + i * 30)
+          for i in range(alerts)))
+    conn.execute('COMMIT')
+    conn.execute('ANALYZE')
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    os.chdir(tempfile.mkdtemp())
+
+    import alert_queries
+    from db import ALERTS_DB, connect
+    from migrations import migrate, ALERTS_MIGRATIONS
+
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS)
+    conn = connect(ALERTS_DB)
+    seed(conn, alerts)
+
+    pages, cursor, seen = 0, None, []
+    while True:
+        rows, cursor = alert_queries.list_alerts(conn, {}, cursor, 500)
+        seen.extend(row['id'] for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    legacy_order = [row['id'] for row in conn.execute('SELECT id FROM alerts ORDER BY timestamp DESC, id DESC')]
+    assert seen == legacy_order, 'keyset pages must cover every alert once, newest first'
+
+    deep = None
+    for _ in range(alerts // 2 // 50):
+        deep = alert_queries.list_alerts(conn, {}, deep)[1]
+    since = {'since': 1_700_000_000 + alerts * 15, 'until': 1_700_000_000 + alerts * 20}
+
+    def export():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in alert_queries.iter_alerts(conn, {}):
+            writer.writerow(tuple(row))
+            if buffer.tell() > 16384:
+                buffer.seek(0)
+                buffer.truncate()
+
+    print(f"\n📊 {alerts:,} alerts, 50 per page")
+    measure('Old /admin (every alert)', lambda: conn.execute('SELECT * FROM alerts ORDER BY timestamp DESC').fetchall(), 2)
+    measure('OFFSET page halfway', lambda: conn.execute('SELECT * FROM alerts ORDER BY created_at DESC, id DESC '
+                                                         'LIMIT 50 OFFSET ?', (alerts // 2,)).fetchall())
+    measure('Keyset first page', lambda: alert_queries.list_alerts(conn, {}))
+    measure('Keyset page halfway', lambda: alert_queries.list_alerts(conn, {}, deep))
+    measure('Keyset, status=active', lambda: alert_queries.list_alerts(conn, {'status': 'active'}))
+    measure('Keyset, one user', lambda: alert_queries.list_alerts(conn, {'user_id': 7}))
+    measure('Keyset, time range', lambda: alert_queries.list_alerts(conn, since))
+    measure('CSV export (streamed)', export, 1)
+    for label, filters in [('no filter', {}), ('status', {'status': 'active'}), ('user', {'user_id': 7})]:
+        sql, params = alert_queries._query(filters, (2e9, 0), 50)
+        plan = ' | '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+        print(f"  plan ({label}): {plan}")
+    conn.close()
+    print(f"✅ {pages} keyset pages walked all {alerts:,} alerts in the old order")
+
+if __name__ == "__main__":
+    main()
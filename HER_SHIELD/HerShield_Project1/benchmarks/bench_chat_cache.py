@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chatbot answers with and without the response cache.
+
+Replays a workload of repeated questions (the suggestion chips plus a tail
+of one-off questions) against a stub model that sleeps like a real LLM
+call, once per cache backend, and checks TTL expiry and LRU eviction.
+
+Usage: python benchmarks/bench_chat_cache.py [requests] [model_latency_ms]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POPULAR_QUESTIONS = [
+    'How to use SOS?',
+    'how to use sos',
+    'What are self-defense techniques?',
+    'How can I stay safe while travelling alone?',
+    'What are my legal rights?',
+    'Tips for safe commuting',
+    'How do I add emergency contacts?',
+]
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: fixed latency, deterministic text."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return f"Answer to: {prompt[-80:]}"
+
+def workload(requests):
+    for i in range(requests):
+        if random.random() < 0.8:
+            yield random.choice(POPULAR_QUESTIONS)
+        else:
+            yield f'One-off question number {i}'
+
+def answer(cache, model, question):
+    from chat_cache import make_key
+    key = make_key(question, 'stub-model', {'temperature': 0.7}, {'name': 'User'})
+    response = cache.get(key) if cache else None
+    if response is None:
+        response = model.generate_content(question)
+        if cache:
+            cache.set(key, response)
+    return response
+
+def run(label, cache, questions, latency):
+    model = StubModel(latency)
+    timings = []
+    start = time.perf_counter()
+    for question in questions:
+        request_start = time.perf_counter()
+        answer(cache, model, question)
+        timings.append((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    print(f"  {label:20s} {elapsed:7.2f} s total   p50 {timings[len(timings) // 2]:8.3f} ms   "
+          f"p95 {timings[int(len(timings) * 0.95)]:8.3f} ms   model calls {model.calls}")
+    if cache:
+        print(f"  {'':20s} {cache.metrics()}")
+
+def check_eviction(cache_class, backend):
+    cache = cache_class(backend, ttl=0.2)
+    cache.set('a', 'first')
+    cache.set('b', 'second')
+    cache.get('a')
+    cache.set('c', 'third')
+    assert cache.get('b') is None, 'least recently used entry should be evicted'
+    assert cache.get('a') == 'first' and cache.get('c') == 'third'
+    time.sleep(0.25)
+    assert cache.get('a') is None, 'expired entry should not be served'
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000
+    os.chdir(tempfile.mkdtemp())
+
+    from chat_cache import MemoryBackend, SQLiteBackend, ResponseCache, normalize_question
+    from db import CHAT_CACHE_DB
+    from migrations import migrate, CHAT_CACHE_MIGRATIONS
+
+    migrate(CHAT_CACHE_DB, CHAT_CACHE_MIGRATIONS)
+
+    assert normalize_question('  How to use   SOS?? ') == normalize_question('how to use sos')
+    check_eviction(ResponseCache, MemoryBackend(2))
+    check_eviction(ResponseCache, SQLiteBackend(CHAT_CACHE_DB, 2))
+    print("✅ Key normalization, TTL and LRU eviction behave for both backends")
+
+    random.seed(7)
+    questions = list(workload(requests))
+    print(f"\n📊 {requests} questions, stub model latency {latency * 1000:.0f} ms")
+    run('No cache', None, questions, latency)
+    run('Memory backend', ResponseCache(MemoryBackend(1000), 3600), questions, latency)
+    run('SQLite backend', ResponseCache(SQLiteBackend(CHAT_CACHE_DB, 1000), 3600), questions, latency)
+
+if __name__ == "__main__":
+    main()
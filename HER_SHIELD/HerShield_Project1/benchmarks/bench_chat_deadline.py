@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /chatbot latency with and without the model deadline.
+
+A stub model answers most questions quickly but stalls on a fraction of
+them, the way a real API call does on a slow network. Each run sends the
+same distinct questions and reports p50/p99 latency and how many answers
+came from the model versus the local fallback. It also checks that
+emergency questions skip the model, that asking again while the first call
+is still running does not call the model twice, and that a late answer is
+cached.
+
+Usage: python benchmarks/bench_chat_deadline.py [requests] [budget_ms] [slow_ms] [slow_fraction]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class Answer:
+    def __init__(self, text):
+        self.text = text
+
+class DelayedModel:
+    """Answers in `fast` seconds, or `slow` seconds for a `slow_fraction` of calls."""
+
+    fast = 0.05
+    slow = 2.0
+    slow_fraction = 0.1
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        DelayedModel.calls += 1
+        slow = 'slow' in prompt[-300:] or random.random() < self.slow_fraction
+        time.sleep(self.slow if slow else self.fast)
+        return Answer("**Stay aware** of your surroundings and keep your phone charged.")
+
+def run(label, client, questions):
+    timings = []
+    sources = Counter()
+    for question in questions:
+        start = time.perf_counter()
+        data = client.post('/chatbot', data={'user_input': question, 'conversation_history': '[]'}).get_json()
+        timings.append((time.perf_counter() - start) * 1000)
+        sources[data.get('source')] += 1
+    timings.sort()
+    print(f"  {label:22s} p50 {timings[len(timings) // 2]:8.1f} ms   "
+          f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:8.1f} ms   {dict(sources)}")
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    budget = (float(sys.argv[2]) if len(sys.argv) > 2 else 500) / 1000
+    DelayedModel.slow = (float(sys.argv[3]) if len(sys.argv) > 3 else 2000) / 1000
+    DelayedModel.slow_fraction = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+    import google.generativeai as genai
+    genai.GenerativeModel = DelayedModel
+    import app as hershield
+    import chatbot
+
+    client = hershield.app.test_client()
+    print(f"\n📊 {requests} questions, model {DelayedModel.fast * 1000:.0f} ms "
+          f"({DelayedModel.slow_fraction:.0%} stall for {DelayedModel.slow * 1000:.0f} ms)")
+
+    random.seed(3)
+    chatbot.llm_timeout = 3600
+    run('No deadline', client, [f'Safety question {i}' for i in range(requests)])
+    random.seed(3)
+    chatbot.llm_timeout = budget
+    run(f'Deadline {budget * 1000:.0f} ms', client, [f'Travel question {i}' for i in range(requests)])
+
+    calls = DelayedModel.calls
+    data = client.post('/chatbot', data={'user_input': 'I am in danger, someone is following me',
+                                         'conversation_history': '[]'}).get_json()
+    assert data['source'] == 'emergency' and DelayedModel.calls == calls, 'emergency questions must skip the model'
+
+    calls = DelayedModel.calls
+    first = client.post('/chatbot', data={'user_input': 'A slow question', 'conversation_history': '[]'}).get_json()
+    retry = client.post('/chatbot', data={'user_input': 'A slow question', 'conversation_history': '[]'}).get_json()
+    assert retry['source'] == 'fallback' and DelayedModel.calls == calls + 1, 'a retry must not call the model again'
+    time.sleep(DelayedModel.slow + 0.2)
+    second = client.post('/chatbot', data={'user_input': 'a slow question?', 'conversation_history': '[]'}).get_json()
+    assert first['source'] == 'fallback' and second['source'] == 'cache', 'late answers must be cached'
+    print("✅ Emergency questions skip the model; a retry joins the call in flight; "
+          "late answers are served from the cache next time")
+    print(f"  {chatbot.chat_metrics()}")
+
+if __name__ == "__main__":
+    main()
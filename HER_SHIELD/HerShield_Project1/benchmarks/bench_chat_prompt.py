@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request prompt assembly, before and after caching the model.
+
+The old path built a GenerativeModel and a GenerationConfig and re-rendered
+the whole system prompt f-string for every question; the new path reuses
+the process's model and only formats the per-request sections. Reports CPU
+time per call and peak memory allocated per call (tracemalloc).
+
+Usage: python benchmarks/bench_chat_prompt.py [iterations]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from chatbot import CHAT_MODEL_NAME, CHAT_GENERATION_CONFIG, SYSTEM_PROMPT, get_model, build_prompt
+
+USER_CONTEXT = {'name': 'Asha', 'has_emergency_contacts': True, 'user_id': 42}
+HISTORY = [
+    {'type': 'user', 'content': 'How do I add emergency contacts?'},
+    {'type': 'bot', 'content': 'Go to <strong>Emergency Contacts</strong> and tap Add.'},
+    {'type': 'user', 'content': 'Can I set priorities?'},
+    {'type': 'bot', 'content': 'Yes, priority 1 contacts are alerted first.'},
+]
+
+def legacy_prepare(user_input, history, user_context):
+    """The request path as it was: everything rebuilt per call."""
+    system_prompt = f"""{SYSTEM_PROMPT}**User Context:**
+- User Name: {user_context.get('name', 'User')}
+- Has Emergency Contacts: {user_context.get('has_emergency_contacts', False)}
+- User ID: {user_context.get('user_id', 'Not logged in')}
+
+Now, please respond to the user's question with a comprehensive, helpful, and supportive answer that takes into account the conversation history and provides the most relevant and actionable information.
+"""
+    context = ""
+    if history:
+        context = "\n\n**Conversation History:**\n"
+        for msg in history[-5:]:
+            if msg.get('type') == 'user':
+                context += f"User: {msg.get('content', '')}\n"
+            elif msg.get('type') == 'bot':
+                context += f"Assistant: {msg.get('content', '')}\n"
+    full_prompt = f"{system_prompt}{context}\n\n**Current User Question:** {user_input}\n\nPlease provide a detailed, comprehensive response that addresses all aspects of this question, considers the conversation context, and offers actionable advice."
+    model = genai.GenerativeModel(CHAT_MODEL_NAME)
+    config = genai.types.GenerationConfig(**CHAT_GENERATION_CONFIG)
+    return model, config, full_prompt
+
+def cached_prepare(user_input, history, user_context):
+    return get_model(), build_prompt(user_input, history, user_context)
+
+def measure(label, func, iterations):
+    func('warm up', HISTORY, USER_CONTEXT)
+    start = time.process_time()
+    for i in range(iterations):
+        func(f'Question {i}', HISTORY, USER_CONTEXT)
+    cpu_us = (time.process_time() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    peaks = []
+    for i in range(100):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func(f'Question {i}', HISTORY, USER_CONTEXT)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    tracemalloc.stop()
+    allocated = sum(peaks) / len(peaks)
+    print(f"  {label:22s} {cpu_us:8.1f} µs CPU/call   {allocated:8.0f} B peak allocation/call")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    genai.configure(api_key='benchmark')
+    assert legacy_prepare('q', HISTORY, USER_CONTEXT)[2] == build_prompt('q', HISTORY, USER_CONTEXT), \
+        'cached prompt must match the legacy prompt byte for byte'
+    print(f"\n📊 Prompt assembly, {iterations} calls (system prompt {len(SYSTEM_PROMPT)} chars)")
+    measure('Rebuild per request', legacy_prepare, iterations)
+    measure('Cached model/prefix', cached_prepare, iterations)
+
+if __name__ == "__main__":
+    main()
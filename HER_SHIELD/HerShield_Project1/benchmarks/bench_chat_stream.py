@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first token, /chatbot versus /chatbot/stream.
+
+Replaces genai.GenerativeModel with a fake that emits a fixed number of
+chunks with a delay between them, then measures how long each endpoint
+takes before the first piece of the answer reaches the client and before
+the answer is complete. It also checks that a JSON request for a question
+that is still streaming waits on that model call instead of starting one.
+
+Usage: python benchmarks/bench_chat_stream.py [requests] [chunks] [chunk_delay_ms]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamingModel:
+    """Yields '**Tip n:** ...' lines with a delay before each one."""
+
+    chunks = 20
+    delay = 0.05
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def _chunks(self):
+        for i in range(self.chunks):
+            time.sleep(self.delay)
+            yield FakeChunk(f"• **Tip {i}:** stay aware of your surroundings\n")
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        FakeStreamingModel.calls += 1
+        if stream:
+            return self._chunks()
+        return FakeChunk(''.join(chunk.text for chunk in self._chunks()))
+
+def parse_events(body):
+    events = []
+    for raw in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in raw.split('\n') if ': ' in line)
+        events.append((lines.get('event'), json.loads(lines['data'])))
+    return events
+
+def time_blocking(client, question):
+    start = time.perf_counter()
+    response = client.post('/chatbot', data={'user_input': question, 'conversation_history': '[]'})
+    elapsed = time.perf_counter() - start
+    assert response.get_json()['response']
+    return elapsed, elapsed
+
+def time_streaming(client, question):
+    start = time.perf_counter()
+    response = client.post('/chatbot/stream', data={'user_input': question, 'conversation_history': '[]'},
+                           buffered=False)
+    first = None
+    body = ''
+    for piece in response.response:
+        if first is None:
+            first = time.perf_counter() - start
+        body += piece.decode() if isinstance(piece, bytes) else piece
+    total = time.perf_counter() - start
+    events = parse_events(body)
+    assert events[-1][0] == 'done' and events[-1][1]['response'], 'stream must end with a done event'
+    assert events[-1][1]['source'] == 'model', events[-1][1]
+    assert len(events) == FakeStreamingModel.chunks + 1
+    return first, total
+
+def report(label, timings):
+    firsts = sorted(first for first, _ in timings)
+    totals = sorted(total for _, total in timings)
+    print(f"  {label:18s} first token p50 {firsts[len(firsts) // 2] * 1000:8.1f} ms   "
+          f"complete p50 {totals[len(totals) // 2] * 1000:8.1f} ms")
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    FakeStreamingModel.chunks = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    FakeStreamingModel.delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+    import google.generativeai as genai
+    genai.GenerativeModel = FakeStreamingModel
+    import app as hershield
+
+    client = hershield.app.test_client()
+    print(f"\n📊 {requests} requests, {FakeStreamingModel.chunks} chunks "
+          f"{FakeStreamingModel.delay * 1000:.0f} ms apart (distinct questions, so no cache hits)")
+    report('/chatbot', [time_blocking(client, f'Question {i}') for i in range(requests)])
+    report('/chatbot/stream', [time_streaming(client, f'Streamed question {i}') for i in range(requests)])
+
+    # The page falls back to /chatbot when a stream breaks off part way
+    calls = FakeStreamingModel.calls
+    form = {'user_input': 'Broken-off question', 'conversation_history': '[]'}
+    stream = client.post('/chatbot/stream', data=form, buffered=False)
+    next(iter(stream.response))
+    data = client.post('/chatbot', data=form).get_json()
+    stream.close()
+    assert data['source'] == 'model' and FakeStreamingModel.calls == calls + 1, 'the retry called the model again'
+    print("✅ Every stream ends with a model-sourced done event; a retry joins the call in flight")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serving the health tips, self-defense and latest articles pages.
+
+Calls the app's WSGI entry point directly as a logged-in user, the way
+a server worker does, so the numbers are the app's own cost. The old way is reproduced on a side route: the page's lists are built from
+Python literals and the template is rendered on every request. The new
+route is timed on a plain visit (cached HTML) and on a repeat visit that
+sends the ETag back (304). Checks that the cached HTML is byte-for-byte the
+old render and that a changed data file is picked up when templates reload.
+
+Usage: python benchmarks/bench_content_pages.py [requests]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.test import EnvironBuilder
+
+ROUTES = {'health_tips': '/health-tips', 'self_defense': '/self-defense', 'latest_articles': '/latest-articles'}
+
+def throughput(label, app, cookie, path, requests, headers=None, status=200):
+    environ = EnvironBuilder(path=path, headers=dict(headers or {}, Cookie=f'session={cookie}')).get_environ()
+    statuses = []
+
+    def start_response(status_line, response_headers):
+        statuses.append(status_line)
+
+    start = time.perf_counter()
+    sent = 0
+    for _ in range(requests):
+        sent += sum(map(len, app.wsgi_app(dict(environ), start_response)))
+    elapsed = time.perf_counter() - start
+    assert set(statuses) == {f'{status} {HTTP_STATUS_CODES[status].upper()}'}, f'{path}: {set(statuses)}'
+    print(f"  {label:34s} {requests / elapsed:8.0f} req/s   {sent / requests / 1024:6.1f} KiB/response")
+    return requests / elapsed
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.chdir(tempfile.mkdtemp())
+
+    import app as hershield
+    import content
+    from flask import render_template
+
+    # The old handlers: literal lists rebuilt and the template rendered on every request
+    literals = {}
+    for name, (_, data_file) in content.PAGES.items():
+        with open(os.path.join(content.CONTENT_DIR, data_file), encoding='utf-8') as f:
+            literals[name] = compile(repr(json.load(f)), f'<{name}>', 'eval')
+
+    @hershield.app.route('/bench/old/<name>')
+    def old_page(name):
+        return render_template(content.PAGES[name][0], **eval(literals[name]))
+
+    client = hershield.app.test_client()
+    client.post('/signup', data={'name': 'Bench', 'email': 'bench@example.com', 'phone': '+919800000000',
+                                 'password': 'bench-password', 'confirm_password': 'bench-password'})
+    client.post('/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+    cookie = client.get_cookie('session').value
+
+    for name, path in ROUTES.items():
+        old_html = client.get(f'/bench/old/{name}').data
+        response = client.get(path)
+        assert response.data == old_html, f'{path}: cached HTML differs from the old render'
+        etag = response.headers['ETag']
+        print(f"\n📊 {path}, {requests:,} requests ({len(old_html) / 1024:.1f} KiB page)")
+        old = throughput('Literals + render each time (old)', hershield.app, cookie, f'/bench/old/{name}', requests)
+        cached = throughput('Cached HTML', hershield.app, cookie, path, requests)
+        revalidated = throughput('Repeat visit, If-None-Match', hershield.app, cookie, path, requests,
+                                 {'If-None-Match': etag}, 304)
+        since = throughput('Repeat visit, If-Modified-Since', hershield.app, cookie, path, requests,
+                           {'If-Modified-Since': response.headers['Last-Modified']}, 304)
+        print(f"  {'Speed-up (cached / 304)':34s} {cached / old:7.1f}x / {min(revalidated, since) / old:.1f}x")
+
+    print("\n📊 Data file changed while templates reload")
+    hershield.app.jinja_env.auto_reload = True
+    data_path = os.path.join(content.CONTENT_DIR, 'latest_articles.json')
+    backup = data_path + '.bench'
+    shutil.copyfile(data_path, backup)
+    try:
+        etag = client.get('/latest-articles').headers['ETag']
+        with open(data_path, encoding='utf-8') as f:
+            data = json.load(f)
+        data['articles'][0]['title'] = 'Benchmark headline'
+        with open(data_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.utime(data_path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        response = client.get('/latest-articles', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and b'Benchmark headline' in response.data, 'the edit must be served'
+        assert response.headers['ETag'] != etag
+    finally:
+        shutil.move(backup, data_path)
+    print(f"  metrics: {content.content_metrics()}")
+    print("✅ Cached pages match the old render and a changed page is rendered again")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: radius, bounding-box and nearest-alert searches over many points.
+
+Seeds a scratch alerts.db with synthetic alerts clustered around cities,
+about 5% of them active. It compares the geohash searches in alert_queries
+with two full scans:
+- Parsing every alert's "lat,lon" text in Python, which was the only option
+  before coordinates were stored.
+- Filtering the numeric columns in SQL with the indexes switched off.
+
+Every search must return the same alerts as the full scan.
+
+Usage: python benchmarks/bench_geo.py [alerts] [queries]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = [(28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (22.57, 88.36), (13.08, 80.27),
+          (51.51, -0.13), (40.71, -74.01), (-33.87, 151.21), (35.68, 139.69), (-1.29, 36.82)]
+
+def random_point():
+    """A point near a city most of the time, anywhere on land-ish latitudes otherwise."""
+    if random.random() < 0.9:
+        latitude, longitude = random.choice(CITIES)
+        return latitude + random.gauss(0, 0.15), longitude + random.gauss(0, 0.15)
+    return random.uniform(-60, 70), random.uniform(-180, 180)
+
+def seed(conn, alerts):
+    import geo
+
+    print(f"🌱 Seeding {alerts:,} alerts...")
+    random.seed(5)
+    conn.execute('BEGIN')
+    for start in range(0, alerts, 50_000):
+        rows = []
+        for i in range(start, min(start + 50_000, alerts)):
+            latitude, longitude = random_point()
+            rows.append(('User', f'{latitude:.6f},{longitude:.6f}', 'active' if random.random() < 0.05 else 'resolved',
+                         1_700_000_000 + i, round(latitude, 6), round(longitude, 6),
+                         geo.encode(round(latitude, 6), round(longitude, 6))))
+        conn.executemany('''
+            INSERT INTO alerts (name, location, status, created_at, latitude, longitude, geohash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    conn.execute('COMMIT')
+    conn.execute('ANALYZE')
+
+def scan_text(conn, latitude, longitude, radius_m):
+    """The old way: read every active alert and parse its location text."""
+    from geo import haversine_m, parse_location
+
+    found = []
+    for row in conn.execute("SELECT id, location FROM alerts WHERE status = 'active'"):
+        point = parse_location(row['location'])
+        if point and haversine_m(latitude, longitude, *point) <= radius_m:
+            found.append(row['id'])
+    return sorted(found)
+
+def scan_numeric(conn, latitude, longitude, radius_m):
+    """Full table scan over the numeric columns, no index."""
+    from geo import haversine_m
+
+    rows = conn.execute("SELECT id, latitude, longitude FROM alerts NOT INDEXED WHERE status = 'active'")
+    return sorted(row['id'] for row in rows if haversine_m(latitude, longitude, row['latitude'], row['longitude'])
+                  <= radius_m)
+
+def scan_bbox(conn, south, north, west, east):
+    rows = conn.execute('''
+        SELECT id FROM alerts NOT INDEXED
+        WHERE status = 'active' AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+    ''', (south, north, west, east))
+    return sorted(row['id'] for row in rows)
+
+def scan_bbox_newest(conn, south, north, west, east, limit):
+    rows = conn.execute('''
+        SELECT id FROM alerts NOT INDEXED
+        WHERE status = 'active' AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        ORDER BY created_at DESC, id DESC LIMIT ?
+    ''', (south, north, west, east, limit))
+    return [row['id'] for row in rows]
+
+def scan_nearest(conn, latitude, longitude, k):
+    from geo import haversine_m
+
+    rows = conn.execute("SELECT id, latitude, longitude FROM alerts NOT INDEXED WHERE status = 'active'")
+    distances = sorted((haversine_m(latitude, longitude, row['latitude'], row['longitude']), row['id'])
+                       for row in rows)
+    return [alert_id for _, alert_id in distances[:k]]
+
+def timed(label, func, queries):
+    start = time.perf_counter()
+    results = [func(query) for query in queries]
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"  {label:34s} {elapsed:10.2f} ms/query")
+    return results, elapsed
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    os.chdir(tempfile.mkdtemp())
+
+    import alert_queries
+    from db import ALERTS_DB, connect
+    from migrations import migrate, ALERTS_MIGRATIONS
+
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS)
+    conn = connect(ALERTS_DB)
+    seed(conn, alerts)
+
+    random.seed(8)
+    centres = [random_point() for _ in range(queries)]
+    # A point out at sea, and one beside the antimeridian
+    centres[:2] = [(0.0, -140.0), (-16.5, 179.99)]
+
+    print(f"\n📊 Active alerts within 2 km, {alerts:,} alerts")
+    radius = [(latitude, longitude, 2000) for latitude, longitude in centres]
+    expected, _ = timed('Full scan, parse location text', lambda q: scan_text(conn, *q), radius[:3])
+    numeric, scan = timed('Full scan, numeric columns', lambda q: scan_numeric(conn, *q), radius)
+    indexed, fast = timed('Geohash index', lambda q: sorted(
+        alert['id'] for alert in alert_queries.alerts_within_radius(conn, *q, limit=10 ** 9)), radius)
+    assert expected == numeric[:3] and numeric == indexed, 'radius search results differ'
+    print(f"  {'Speed-up over numeric scan':34s} {scan / fast:10.0f}x")
+
+    print("\n📊 Active alerts in a 0.2° x 0.2° box")
+    boxes = [(latitude - 0.1, latitude + 0.1, longitude - 0.1, longitude + 0.1) for latitude, longitude in centres]
+    numeric, scan = timed('Full scan, numeric columns', lambda q: scan_bbox(conn, *q), boxes)
+    indexed, fast = timed('Geohash index', lambda q: sorted(
+        alert['id'] for alert in alert_queries.alerts_in_bbox(conn, *q, limit=10 ** 9)), boxes)
+    assert numeric == indexed, 'bounding-box search results differ'
+    print(f"  {'Speed-up over numeric scan':34s} {scan / fast:10.0f}x")
+
+    print("\n📊 Newest 20 active alerts in a 1° x 1° box")
+    boxes = [(latitude - 0.5, latitude + 0.5, longitude - 0.5, longitude + 0.5) for latitude, longitude in centres]
+    numeric, scan = timed('Full scan, numeric columns', lambda q: scan_bbox_newest(conn, *q, 20), boxes)
+    indexed, fast = timed('Geohash index, top 20 per range', lambda q: [
+        alert['id'] for alert in alert_queries.alerts_in_bbox(conn, *q, limit=20)], boxes)
+    assert numeric == indexed, 'newest-in-box results differ'
+    print(f"  {'Speed-up over numeric scan':34s} {scan / fast:10.0f}x")
+
+    print("\n📊 10 nearest active alerts")
+    numeric, scan = timed('Full scan, numeric columns', lambda q: scan_nearest(conn, *q, 10), centres)
+    indexed, fast = timed('Geohash index, growing radius', lambda q: [
+        alert['id'] for alert in alert_queries.nearest_alerts(conn, *q, k=10)], centres)
+    assert numeric == indexed, 'nearest-alert results differ'
+    print(f"  {'Speed-up over numeric scan':34s} {scan / fast:10.0f}x")
+
+    sql = "SELECT id FROM alerts WHERE status = 'active' AND geohash >= ? AND geohash < ?"
+    plan = ' | '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, ('tsq4', 'tsq5')))
+    print(f"  plan: {plan}")
+    conn.close()
+    print("✅ Geohash searches match the full scans")
+
+if __name__ == "__main__":
+    main()
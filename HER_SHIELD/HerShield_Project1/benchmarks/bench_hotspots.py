@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the hotspot tile pipeline.
+
+Seeds a scratch alerts.db with synthetic alerts clustered around cities
+over 90 days, then measures:
+- Binning: the vectorized bin_alerts() against a per-alert Python loop
+  over geo.encode().
+- The first full aggregation, with another connection inserting an alert
+  every 10 ms meanwhile (the longest insert shows how long /sos would
+  wait on the aggregation's write lock), and an incremental pass over new
+  alerts.
+- Two workers aggregating the same new alerts at once.
+- Viewport reads from alert_tiles against an ad-hoc GROUP BY over the
+  alerts in the same viewport (through the geohash index) and time range.
+
+Checks that the vectorized geohashes match geo.encode() and that every
+tile count matches the ad-hoc query, racing workers included.
+
+Usage: python benchmarks/bench_hotspots.py [alerts]
+"""
+
+import collections
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = [(28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (22.57, 88.36), (13.08, 80.27),
+          (51.51, -0.13), (40.71, -74.01), (-33.87, 151.21), (35.68, 139.69), (-1.29, 36.82)]
+START = 1_700_000_000
+
+def make_alerts(count, first_id):
+    import geo
+
+    rows = []
+    for i in range(count):
+        if random.random() < 0.9:
+            latitude, longitude = random.choice(CITIES)
+            latitude, longitude = latitude + random.gauss(0, 0.2), longitude + random.gauss(0, 0.2)
+        else:
+            latitude, longitude = random.uniform(-60, 70), random.uniform(-180, 180)
+        latitude, longitude = round(latitude, 6), round(longitude, 6)
+        rows.append((first_id + i, 'User', f'{latitude},{longitude}', 'resolved',
+                     START + random.uniform(0, 90 * 86400), latitude, longitude, geo.encode(latitude, longitude)))
+    return rows
+
+def insert(conn, rows):
+    conn.execute('BEGIN')
+    conn.executemany('''
+        INSERT INTO alerts (id, name, location, status, created_at, latitude, longitude, geohash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.execute('COMMIT')
+
+def python_bins(rows, precisions, granularities):
+    """The straightforward way: one geo.encode() and a few dict updates per alert."""
+    import geo
+
+    counts = collections.Counter()
+    for _, _, _, _, created_at, latitude, longitude, _ in rows:
+        geohash = geo.encode(latitude, longitude, max(precisions))
+        for granularity, width in granularities.items():
+            bucket = int(created_at // width) * width
+            for precision in precisions:
+                counts[(precision, granularity, geohash[:precision], bucket)] += 1
+    return counts
+
+def ad_hoc(conn, precision, south, north, west, east, since, until, tiles):
+    """Count the viewport's alerts per tile straight from the alerts table, through the geohash index."""
+    from geo import cover_bbox, prefix_ranges
+
+    counts = collections.Counter()
+    prefixes = sorted({prefix[:precision] for prefix in cover_bbox(south, north, west, east)})
+    for low, high in prefix_ranges(prefixes):
+        for row in conn.execute('''
+            SELECT substr(geohash, 1, ?) AS tile, COUNT(*) AS count FROM alerts
+            WHERE geohash >= ? AND geohash < ? AND created_at >= ? AND created_at < ?
+            GROUP BY tile
+        ''', (precision, low, high, since, until)):
+            if row['tile'] in tiles:
+                counts[row['tile']] += row['count']
+    return dict(counts)
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    os.chdir(tempfile.mkdtemp())
+
+    import hotspots
+    from db import ALERTS_DB, connect
+    from migrations import migrate, ALERTS_MIGRATIONS
+
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS)
+    conn = connect(ALERTS_DB)
+    random.seed(3)
+    print(f"🌱 Seeding {alerts:,} alerts...")
+    rows = make_alerts(alerts, 1)
+    insert(conn, rows)
+
+    sample = rows[:100_000]
+    latitudes = [row[5] for row in sample]
+    longitudes = [row[6] for row in sample]
+    codes = hotspots.geohash_codes(latitudes, longitudes, 9)
+    assert hotspots.codes_to_geohashes(codes, 9).tolist() == [row[7] for row in sample], \
+        'vectorized geohashes differ from geo.encode()'
+
+    print(f"\n📊 Binning {len(sample):,} alerts into {len(hotspots.precisions)} precisions x hour/day")
+    start = time.perf_counter()
+    expected = python_bins(sample, hotspots.precisions, hotspots.GRANULARITIES)
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    binned = hotspots.bin_alerts(latitudes, longitudes, [row[4] for row in sample])
+    vectorized = time.perf_counter() - start
+    assert {row[:4]: row[4] for row in binned} == expected, 'vectorized bins differ from the Python loop'
+    print(f"  {'Python loop over geo.encode()':32s} {loop * 1000:10.0f} ms")
+    print(f"  {'NumPy bin_alerts()':32s} {vectorized * 1000:10.0f} ms   ({loop / vectorized:.0f}x)")
+
+    print(f"\n📊 Aggregation into alert_tiles ({hotspots.chunk_size:,} alerts per chunk)")
+    next_id = alerts + 1
+    waits = []
+    done = threading.Event()
+
+    def raise_alerts():
+        nonlocal next_id
+        writer = connect(ALERTS_DB)
+        while not done.is_set():
+            start = time.perf_counter()
+            insert(writer, make_alerts(1, next_id))
+            waits.append(time.perf_counter() - start)
+            next_id += 1
+            time.sleep(0.01)
+        writer.close()
+
+    thread = threading.Thread(target=raise_alerts)
+    thread.start()
+    start = time.perf_counter()
+    hotspots.aggregate_pending(conn)
+    elapsed = time.perf_counter() - start
+    done.set()
+    thread.join()
+    print(f"  {f'First pass, {alerts:,} alerts':32s} {elapsed:10.2f} s")
+    print(f"  {f'Alert inserts meanwhile ({len(waits)})':32s} {max(waits) * 1000:10.1f} ms longest")
+    insert(conn, make_alerts(1000, next_id))
+    next_id += 1000
+    start = time.perf_counter()
+    hotspots.aggregate_pending(conn)
+    print(f"  {'Incremental pass, 1,000 alerts':32s} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    insert(conn, make_alerts(20_000, next_id))
+
+    def race():
+        racer = connect(ALERTS_DB)
+        hotspots.aggregate_pending(racer, 1000)
+        racer.close()
+
+    racers = [threading.Thread(target=race) for _ in range(2)]
+    for racer in racers:
+        racer.start()
+    for racer in racers:
+        racer.join()
+    print(f"  {'Two workers, 20,000 alerts':32s} {'counted once':>10s}")
+    tiles = conn.execute('SELECT COUNT(*) FROM alert_tiles').fetchone()[0]
+    print(f"  {'Tile rows stored':32s} {tiles:10,}")
+
+    print("\n📊 Viewport reads, 30 days")
+    viewports = [('City, 1° x 1°', (28.1, 29.1, 76.7, 77.7)),
+                 ('Region, 8° x 8°', (15.0, 23.0, 70.0, 78.0)),
+                 ('Hour view, city', (28.1, 29.1, 76.7, 77.7))]
+    for label, box in viewports:
+        granularity = 'hour' if label.startswith('Hour') else 'day'
+        # Tiles count whole buckets, so compare on day boundaries
+        since = (START // 86400 + 30) * 86400
+        until = since + 30 * 86400
+        precision = hotspots.choose_precision(*box)
+        start = time.perf_counter()
+        for _ in range(20):
+            result = hotspots.read_tiles(conn, *box, granularity, since, until)
+        read = (time.perf_counter() - start) / 20 * 1000
+        counts = {tile['tile']: tile['count'] for tile in result['tiles']}
+        start = time.perf_counter()
+        direct = ad_hoc(conn, precision, *box, since, until, counts)
+        direct_ms = (time.perf_counter() - start) * 1000
+        assert counts == direct, f'{label}: tile counts differ from the alerts table'
+        print(f"  {label:20s} precision {precision}, {len(counts):5d} tiles   "
+              f"ad hoc {direct_ms:8.1f} ms   tiles {read:6.2f} ms   ({direct_ms / read:.0f}x)")
+    conn.close()
+    print("✅ Tile counts match the alerts table")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: route queries before and after the index migrations.
+
+Seeds scratch copies of users.db and alerts.db at the baseline schema,
+times each route's query and prints its query plan, then applies the
+remaining migrations and repeats.
+
+Usage: python benchmarks/bench_indexes.py [users] [alerts]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = [
+    ('sos / update_location / emergency_contacts', 'users',
+     'SELECT * FROM emergency_contacts WHERE user_id = ? ORDER BY priority', lambda n: (random.randrange(n),)),
+    ('chatbot history', 'users',
+     'SELECT user_input, ai_response, timestamp FROM conversation_history WHERE user_id = ? '
+     'ORDER BY timestamp DESC LIMIT 5', lambda n: (random.randrange(n),)),
+    ('admin (first page)', 'alerts',
+     'SELECT * FROM alerts ORDER BY timestamp DESC LIMIT 50', lambda n: ()),
+    ('update_location', 'alerts',
+     "UPDATE alerts SET location = location WHERE user_id = ? AND status = 'active'", lambda n: (random.randrange(n),)),
+]
+
+def seed(users_conn, alerts_conn, users, alerts):
+    print(f"🌱 Seeding {users} users and {alerts} alerts...")
+    users_conn.execute('BEGIN')
+    users_conn.executemany('INSERT INTO users (id, name, email, phone, password) VALUES (?, ?, ?, ?, ?)',
+                           ((i, f'User {i}', f'user{i}@example.com', '9876543210', 'x') for i in range(users)))
+    users_conn.executemany('INSERT INTO emergency_contacts (user_id, name, phone, relationship, priority) '
+                           'VALUES (?, ?, ?, ?, ?)',
+                           ((i % users, f'Contact {i}', '9876543211', 'Friend', i % 3 + 1) for i in range(users * 3)))
+    users_conn.executemany('INSERT INTO conversation_history (user_id, user_input, ai_response, timestamp) '
+                           'VALUES (?, ?, ?, ?)',
+                           ((random.randrange(users), 'question', 'answer', f'2024-01-01 00:{i % 60:02d}:{i % 59:02d}')
+                            for i in range(users * 5)))
+    users_conn.execute('COMMIT')
+
+    alerts_conn.execute('BEGIN')
+    alerts_conn.executemany('INSERT INTO alerts (user_id, name, location, timestamp, status, priority) '
+                            'VALUES (?, ?, ?, ?, ?, ?)',
+                            ((random.randrange(users), 'User', '28.61,77.20', 1700000000 + i,
+                              'active' if i % 50 == 0 else 'resolved', 'high') for i in range(alerts)))
+    alerts_conn.execute('COMMIT')
+
+def run(label, connections, users, repeats=200):
+    print(f"\n📊 {label}")
+    for name, database, sql, params in QUERIES:
+        conn = connections[database]
+        plan = ' | '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params(users)))
+        start = time.perf_counter()
+        for _ in range(repeats):
+            conn.execute(sql, params(users)).fetchall()
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        print(f"  {name:45s} {elapsed:9.3f} ms   {plan}")
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    alerts = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    os.chdir(tempfile.mkdtemp())
+
+    from db import USERS_DB, ALERTS_DB, connect
+    from migrations import migrate, USERS_MIGRATIONS, ALERTS_MIGRATIONS
+
+    migrate(USERS_DB, USERS_MIGRATIONS, target=1)
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS, target=1)
+    connections = {'users': connect(USERS_DB), 'alerts': connect(ALERTS_DB)}
+    seed(connections['users'], connections['alerts'], users, alerts)
+
+    run('Baseline schema (no indexes)', connections, users, repeats=5)
+
+    start = time.perf_counter()
+    migrate(USERS_DB, USERS_MIGRATIONS)
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS)
+    print(f"\n⏱️ Index migrations took {time.perf_counter() - start:.1f} s")
+    for conn in connections.values():
+        conn.execute('ANALYZE')
+
+    run('After migrations', connections, users)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: keyword routing for suggestions and fallback answers.
+
+Runs a corpus of synthetic chat messages through the old per-call keyword
+scans (lists and the fallback dict rebuilt on every call, one substring
+test per keyword) and through the precompiled classifier shared by both,
+then reports throughput and how often the two pick different categories.
+Differences come from the word-boundary rule ("work" no longer matches
+"homework"); a sample is printed. Also checks that every urgent phrase,
+which skips the model, gets the emergency answer, and that a set of
+messages only sharing a phrase's first word(s) are not urgent.
+
+Usage: python benchmarks/bench_intents.py [messages]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import (classify, is_emergency, suggestions_for, fallback_for, FALLBACK_RESPONSES, GENERAL_FALLBACK,
+                     SUGGESTIONS, GENERAL_SUGGESTIONS, URGENT_KEYWORDS)
+
+WORDS = ('how do i stay safe when i travel alone at night my partner is controlling me what are my '
+         'legal rights at work i feel anxious and stressed before exams can you suggest a healthy diet '
+         'someone is following me on the bus i need help with my homework and career plans tips for '
+         'building confidence at a job interview the metro is crowded what about self-defense classes '
+         'my boyfriend and i argue about marriage i am scared of the dark lane near my house is there '
+         'a lawyer who handles harassment cases my doctor said i should exercise more').split()
+
+# Messages that start like an urgent phrase but are not one
+NOT_URGENT = ['Tips for following medical advice', 'How do I start following meditation?',
+              'I am in dangerous traffic every day, any tips?', 'Is he threatening menace or just talk?', "I'm not safer on the bus than in a cab, am I?"]
+
+def legacy_suggestions(user_input, ai_response):
+    suggestions = []
+    user_lower = user_input.lower()
+    response_lower = ai_response.lower()
+    if any(keyword in user_lower for keyword in ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe']):
+        suggestions.extend(list(SUGGESTIONS['emergency']))
+    elif any(keyword in user_lower for keyword in ['safety', 'safe', 'protect', 'security']):
+        suggestions.extend(list(SUGGESTIONS['safety']))
+    elif any(keyword in user_lower for keyword in ['health', 'healthy', 'wellness', 'medical', 'doctor']):
+        suggestions.extend(list(SUGGESTIONS['health']))
+    elif any(keyword in user_lower for keyword in ['relationship', 'dating', 'partner', 'marriage']):
+        suggestions.extend(list(SUGGESTIONS['relationship']))
+    elif any(keyword in user_lower for keyword in ['career', 'job', 'work', 'profession']):
+        suggestions.extend(list(SUGGESTIONS['career']))
+    else:
+        if 'safety' in response_lower:
+            suggestions.append("More safety tips")
+        if 'health' in response_lower:
+            suggestions.append("Health and wellness resources")
+        if 'confidence' in response_lower:
+            suggestions.append("Building self-confidence")
+        if 'legal' in response_lower:
+            suggestions.append("Legal rights and resources")
+    suggestions.extend(list(GENERAL_SUGGESTIONS))
+    return list(dict.fromkeys(suggestions))[:4]
+
+def legacy_fallback(user_input, history):
+    user_lower = user_input.lower()
+    fallback_responses = {category: text for category, text in FALLBACK_RESPONSES.items()}
+    emergency_keywords = ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe', 'scared', 'fear']
+    if any(keyword in user_lower for keyword in emergency_keywords):
+        return fallback_responses['emergency']
+    category_keywords = {
+        'safety': ['safety', 'safe', 'protect', 'security', 'secure', 'dangerous', 'unsafe'],
+        'self defense': ['self defense', 'self-defense', 'defend', 'fight', 'protect', 'martial arts', 'attack'],
+        'health': ['health', 'healthy', 'wellness', 'medical', 'doctor', 'exercise', 'diet', 'sick', 'pain'],
+        'confidence': ['confidence', 'confident', 'self-esteem', 'self worth', 'empowerment', 'shy', 'nervous'],
+        'mental': ['mental health', 'mental', 'anxiety', 'depression', 'stress', 'therapy', 'sad', 'worried'],
+        'legal': ['legal', 'rights', 'law', 'lawyer', 'court', 'harassment', 'discrimination', 'abuse'],
+        'transport': ['transport', 'bus', 'train', 'metro', 'travel', 'commute', 'public transport', 'traveling'],
+        'relationship': ['relationship', 'dating', 'marriage', 'partner', 'boyfriend', 'girlfriend', 'love', 'breakup'],
+        'career': ['career', 'job', 'work', 'profession', 'business', 'employment', 'salary', 'promotion']
+    }
+    for category, keywords in category_keywords.items():
+        if any(keyword in user_lower for keyword in keywords):
+            return fallback_responses.get(category, fallback_responses['safety'])
+    return GENERAL_FALLBACK
+
+def corpus(size):
+    random.seed(11)
+    return [' '.join(random.choices(WORDS, k=random.randint(3, 14))).capitalize() + '?' for _ in range(size)]
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    messages = corpus(size)
+    answer = 'Here are some safety and health tips to build confidence.'
+
+    start = time.perf_counter()
+    legacy = [(legacy_suggestions(m, answer), legacy_fallback(m, [])) for m in messages]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    routed = []
+    for m in messages:
+        intents = classify(m)
+        routed.append((suggestions_for(intents, answer), fallback_for(intents)))
+    new_time = time.perf_counter() - start
+
+    differing = [m for m, old, new in zip(messages, legacy, routed) if old != new]
+    print(f"\n📊 {size} messages")
+    print(f"  {'Per-call keyword scans':26s} {legacy_time:6.2f} s   {size / legacy_time:10.0f} msg/s")
+    print(f"  {'Precompiled classifier':26s} {new_time:6.2f} s   {size / new_time:10.0f} msg/s")
+    print(f"  Routing differs for {len(differing)} messages ({len(differing) / size:.2%}), e.g.:")
+    for message in differing[:3]:
+        print(f"    {message}")
+
+    for phrase in URGENT_KEYWORDS:
+        message = f"Please, {phrase} right now"
+        intents = classify(message)
+        assert is_emergency(intents), message
+        assert fallback_for(intents) == FALLBACK_RESPONSES['emergency'], f'{message!r} gets no emergency answer'
+        assert suggestions_for(intents, '')[0] == SUGGESTIONS['emergency'][0], message
+    for message in NOT_URGENT:
+        assert not is_emergency(classify(message)), f'{message!r} is not urgent'
+    print(f"✅ All {len(URGENT_KEYWORDS)} urgent phrases get the emergency answer; "
+          f"{len(NOT_URGENT)} look-alike messages go to the model")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: location-update SMS volume over long SOS incidents.
+
+Replays synthetic GPS traces (standing still with GPS jitter, walking,
+driving, and a mix of the three) through the location SMS coalescer
+against a scratch alerts.db. Counts the SMS it would send to three
+contacts. Before the coalescer, the 30-second update loop texted every
+contact on every tick. The script also checks that no number went over the
+hourly cap and that every SMS was either a move of the minimum distance or
+a heartbeat. Finally it checks that a position held back by the minimum gap
+is still texted when the phone stops reporting.
+
+Usage: python benchmarks/bench_location_sms.py [hours] [fix_interval_seconds]
+"""
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+START = (28.6139, 77.2090)
+
+def offset(position, metres, heading):
+    """Move ``metres`` from ``position`` in direction ``heading`` (radians)."""
+    latitude, longitude = position
+    latitude += metres * math.cos(heading) / 111320
+    longitude += metres * math.sin(heading) / (111320 * math.cos(math.radians(latitude)))
+    return latitude, longitude
+
+def trace(kind, duration, interval, seed):
+    """Yield (seconds, latitude, longitude) fixes for one synthetic incident."""
+    random.seed(seed)
+    position, heading = START, random.uniform(0, 2 * math.pi)
+    for step in range(int(duration / interval)):
+        seconds = step * interval
+        if kind == 'mixed':
+            # Walk 10 min, wait 20 min, drive 15 min, wait 15 min, repeat
+            phase = seconds % 3600
+            speed = 1.4 if phase < 600 else 0 if phase < 1800 else 12 if phase < 2700 else 0
+        else:
+            speed = {'stationary': 0, 'walking': 1.4, 'driving': 12}[kind]
+        heading += random.gauss(0, 0.2)
+        position = offset(position, speed * interval, heading)
+        # Typical phone GPS noise
+        noisy = offset(position, abs(random.gauss(0, 15)), random.uniform(0, 2 * math.pi))
+        yield seconds, noisy[0], noisy[1]
+
+def replay(conn, coalescer, alert_id, kind, duration, interval, contacts):
+    start_time = 1_700_000_000.0 + alert_id * 100_000
+    coalescer.start_alert(conn, alert_id, START[0], START[1], now=start_time)
+    last = (START[0], START[1], start_time)
+    sends = []
+    for seconds, latitude, longitude in trace(kind, duration, interval, alert_id):
+        now = start_time + seconds
+        decision, _ = coalescer.check_fix(conn, alert_id, latitude, longitude, now=now)
+        if decision not in ('moved', 'heartbeat'):
+            continue
+        assert now - last[2] >= coalescer.min_interval, 'updates closer together than min_interval'
+        assert (decision == 'heartbeat' or
+                coalescer.haversine_m(last[0], last[1], latitude, longitude) >= coalescer.min_distance_m)
+        last = (latitude, longitude, now)
+        for number in coalescer.claim_recipients(conn, contacts, now=now):
+            sends.append((number, now))
+    for number in contacts:
+        times = sorted(sent_at for to_number, sent_at in sends if to_number == number)
+        for i, sent_at in enumerate(times):
+            in_hour = sum(1 for other in times[i:] if other - sent_at < 3600)
+            assert in_hour <= coalescer.hourly_cap, f'{number} got {in_hour} updates in an hour'
+    return len(sends)
+
+def check_held_position(conn, coalescer):
+    """The phone reports a big move too soon after the last SMS, then goes silent.
+
+    Its clock runs a day fast, which must not make the fix look due.
+    """
+    conn.execute("INSERT INTO alerts (id, user_id, name, location, status) VALUES (99, 7, 'Bench', '', 'active')")
+    start_time = 1_800_000_000.0
+    coalescer.start_alert(conn, 99, START[0], START[1], now=start_time, tracking_url='https://example.com/track/t')
+    moved = offset(START, 2 * coalescer.min_distance_m, 0)
+    device_time = start_time + 10 + 86400
+    decision, _ = coalescer.check_fix(conn, 99, moved[0], moved[1], recorded_at=device_time, now=start_time + 10)
+    assert decision == 'too_soon', decision
+    assert coalescer.due_updates(conn, now=start_time + coalescer.min_interval - 1) == [], 'sent before the gap'
+    updates = coalescer.due_updates(conn, now=start_time + coalescer.min_interval)
+    assert [(u['alert_id'], u['latitude'], u['longitude']) for u in updates] == [(99, moved[0], moved[1])], updates
+    assert updates[0]['recorded_at'] == device_time and updates[0]['user_id'] == 7
+    assert coalescer.due_updates(conn, now=start_time + 3600) == [], 'a held position is texted once'
+    print(f"  held position texted {coalescer.min_interval:g} s after the last SMS, "
+          f"{updates[0]['distance_m']:.0f} m from it")
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    os.chdir(tempfile.mkdtemp())
+
+    import location_coalescer as coalescer
+    from db import connect, ALERTS_DB
+    from migrations import migrate, ALERTS_MIGRATIONS
+
+    migrate(ALERTS_DB, ALERTS_MIGRATIONS)
+    conn = connect(ALERTS_DB)
+    duration = hours * 3600
+    legacy = int(duration / 30) * 3
+    print(f"\n📊 {hours:g} h incidents, a fix every {interval:g} s, 3 contacts "
+          f"(min {coalescer.min_distance_m:g} m / {coalescer.min_interval:g} s, "
+          f"heartbeat {coalescer.heartbeat_interval:g} s, cap {coalescer.hourly_cap}/h)")
+    print(f"  {'Trace':12s} {'30 s polling':>14s} {'Coalesced':>10s} {'Saved':>8s} {'ms/fix':>8s}")
+    for alert_id, kind in enumerate(['stationary', 'walking', 'driving', 'mixed'], start=1):
+        # Each trace texts different numbers so the hourly cap is per trace
+        contacts = [f'+91{alert_id}{i:09d}' for i in range(3)]
+        started = time.perf_counter()
+        sent = replay(conn, coalescer, alert_id, kind, duration, interval, contacts)
+        per_fix = (time.perf_counter() - started) / (duration / interval) * 1000
+        print(f"  {kind:12s} {legacy:14d} {sent:10d} {1 - sent / legacy:8.1%} {per_fix:8.2f}")
+    check_held_position(conn, coalescer)
+    conn.close()
+    print("✅ Every update respected the distance/heartbeat rule, the minimum gap and the hourly cap")
+    print(f"  {coalescer.location_sms_metrics()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SOS latency while other users are logging in.
+
+Starts the app under gunicorn with one gevent worker, as the Procfile does,
+against a local fake Twilio server. One client presses SOS every
+``interval`` seconds while several others log in back to back. This runs
+three times: with no logins, with password checks inline on the event loop
+(PASSWORD_HASH_THREADS=0, the old behaviour) and with checks on the native
+thread pool. Also checks that a user whose hash predates the current cost
+policy is rehashed on login.
+
+Usage: python benchmarks/bench_login_hashing.py [login_clients] [seconds]
+"""
+
+import datetime
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_twilio import start_fake_twilio
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'bench-password'
+METRICS_TOKEN = 'bench-metrics'
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(twilio_url, threads):
+    """Run gunicorn in a scratch directory; returns (process, base URL, directory)."""
+    workdir = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(os.environ, TWILIO_API_BASE_URL=twilio_url, GEMINI_API_KEY='bench', SOS_DEDUPE_WINDOW='0',
+               PASSWORD_HASH_THREADS=str(threads), SECRET_KEY='bench', METRICS_TOKEN=METRICS_TOKEN,
+               # Every client logs in from 127.0.0.1 as fast as it can; that is the load, not an attack
+               RATE_LIMIT_LOGIN_IP='0/1', RATE_LIMIT_LOGIN_EMAIL='0/1', RATE_LIMIT_SIGNUP_IP='0/1')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app', '--worker-class', 'gevent',
+                                '--workers', '1', '--bind', f'127.0.0.1:{port}', '--chdir', workdir,
+                                '--pythonpath', PROJECT_DIR], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        try:
+            requests.get(f'{base_url}/login', timeout=1)
+            return process, base_url, workdir
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('gunicorn did not start')
+
+def signed_in(base_url, email):
+    client = requests.Session()
+    client.post(f'{base_url}/signup', data={'name': email.split('@')[0], 'email': email, 'phone': '+919800000000',
+                                            'password': PASSWORD, 'confirm_password': PASSWORD})
+    client.post(f'{base_url}/login', data={'email': email, 'password': PASSWORD})
+    return client
+
+def run(label, twilio_url, threads, login_clients, seconds, interval=0.2):
+    process, base_url, workdir = start_server(twilio_url, threads)
+    try:
+        sos_client = signed_in(base_url, 'sos@example.com')
+        sos_client.post(f'{base_url}/emergency-contacts', data={'name': 'Contact', 'phone': '+919876543210',
+                                                                'relationship': 'Friend', 'priority': '1'})
+        for i in range(login_clients):
+            signed_in(base_url, f'login{i}@example.com')
+
+        stop = threading.Event()
+        logins = []
+
+        def log_in(i):
+            client = requests.Session()
+            while not stop.is_set():
+                response = client.post(f'{base_url}/login', allow_redirects=False,
+                                       data={'email': f'login{i}@example.com', 'password': PASSWORD})
+                assert response.status_code == 302, response.status_code
+                logins.append(1)
+
+        workers = [threading.Thread(target=log_in, args=(i,)) for i in range(login_clients)]
+        for worker in workers:
+            worker.start()
+        latencies = []
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            start = time.perf_counter()
+            # A distinct timestamp per press keeps each SOS's outbox messages apart
+            response = sos_client.post(f'{base_url}/sos', json={
+                'location': {'latitude': 28.6139, 'longitude': 77.2090},
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()})
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - start)
+            time.sleep(interval)
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        latencies.sort()
+        p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+        print(f"  {label:34s} SOS p50 {p50 * 1000:6.0f} ms   p95 {p95 * 1000:6.0f} ms   "
+              f"max {latencies[-1] * 1000:6.0f} ms   logins {len(logins) / seconds:5.1f}/s")
+        metrics = sos_client.get(f'{base_url}/metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'}).json()['passwords']
+        return p95, metrics, base_url, workdir, process
+    except BaseException:
+        process.kill()
+        raise
+
+def check_rehash(base_url, workdir):
+    """A user stored under an older PBKDF2 policy gets a current hash on their next login."""
+    old_hash = generate_password_hash(PASSWORD, 'pbkdf2:sha256:260000')
+    conn = sqlite3.connect(os.path.join(workdir, 'database', 'users.db'))
+    conn.execute("INSERT INTO users (name, email, phone, password) "
+                 "VALUES ('Old', 'old@example.com', '+919800000000', ?)", (old_hash,))
+    conn.commit()
+    response = requests.post(f'{base_url}/login', allow_redirects=False,
+                             data={'email': 'old@example.com', 'password': PASSWORD})
+    assert response.status_code == 302, 'the old hash must still verify'
+    new_hash = conn.execute("SELECT password FROM users WHERE email = 'old@example.com'").fetchone()[0]
+    conn.close()
+    assert new_hash.startswith('pbkdf2:sha256:600000$') and new_hash != old_hash, new_hash
+    response = requests.post(f'{base_url}/login', allow_redirects=False,
+                             data={'email': 'old@example.com', 'password': PASSWORD})
+    assert response.status_code == 302, 'the new hash must verify'
+    print(f"  {new_hash.split('$')[0]} replaced pbkdf2:sha256:260000 on login")
+
+def main():
+    login_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    server = start_fake_twilio(0.05)
+
+    print(f"\n📊 SOS every 200 ms for {seconds:.0f} s, one gevent worker")
+    results = []
+    for label, threads, clients in [('No logins', 2, 0),
+                                    (f'{login_clients} clients logging in, inline (old)', 0, login_clients),
+                                    (f'{login_clients} clients logging in, thread pool', 2, login_clients)]:
+        p95, metrics, base_url, workdir, process = run(label, server.base_url, threads, clients, seconds)
+        results.append(p95)
+        # The thread pool server stays up for the rehash check
+        if len(results) < 3:
+            process.terminate()
+            process.wait()
+    idle, inline, pooled = results
+    print(f"  {'SOS p95 under login load':34s} {inline * 1000:.0f} ms inline -> {pooled * 1000:.0f} ms offloaded "
+          f"(idle {idle * 1000:.0f} ms)")
+    print(f"  metrics: {metrics}")
+    assert pooled < inline, 'offloading must keep SOS responsive during logins'
+
+    print("\n📊 Rehash on login")
+    try:
+        check_rehash(base_url, workdir)
+    finally:
+        process.terminate()
+        process.wait()
+    server.shutdown()
+    print("✅ Logins no longer stall SOS requests")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chatbot markdown rendering, regex chain versus single pass.
+
+Checks the renderer against golden outputs, against the old
+process_markdown_response() on every offline answer and a random corpus,
+and fed in small pieces as a stream would be. Then measures throughput on
+answers the size of a 2,048-token model response.
+
+Usage: python benchmarks/bench_markdown.py [answers]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import FALLBACK_RESPONSES, GENERAL_FALLBACK
+from markdown_renderer import MarkdownRenderer, render_markdown
+
+GOLDEN = [
+    ('', ''),
+    ('Hello\nworld', 'Hello<br>world'),
+    ('**Bold** and *italic* text', '<strong>Bold</strong> and <em>italic</em> text'),
+    ('Intro:\n• one\n• **two**\nDone', 'Intro:<br><ul><br><li>one</li><br><li><strong>two</strong></li><br></ul><br>Done'),
+    ('1. First\n2.Second', '<ul><br><li>1. First</li><br><li>2. Second</li><br></ul>'),
+    ('• a\n\n• b', '<ul><br><li>a</li><br></ul><br><br><ul><br><li>b</li><br></ul>'),
+    # A marker on its own takes the next non-blank line, as the old regexes did
+    ('•\n\nLate item', '<ul><br><li>Late item</li><br></ul>'),
+    ('Tips\n', 'Tips<br>'),
+    # Untrusted text is escaped
+    ('<script>alert(1)</script> & **<b>**', '&lt;script&gt;alert(1)&lt;/script&gt; &amp; <strong>&lt;b&gt;</strong>'),
+    # Indented items nest inside the item above them
+    ('• Parent\n  • Child\n  • Child 2\n• Next',
+     '<ul><br><li>Parent<br><ul><br><li>Child</li><br><li>Child 2</li><br></ul></li><br><li>Next</li><br></ul>'),
+    ('1. Step\n   • detail\nAfter',
+     '<ul><br><li>1. Step<br><ul><br><li>detail</li><br></ul></li><br></ul><br>After'),
+]
+
+def legacy_process_markdown_response(response_text):
+    """process_markdown_response() as it was before the single-pass renderer."""
+    response_text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', response_text)
+    response_text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', response_text)
+    response_text = re.sub(r'^•\s*(.*?)$', r'<li>\1</li>', response_text, flags=re.MULTILINE)
+    response_text = re.sub(r'^(\d+)\.\s*(.*?)$', r'<li>\1. \2</li>', response_text, flags=re.MULTILINE)
+    lines = response_text.split('\n')
+    processed_lines = []
+    in_list = False
+    for line in lines:
+        if line.strip().startswith('<li>'):
+            if not in_list:
+                processed_lines.append('<ul>')
+                in_list = True
+            processed_lines.append(line)
+        elif in_list and not line.strip().startswith('<li>'):
+            processed_lines.append('</ul>')
+            in_list = False
+            processed_lines.append(line)
+        else:
+            processed_lines.append(line)
+    if in_list:
+        processed_lines.append('</ul>')
+    response_text = '\n'.join(processed_lines)
+    return response_text.replace('\n', '<br>')
+
+def escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+# Outside what the old function handled: indented items, and a bare number
+# marker followed by a bullet (the old chain nested <li> tags there)
+OUT_OF_SCOPE = re.compile(r'^[ \t]+(•|\d+\.)|^\d+\.\s*•', re.MULTILINE)
+
+def random_corpus(size):
+    random.seed(5)
+    pieces = ['• ', '1. ', '**', '*', 'word ', ' ', '\n', '\n\n', '2.', 'text', '•', '  ', '\t']
+    return [''.join(random.choice(pieces) for _ in range(random.randint(0, 20))) for _ in range(size)]
+
+def long_answer(seed):
+    random.seed(seed)
+    sections = []
+    for _ in range(12):
+        sections.append(f"**Section {random.randint(1, 99)}:**")
+        sections.extend(f"• **Point {i}**: keep your phone charged and share your *live* location with trusted contacts"
+                        for i in range(random.randint(3, 6)))
+        sections.extend(f"{i}. Call 100 if you are in immediate danger" for i in range(1, 3))
+        sections.append("Stay alert, trust your instincts, and remember that help is always available. 💪\n")
+    return '\n'.join(sections)
+
+def check():
+    for text, expected in GOLDEN:
+        assert render_markdown(text) == expected, f"golden mismatch for {text!r}: {render_markdown(text)!r}"
+
+    checked = 0
+    for text in list(FALLBACK_RESPONSES.values()) + [GENERAL_FALLBACK] + random_corpus(20_000):
+        if OUT_OF_SCOPE.search(text):
+            continue
+        assert render_markdown(text) == legacy_process_markdown_response(escape(text)), f"parity mismatch for {text!r}"
+        checked += 1
+
+    for text in random_corpus(2_000) + [long_answer(1)]:
+        renderer = MarkdownRenderer()
+        for start in range(0, len(text), 7):
+            renderer.feed(text[start:start + 7])
+            renderer.html()
+        assert renderer.close() == render_markdown(text), f"incremental mismatch for {text!r}"
+    print(f"✅ {len(GOLDEN)} golden outputs, {checked} parity cases and incremental rendering all match")
+
+def main():
+    answers = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    check()
+
+    texts = [long_answer(i) for i in range(answers)]
+    size = sum(len(text) for text in texts) / len(texts)
+    print(f"\n📊 {answers} answers of ~{size / 1024:.1f} KiB")
+    for label, func in [('Regex chain (old)', legacy_process_markdown_response), ('Single pass', render_markdown)]:
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:20s} {elapsed / answers * 1e6:8.1f} µs/answer   "
+              f"{answers * size / elapsed / 1024 / 1024:6.1f} MiB/s")
+
+    text = long_answer(0)
+    chunks = [text[start:start + 40] for start in range(0, len(text), 40)]
+    for label, render in [('Re-render per chunk', None), ('Incremental', MarkdownRenderer())]:
+        start = time.perf_counter()
+        received = ''
+        for chunk in chunks:
+            received += chunk
+            if render:
+                render.feed(chunk)
+                render.html()
+            else:
+                legacy_process_markdown_response(received)
+        print(f"  {label:20s} {(time.perf_counter() - start) * 1000:8.1f} ms for a {len(chunks)}-chunk stream")
+
+if __name__ == "__main__":
+    main()
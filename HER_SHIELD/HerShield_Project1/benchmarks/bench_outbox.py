@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SMS outbox enqueue and drain throughput.
+
+Queues a mix of SOS, location and confirmation messages into a scratch
+outbox, drains it through the background worker against a local fake
+Twilio server and checks that SOS messages were claimed for sending first.
+Then raises an SOS for three contacts: one whose alert fails twice before
+going through, and one with a number Twilio rejects. Checks that no
+follow-up is sent before its alert, and that the rejected alert and its
+follow-up are dead-lettered after a single attempt.
+
+Usage: python benchmarks/bench_outbox.py [messages] [latency_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_twilio import start_fake_twilio
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    server = start_fake_twilio(latency)
+    os.environ['TWILIO_API_BASE_URL'] = server.base_url
+    os.chdir(tempfile.mkdtemp())
+
+    import sms_outbox
+    from migrations import migrate, OUTBOX_MIGRATIONS
+
+    migrate(sms_outbox.OUTBOX_DB, OUTBOX_MIGRATIONS)
+    priorities = [sms_outbox.PRIORITY_CONFIRMATION, sms_outbox.PRIORITY_LOCATION, sms_outbox.PRIORITY_SOS]
+
+    print(f"🧪 {count} messages, {latency * 1000:.0f} ms stub latency, "
+          f"{sms_outbox.max_workers} concurrent sends")
+
+    # Hold the worker back until everything is queued so priority ordering is visible
+    sms_outbox._worker_pid = os.getpid()
+    sms_outbox._worker = object()
+    start = time.perf_counter()
+    ids = [sms_outbox.enqueue_sms(f'+9198765{i:05d}', f'Bench message {i}', priorities[i % 3], f'bench:{i}')
+           for i in range(count)]
+    enqueue = time.perf_counter() - start
+    print(f"📥 Enqueue: {count / enqueue:10.0f} msg/s")
+
+    # Claim order is what priority decides; send completion order also depends on the network
+    claimed = []
+    claim_batch = sms_outbox._claim_batch
+
+    def recording_claim(conn, limit):
+        rows = claim_batch(conn, limit)
+        claimed.extend(row['id'] for row in rows)
+        return rows
+
+    sms_outbox._claim_batch = recording_claim
+    sms_outbox._worker = None
+    start = time.perf_counter()
+    sms_outbox.start_outbox_worker()
+    statuses = sms_outbox.wait_for_delivery(ids, timeout=600)
+    drain = time.perf_counter() - start
+    print(f"📤 Drain:   {count / drain:10.0f} msg/s ({drain:.2f} s, {list(statuses.values()).count('sent')} sent)")
+
+    conn = sms_outbox.connect(sms_outbox.OUTBOX_DB)
+    priority_of = dict(conn.execute('SELECT id, priority FROM outbox').fetchall())
+    conn.close()
+    order = [priority_of[message_id] for message_id in claimed]
+    assert sorted(claimed) == sorted(ids), 'every message must be claimed exactly once'
+    assert order == sorted(order), 'messages must be claimed in priority order'
+    print(f"📊 SOS messages claimed first: yes ({order.count(sms_outbox.PRIORITY_SOS)} of {len(order)})")
+    sms_outbox._claim_batch = claim_batch
+
+    # Short retry and follow-up delays so the check takes seconds
+    sms_outbox.backoff_base, sms_outbox.follow_up_delay = 1.2, 0.2
+    contacts = [{'id': i, 'name': f'Contact {i}', 'phone': f'+91990000000{i}', 'relationship': 'Friend',
+                 'priority': 1} for i in range(3)]
+    server.failures['+919900000001'] = 2
+    server.rejected.add('+919900000002')
+    server.sent.clear()
+    result = sms_outbox.queue_emergency_alerts(contacts, 1, 'Bench', {'latitude': 28.6, 'longitude': 77.2},
+                                               '2024-01-01T12:00:00Z', timeout=30)
+    deadline = time.monotonic() + 30
+    while len(server.sent) < 4 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.5)
+    kinds = [(to, 'alert' if 'EMERGENCY ALERT' in body else 'follow-up') for to, body in server.sent]
+    for contact in contacts[:2]:
+        sent = [kind for to, kind in kinds if to == contact['phone']]
+        assert sent == ['alert', 'follow-up'], (contact['phone'], sent)
+    conn = sms_outbox.connect(sms_outbox.OUTBOX_DB)
+    rejected = conn.execute("SELECT status, attempts FROM outbox WHERE to_number = '+919900000002' "
+                            "ORDER BY id").fetchall()
+    conn.close()
+    assert [tuple(row) for row in rejected] == [('dead', 1), ('dead', 0)], [tuple(row) for row in rejected]
+    assert [r['status'] for r in result['results']] == ['sent', 'sent', 'failed'], result
+    print(f"📊 Follow-ups after their alerts: yes (one alert retried twice); "
+          f"rejected number: failed after 1 attempt, follow-up never sent")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
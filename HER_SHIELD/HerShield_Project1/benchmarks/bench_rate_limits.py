@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /login under a credential-stuffing burst, with and without rate limits.
+
+Drives the real /login route through Flask's test client with wrong
+passwords for many emails from one address. Compares the time the burst
+takes and the password checks it causes with limits off (the old
+behaviour) and on. Checks that wrong guesses at one account from many
+addresses stop after the per-email budget without another hash check, and
+that the owner's own logins use none of it. Then times a single check
+on each store, measures the
+memory per bucket against a dict per bucket, and checks the bucket
+arithmetic and that two "workers" on the SQLite store share one budget.
+
+Usage: python benchmarks/bench_rate_limits.py [attempts] [keys]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def burst(client, attempts, ip):
+    start = time.perf_counter()
+    statuses = {}
+    for i in range(attempts):
+        response = client.post('/login', data={'email': f'victim{i % 50}@example.com', 'password': 'guess'},
+                               environ_base={'REMOTE_ADDR': ip})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return time.perf_counter() - start, statuses
+
+def main():
+    attempts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    keys = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.chdir(tempfile.mkdtemp())
+
+    import app as hershield
+    import passwords
+    import rate_limits
+    from rate_limits import MemoryBackend, RateLimiter, Rule, SQLiteBackend
+    from db import RATE_LIMIT_DB
+
+    client = hershield.app.test_client()
+    with hershield.app.app_context():
+        for i in range(50):
+            hershield.get_db_connection().execute(
+                'INSERT INTO users (name, email, phone, password) VALUES (?, ?, ?, ?)',
+                (f'Victim {i}', f'victim{i}@example.com', '9876543210', passwords.hash_new_password('secret')))
+
+    print(f"\n📊 {attempts} wrong-password logins for 50 accounts from one address")
+    rows = []
+    for label, enabled, ip in [('No rate limits (old)', False, '198.51.100.1'),
+                               (f'Rate limited ({rate_limits.login_ip_limit} per IP)', True, '198.51.100.2')]:
+        saved = rate_limits.LOGIN_IP.count, rate_limits.LOGIN_EMAIL.count
+        if not enabled:
+            # A count of 0 turns a rule off
+            rate_limits.LOGIN_IP.count = rate_limits.LOGIN_EMAIL.count = 0
+        checks = passwords.password_metrics()['rejected']
+        elapsed, statuses = burst(client, attempts, ip)
+        checks = passwords.password_metrics()['rejected'] - checks
+        rate_limits.LOGIN_IP.count, rate_limits.LOGIN_EMAIL.count = saved
+        print(f"  {label:34s} {elapsed * 1000:8.0f} ms   hash checks {checks:4d}   statuses {statuses}")
+        rows.append((elapsed, checks, statuses))
+    (old_time, old_checks, _), (new_time, new_checks, new_statuses) = rows
+    assert old_checks == attempts and new_checks == rate_limits.LOGIN_IP.count
+    assert new_statuses.get(429) == attempts - rate_limits.LOGIN_IP.count
+    print(f"  {'Burst time':34s} {old_time / new_time:7.1f}x shorter, "
+          f"{attempts - new_checks} hash checks never run")
+    print(f"  metrics: {hershield.rate_limiter.metrics()}")
+
+    # A small account budget keeps the run short; the default is larger than one address's
+    saved = rate_limits.LOGIN_EMAIL.count, rate_limits.LOGIN_EMAIL.period, rate_limits.LOGIN_EMAIL.emission
+    small = Rule('login_email', '5/300')
+    rate_limits.LOGIN_EMAIL.count, rate_limits.LOGIN_EMAIL.period, rate_limits.LOGIN_EMAIL.emission = \
+        small.count, small.period, small.emission
+    budget = small.count
+
+    def log_in(password, ip):
+        return hershield.app.test_client().post('/login', data={'email': 'victim30@example.com', 'password': password},
+                                                environ_base={'REMOTE_ADDR': ip}).status_code
+
+    print(f"\n📊 Guesses at one account from many addresses ({budget}/300 wrong passwords per account)")
+    owner = [log_in('secret', '198.51.100.4') for _ in range(budget * 2)]
+    checks = passwords.password_metrics()['rejected']
+    guesses = [log_in('guess', f'203.0.113.{i}') for i in range(budget * 2)]
+    checks = passwords.password_metrics()['rejected'] - checks
+    rate_limits.LOGIN_EMAIL.count, rate_limits.LOGIN_EMAIL.period, rate_limits.LOGIN_EMAIL.emission = saved
+    assert owner == [302] * (budget * 2), owner
+    assert guesses == [200] * budget + [429] * budget and checks == budget, (guesses, checks)
+    print(f"  {budget * 2} logins by the owner used none of the budget; {budget * 2} guesses from "
+          f"{budget * 2} addresses: {budget} hash checks, then 429 without one")
+
+    print(f"\n📊 One check, {keys:,} distinct keys")
+    rule = Rule('bench', '5/60')
+    with hershield.app.app_context():
+        for label, backend in [('Memory store', MemoryBackend(keys * 2)),
+                               ('SQLite store', SQLiteBackend(RATE_LIMIT_DB))]:
+            limiter = RateLimiter(backend)
+            count = keys if isinstance(backend, MemoryBackend) else min(keys, 20_000)
+            start = time.perf_counter()
+            for i in range(count):
+                limiter.check((rule, f'203.0.{i >> 8 & 255}.{i & 255}:{i}'))
+            print(f"  {label:34s} {(time.perf_counter() - start) / count * 1e6:8.1f} µs")
+
+    print(f"\n📊 Memory for {keys:,} buckets")
+    for label, build in [
+        ('dict per bucket {tokens, updated}', lambda: {f'login_ip:10.{i >> 16}.{i >> 8 & 255}.{i & 255}':
+                                                       {'tokens': 4.0, 'updated': time.time()}
+                                                       for i in range(keys)}),
+        ('one float per bucket', lambda: {f'login_ip:10.{i >> 16}.{i >> 8 & 255}.{i & 255}': time.time()
+                                          for i in range(keys)})
+    ]:
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"  {label:34s} {size / 1024 / 1024:8.1f} MiB   {size / keys:5.0f} B/key")
+        del kept
+
+    print("\n📊 Bucket arithmetic and the shared store")
+    rule = Rule('check', '3/0.3')
+    memory = RateLimiter(MemoryBackend(100))
+    results = [memory.check((rule, 'k')) for _ in range(4)]
+    assert results[:3] == [0.0] * 3 and 0 < results[3] <= 0.1 + 1e-6, results
+    time.sleep(0.11)
+    assert memory.check((rule, 'k')) == 0.0, 'one token must refill after period / count'
+    with hershield.app.app_context():
+        worker_a, worker_b = RateLimiter(SQLiteBackend(RATE_LIMIT_DB)), RateLimiter(SQLiteBackend(RATE_LIMIT_DB))
+        shared = [worker.check((rule, 'shared')) for worker in (worker_a, worker_b, worker_a, worker_b)]
+    assert shared[:3] == [0.0] * 3 and shared[3] > 0, shared
+    print(f"  burst of 3 then refused for {results[3] * 1000:.0f} ms; two SQLite workers: {[round(x, 3) for x in shared]}")
+    print("✅ Bursts are refused before any hash work, only wrong passwords spend an account's budget, "
+          "and workers share the SQLite budget")
+
+if __name__ == "__main__":
+    main()
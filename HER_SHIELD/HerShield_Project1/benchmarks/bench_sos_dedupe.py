@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a panicking user pressing SOS several times.
+
+Drives the real /sos route through Flask's test client against a local
+fake Twilio server. Presses come one after another and then all at once,
+with dedupe disabled (the old behaviour) and enabled. Counts the alerts
+inserted, the SMS sent and the response time of the repeats. Checks that
+with dedupe on, every press gets the same alert back, and that each
+press's position (a few metres apart) is on that alert's track.
+
+Usage: python benchmarks/bench_sos_dedupe.py [presses] [contacts]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_twilio import start_fake_twilio
+
+def press(client, key, timestamp, i):
+    start = time.perf_counter()
+    headers = {'Idempotency-Key': key} if key else {}
+    # About 11 m apart, so the track grows but nobody is texted a move
+    response = client.post('/sos', json={'location': {'latitude': 28.6139 + i * 0.0001, 'longitude': 77.2090},
+                                         'timestamp': timestamp}, headers=headers).get_json()
+    return response, time.perf_counter() - start
+
+def main():
+    presses = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    contacts = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    server = start_fake_twilio(0.05)
+    os.environ['TWILIO_API_BASE_URL'] = server.base_url
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.chdir(tempfile.mkdtemp())
+
+    import app as hershield
+    import sms_outbox
+    import sos_requests
+    from db import connect, ALERTS_DB
+
+    client = hershield.app.test_client()
+    client.post('/signup', data={'name': 'Bench', 'email': 'bench@example.com', 'phone': '+919800000000',
+                                 'password': 'bench-password', 'confirm_password': 'bench-password'})
+    client.post('/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+    for i in range(contacts):
+        client.post('/emergency-contacts', data={'name': f'Contact {i}', 'phone': f'+9198765432{i:02d}',
+                                                 'relationship': 'Friend', 'priority': '1'})
+    cookie = client.get_cookie('session')
+    alerts_db = connect(ALERTS_DB)
+    runs = []
+
+    def run(label, concurrent, key=None):
+        client.post('/sos/resolve')
+        # Each run is a separate emergency, so the outbox must not merge its messages with an earlier run's
+        day = len(runs) + 1
+        runs.append(label)
+        alerts_before = alerts_db.execute('SELECT COUNT(*) FROM alerts').fetchone()[0]
+        sent_before = server.requests
+        results = []
+
+        def one(i):
+            local = hershield.app.test_client()
+            local.set_cookie('session', cookie.value)
+            # The dashboard keeps one key per activation; a page reload starts without it
+            results.append(press(local, key if i % 2 else None, f'2024-01-{day:02d}T12:00:{i:02d}Z', i))
+
+        if concurrent:
+            threads = [threading.Thread(target=one, args=(i,)) for i in range(presses)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            for i in range(presses):
+                one(i)
+        # Follow-ups go out after SOS_FOLLOW_UP_DELAY; wait for the outbox to go quiet
+        time.sleep(sms_outbox.follow_up_delay + 1)
+        alerts = alerts_db.execute('SELECT COUNT(*) FROM alerts').fetchone()[0] - alerts_before
+        repeats = sorted(elapsed for response, elapsed in results if response.get('duplicate'))
+        links = {response['tracking_url'] for response, _ in results}
+        fixes = alerts_db.execute('SELECT COUNT(*) FROM alert_locations WHERE alert_id = '
+                                  '(SELECT MAX(id) FROM alerts)').fetchone()[0]
+        print(f"  {label:34s} alerts {alerts:3d}   SMS {server.requests - sent_before:4d}   "
+              f"links {len(links)}   fixes {fixes}   repeat p50 "
+              f"{repeats[len(repeats) // 2] * 1000 if repeats else 0:7.1f} ms")
+        return alerts, links, server.requests - sent_before, fixes
+
+    print(f"\n📊 {presses} SOS presses, {contacts} contacts")
+    sos_requests.dedupe_window = 0
+    sos_requests.memory_size = 0
+    old_alerts, _, old_sms, _ = run('No dedupe, one after another', False)
+    sos_requests.dedupe_window = 300
+    sos_requests.memory_size = 1024
+    sequential, sequential_links, sequential_sms, sequential_fixes = run('Dedupe, one after another', False,
+                                                                         'activation-1')
+    concurrent, concurrent_links, concurrent_sms, concurrent_fixes = run('Dedupe, all at once', True, 'activation-2')
+    assert old_alerts == presses, 'without dedupe every press raises an alert'
+    assert sequential == concurrent == 1, 'repeated presses must attach to one alert'
+    assert sequential_sms == concurrent_sms == old_sms // presses, 'one alert must text each contact once'
+    assert len(sequential_links) == len(concurrent_links) == 1, 'every press must get the same tracking link'
+    assert sequential_fixes == concurrent_fixes == presses, "every press's position must be on the track"
+    print(f"  metrics: {sos_requests.sos_metrics()}")
+    alerts_db.close()
+    server.shutdown()
+    print("✅ Repeated presses raised one alert, texted each contact once and kept every position")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial SOS alert loop vs. the SMS outbox.
+
+Runs both against a local fake Twilio server so the numbers reflect
+request latency rather than a real SMS provider.
+
+Usage: python benchmarks/bench_sos_dispatch.py [contacts] [latency_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_twilio import start_fake_twilio
+
+def main():
+    contacts_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+
+    server = start_fake_twilio(latency)
+    os.environ['TWILIO_API_BASE_URL'] = server.base_url
+    os.chdir(tempfile.mkdtemp())
+
+    import twilio_alert
+    import sms_outbox
+    from migrations import migrate, OUTBOX_MIGRATIONS
+
+    migrate(sms_outbox.OUTBOX_DB, OUTBOX_MIGRATIONS)
+    sms_outbox.start_outbox_worker()
+    contacts = [{
+        'id': i,
+        'name': f'Contact {i}',
+        'phone': f'+9198765432{i:02d}',
+        'relationship': 'Friend',
+        'priority': 1 if i < 2 else 2
+    } for i in range(contacts_count)]
+    location = {'latitude': 28.6139, 'longitude': 77.2090}
+
+    print(f"🧪 {contacts_count} contacts, {latency * 1000:.0f} ms per Twilio request")
+
+    start = time.perf_counter()
+    for contact in contacts:
+        twilio_alert.send_emergency_alert(contact['phone'], 'Bench User', location,
+                                          '2024-01-01T12:00:00Z', contact['relationship'])
+    serial = time.perf_counter() - start
+    print(f"🐢 Serial loop:        {serial * 1000:8.1f} ms")
+
+    sent_before = server.requests
+    start = time.perf_counter()
+    result = sms_outbox.queue_emergency_alerts(contacts, 1, 'Bench User', location, '2024-01-01T12:00:00Z')
+    responded = time.perf_counter() - start
+    # Alert plus follow-up for every contact
+    while server.requests - sent_before < 2 * contacts_count:
+        time.sleep(0.005)
+    finished = time.perf_counter() - start
+    print(f"⚡ Outbox respond:     {responded * 1000:8.1f} ms "
+          f"(sent={result['sent']}, pending={result['pending']}, failed={result['failed']})")
+    print(f"⚡ Outbox drain:       {finished * 1000:8.1f} ms")
+    print(f"📊 Speedup to response: {serial / responded:.1f}x")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: landing page static files before and after build_assets.py.
+
+Builds a scratch copy of static/ and serves it from two Flask apps, one
+plain and one with init_assets(). Counts the bytes and requests a browser
+needs for the landing page's CSS and images on a first visit (desktop
+picking src, a phone picking the narrowest srcset entry) and on a repeat
+visit. It also estimates load time on a slow mobile link. Checks that the
+hashed URLs serve the same content, decoded, with immutable caching.
+
+Usage: python benchmarks/bench_static_assets.py [kbit/s] [rtt_ms]
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import brotli
+from flask import Flask, url_for
+
+from assets import init_assets
+from build_assets import build
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Browsers open about six connections per host
+CONNECTIONS = 6
+
+def landing_assets(static_dir):
+    """Return (filename, has srcset) for the landing page's static files that exist."""
+    with open(os.path.join(PROJECT_DIR, 'templates', 'landing.html'), encoding='utf-8') as f:
+        html = f.read()
+    names = dict.fromkeys(re.findall(r"url_for\('static', filename='([^']+)'\)", html))
+    srcset = set(re.findall(r"asset_srcset\('([^']+)'\)", html))
+    return [(name, name in srcset) for name in names if os.path.exists(os.path.join(static_dir, name))]
+
+def visit(label, app, assets, mobile, kbps, rtt):
+    client = app.test_client()
+    sent = requests = 0
+    asset_srcset = app.jinja_env.globals.get('asset_srcset')
+    with app.test_request_context():
+        urls = []
+        for name, has_srcset in assets:
+            candidates = asset_srcset(name) if asset_srcset and has_srcset else ''
+            # The narrowest candidate comes first
+            urls.append(candidates.split(' ')[0] if mobile and candidates else url_for('static', filename=name))
+    cached = []
+    for url in urls:
+        response = client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+        assert response.status_code == 200, url
+        sent += len(response.data)
+        requests += 1
+        cached.append((url, response))
+
+    # Repeat visit: anything not marked immutable is revalidated with a round trip
+    revalidated = 0
+    for url, response in cached:
+        if not response.cache_control.immutable:
+            assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+            revalidated += 1
+        response.close()
+
+    first = -(-requests // CONNECTIONS) * rtt + sent * 8 / (kbps * 1000)
+    repeat = -(-revalidated // CONNECTIONS) * rtt
+    print(f"  {label:34s} {sent / 1024:8.0f} KiB  {requests:2d} req  ~{first:5.1f} s   "
+          f"repeat: {revalidated:2d} req  ~{repeat * 1000:5.0f} ms")
+    return sent
+
+def main():
+    kbps = float(sys.argv[1]) if len(sys.argv) > 1 else 1600
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+    static_dir = os.path.join(tempfile.mkdtemp(), 'static')
+    shutil.copytree(os.path.join(PROJECT_DIR, 'static'), static_dir)
+
+    print("📦 Building a scratch copy of static/")
+    manifest = build(static_dir)
+    plain = Flask('plain', static_folder=static_dir)
+    built = Flask('built', static_folder=static_dir)
+    init_assets(built)
+    assets = landing_assets(static_dir)
+
+    print(f"\n📊 Landing page: {len(assets)} static files, {kbps:.0f} kbit/s, {rtt * 1000:.0f} ms RTT")
+    old = visit('Plain static/ (old)', plain, assets, False, kbps, rtt)
+    new = visit('Hashed + compressed, desktop', built, assets, False, kbps, rtt)
+    phone = visit('Hashed + compressed, phone srcset', built, assets, True, kbps, rtt)
+    print(f"  {'Page weight saved (desktop / phone)':34s} {1 - new / old:7.0%} / {1 - phone / old:.0%}")
+
+    client = built.test_client()
+    with built.test_request_context():
+        url = url_for('static', filename='css/style.css')
+    assert url == f"/static/{manifest['css/style.css']['file']}", url
+    with open(os.path.join(static_dir, 'css', 'style.css'), 'rb') as f:
+        original = f.read()
+    for accept, decode in [('br', brotli.decompress), ('gzip', gzip.decompress), ('identity', bytes)]:
+        response = client.get(url, headers={'Accept-Encoding': accept})
+        assert response.headers.get('Content-Encoding', 'identity') == accept, response.headers
+        assert decode(response.data) == original, f'{accept} variant must decode to the original CSS'
+        assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 3600
+        assert response.mimetype == 'text/css' and 'Accept-Encoding' in response.vary
+        response.close()
+    print("✅ Hashed URLs serve the original content with immutable caching")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: alert location track writes and trajectory reads.
+
+Writes: the same fixes stored one transaction per fix, as each old
+/update-location call did, and in batches through record_locations().
+Reads: a ten-minute window of one alert's trajectory, and its latest
+point, from a store of many interleaved tracks. Each read runs with and
+without the (alert_id, recorded_at) index. The two schemas must return
+identical results.
+
+Usage: python benchmarks/bench_track_store.py [alerts] [points_per_alert] [batch]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def fill(conn, alerts, points):
+    """Store ``points`` fixes for each alert, one every 5 s, tracks interleaved in time."""
+    random.seed(9)
+    rows = [(alert_id, 28.6 + random.random() / 10, 77.2 + random.random() / 10, 10.0,
+             1_700_000_000 + step * 5 + alert_id * 0.001)
+            for step in range(points) for alert_id in range(1, alerts + 1)]
+    conn.execute('BEGIN')
+    conn.executemany('''
+        INSERT INTO alert_locations (alert_id, latitude, longitude, accuracy, recorded_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.execute('COMMIT')
+
+def without_ids(result):
+    """Drop row ids, which differ between the two files, so the fixes themselves can be compared."""
+    fixes = result if isinstance(result, list) else [result]
+    return [{key: value for key, value in fix.items() if key != 'id'} for fix in fixes if fix]
+
+def timed(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        result = func(i)
+    return (time.perf_counter() - start) / calls * 1e6, result
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    os.chdir(tempfile.mkdtemp())
+
+    import live_tracking
+    from db import connect
+    from migrations import migrate, ALERTS_MIGRATIONS
+
+    os.makedirs('database', exist_ok=True)
+    migrate('database/indexed.db', ALERTS_MIGRATIONS)
+    migrate('database/unindexed.db', ALERTS_MIGRATIONS, target=4)
+    indexed, unindexed = connect('database/indexed.db'), connect('database/unindexed.db')
+
+    writes = 2000
+    fixes = [(28.6 + i * 1e-5, 77.2, 10.0, 1_600_000_000 + i) for i in range(writes)]
+    print(f"\n📊 Writing {writes} fixes")
+    start = time.perf_counter()
+    for fix in fixes:
+        indexed.execute('''
+            INSERT INTO alert_locations (alert_id, latitude, longitude, accuracy, recorded_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (999_999,) + fix)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(0, writes, batch):
+        live_tracking.record_locations(indexed, 999_998, fixes[i:i + batch])
+    batched = time.perf_counter() - start
+    print(f"  {'One transaction per fix':28s} {writes / single:10.0f} fixes/s")
+    print(f"  {f'Batches of {batch}':28s} {writes / batched:10.0f} fixes/s   ({single / batched:.1f}x)")
+
+    fill(indexed, alerts, points)
+    fill(unindexed, alerts, points)
+    print(f"\n📊 Reading from {alerts * points:,} stored fixes ({alerts} alerts x {points})")
+    random.seed(4)
+    picks = [(random.randint(1, alerts), 1_700_000_000 + random.randint(0, points * 5 - 600)) for _ in range(500)]
+    for label, read in [
+        ('10-minute trajectory', lambda conn, i: live_tracking.track_between(conn, picks[i][0], picks[i][1],
+                                                                             picks[i][1] + 600)),
+        ('Latest point', lambda conn, i: live_tracking.latest_location(conn, picks[i][0]))
+    ]:
+        results = {}
+        for name, conn in [('without time index', unindexed), ('with time index', indexed)]:
+            per_call, _ = timed(lambda i: read(conn, i), len(picks))
+            results[name] = [without_ids(read(conn, i)) for i in range(len(picks))]
+            print(f"  {label:22s} {name:20s} {per_call:10.1f} µs")
+        assert results['without time index'] == results['with time index'], f'{label} results differ'
+    indexed.close()
+    unindexed.close()
+    print("✅ Both schemas return the same trajectories and latest points")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a fresh Twilio client per SMS vs. the shared pooled client.
+
+Times an SOS fan-out through the SMS outbox against a local fake Twilio
+server, once building a new client for every message (the old behaviour)
+and once reusing the pooled client, then prints the pool metrics.
+
+Usage: python benchmarks/bench_twilio_pool.py [contacts] [rounds] [latency_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_twilio import start_fake_twilio
+
+def fan_out(server, sms_outbox, contacts, location, round_number):
+    sent_before = server.requests
+    start = time.perf_counter()
+    # A distinct timestamp per round, or the outbox would treat it as the same SOS
+    sms_outbox.queue_emergency_alerts(contacts, 1, 'Bench User', location, f'round-{round_number}', timeout=0)
+    while server.requests - sent_before < 2 * len(contacts):
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+def main():
+    contacts_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+
+    server = start_fake_twilio(latency)
+    os.environ['TWILIO_API_BASE_URL'] = server.base_url
+    os.chdir(tempfile.mkdtemp())
+
+    import twilio_alert
+    import sms_outbox
+    from migrations import migrate, OUTBOX_MIGRATIONS
+
+    migrate(sms_outbox.OUTBOX_DB, OUTBOX_MIGRATIONS)
+    sms_outbox.start_outbox_worker()
+    contacts = [{'id': i, 'name': f'Contact {i}', 'phone': f'+9198765432{i:02d}',
+                 'relationship': 'Friend', 'priority': 1} for i in range(contacts_count)]
+    location = {'latitude': 28.6139, 'longitude': 77.2090}
+
+    print(f"🧪 {rounds} SOS fan-outs to {contacts_count} contacts, {latency * 1000:.0f} ms stub latency")
+
+    pooled_client = twilio_alert.get_twilio_client
+    twilio_alert.get_twilio_client = twilio_alert._create_client
+    unpooled = [fan_out(server, sms_outbox, contacts, location, i) for i in range(rounds)]
+    twilio_alert.get_twilio_client = pooled_client
+
+    pooled = [fan_out(server, sms_outbox, contacts, location, rounds + i) for i in range(rounds)]
+
+    print(f"🐢 Client per SMS: {sum(unpooled) / rounds * 1000:8.1f} ms per fan-out")
+    print(f"⚡ Pooled client:  {sum(pooled) / rounds * 1000:8.1f} ms per fan-out")
+    print(f"📊 Pool metrics: {twilio_alert.get_sms_metrics()}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
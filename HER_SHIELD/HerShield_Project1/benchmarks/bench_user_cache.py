@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the per-user profile and contacts cache.
+
+Seeds a scratch users.db and times the lookups /sos and /update-location
+make. The old way was two queries per request. The cache is timed on a hit
+inside the staleness window, on a version re-check, and on a miss. It also
+compares the memory held by __slots__ records with the same rows kept as
+dicts.
+
+Loads a second copy of the module as another "worker" and checks that a
+contact added through one copy is seen by the other once it re-checks.
+
+Usage: python benchmarks/bench_user_cache.py [users] [lookups]
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(conn, users):
+    print(f"🌱 Seeding {users:,} users with 5 contacts each...")
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO users (id, name, email, phone, password) VALUES (?, ?, ?, ?, ?)',
+                     ((i, f'User {i}', f'user{i}@example.com', '9876543210', 'x') for i in range(users)))
+    conn.executemany('INSERT INTO emergency_contacts (user_id, name, phone, relationship, priority) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((i % users, f'Contact {i}', f'98765{i % 100000:05d}', 'Friend', i % 3 + 1)
+                      for i in range(users * 5)))
+    conn.execute('COMMIT')
+
+def timed(label, func, ids):
+    start = time.perf_counter()
+    for user_id in ids:
+        func(user_id)
+    per_call = (time.perf_counter() - start) / len(ids) * 1e6
+    print(f"  {label:34s} {per_call:8.1f} µs")
+    return per_call
+
+def load_worker(name):
+    """Import user_cache again under another name, standing in for a second worker process."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'user_cache.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    os.chdir(tempfile.mkdtemp())
+
+    import user_cache
+    from db import USERS_DB, connect
+    from migrations import migrate, USERS_MIGRATIONS
+
+    migrate(USERS_DB, USERS_MIGRATIONS)
+    conn = connect(USERS_DB)
+    seed(conn, users)
+    random.seed(1)
+    hot = [random.randrange(1000) for _ in range(lookups)]
+
+    def old_lookup(user_id):
+        contacts = conn.execute('SELECT * FROM emergency_contacts WHERE user_id = ? ORDER BY priority',
+                                (user_id,)).fetchall()
+        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        return user, contacts
+
+    print(f"\n📊 Profile + contacts lookup, {lookups:,} requests over 1,000 active users")
+    old = timed('Two queries per request (old)', old_lookup, hot)
+    user_cache.max_staleness = 0
+    timed('Cache miss (first lookup)', lambda user_id: user_cache.get_user(conn, user_id), list(range(1000)))
+    revalidated = timed('Cache, re-check version each time', lambda user_id: user_cache.get_user(conn, user_id), hot)
+    user_cache.max_staleness = 3600
+    hit = timed('Cache hit within staleness window', lambda user_id: user_cache.get_user(conn, user_id), hot)
+    print(f"  {'Speed-up (hit / re-check)':34s} {old / hit:7.0f}x / {old / revalidated:.0f}x")
+
+    print(f"\n📊 Memory for {users:,} users' rows")
+    for label, build in [
+        ('dicts', lambda: [(dict(user), [dict(contact) for contact in contacts])
+                           for user, contacts in map(old_lookup, range(users))]),
+        ('__slots__ records', lambda: [user_cache._load(conn, user_id, 0) for user_id in range(users)])
+    ]:
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"  {label:34s} {size / 1024 / 1024:8.1f} MiB")
+        del kept
+
+    print("\n📊 Cross-worker invalidation")
+    worker_a, worker_b = load_worker('worker_a'), load_worker('worker_b')
+    worker_b.max_staleness = 0.2
+    conn_b = connect(USERS_DB)
+    before = len(worker_b.get_contacts(conn_b, 7))
+    conn.execute("INSERT INTO emergency_contacts (user_id, name, phone, relationship, priority) "
+                 "VALUES (7, 'New contact', '9876500000', 'Sister', 1)")
+    worker_a.invalidate(conn, 7)
+    assert len(worker_a.get_contacts(conn, 7)) == before + 1, 'the writing worker must see its own change at once'
+    assert len(worker_b.get_contacts(conn_b, 7)) == before, 'inside the window the other worker serves its copy'
+    time.sleep(0.25)
+    assert len(worker_b.get_contacts(conn_b, 7)) == before + 1, 'after the window the other worker must reload'
+    print(f"  worker B: {before} contacts, then {before + 1} after {worker_b.max_staleness:.1f} s")
+    print(f"  metrics: {worker_b.user_cache_metrics()}")
+    conn.close()
+    conn_b.close()
+    print("✅ Both workers see the new contact")
+
+if __name__ == "__main__":
+    main()
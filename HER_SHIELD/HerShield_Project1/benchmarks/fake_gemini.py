@@ -0,0 +1,59 @@
+"""
+Local stand-in for the Gemini REST API used by the benchmarks.
+
+Point the app at it with ``GEMINI_TRANSPORT=rest`` and
+``GEMINI_API_ENDPOINT=<server.base_url>``. Answers
+``POST /v1beta/models/<model>:generateContent`` after a configurable
+latency with a fixed answer, and ``:streamGenerateContent`` with the same
+answer as a one-chunk stream.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+ANSWER = "Stay in a well-lit, busy place and keep your emergency contacts informed of where you are."
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+
+        response = {
+            'candidates': [{'content': {'parts': [{'text': ANSWER}], 'role': 'model'},
+                            'finishReason': 'STOP', 'index': 0}]
+        }
+        # The streaming endpoint sends a JSON array of responses
+        body = json.dumps([response] if ':streamGenerateContent' in self.path else response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_gemini(latency=0.5):
+    """
+    Start the fake Gemini server on a free local port.
+
+    Args:
+        latency (float): Seconds each request takes to answer
+
+    Returns:
+        ThreadingHTTPServer: The running server; ``server.base_url`` points at it
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,84 @@
+"""
+Local stand-in for the Twilio Messages API used by the benchmarks.
+
+Accepts ``POST /2010-04-01/Accounts/<sid>/Messages.json``, sleeps for a
+configurable latency to mimic the real round-trip and answers with a
+minimal message resource. Numbers in ``server.rejected`` get Twilio's
+400 for an invalid 'To' number, and ``server.failures[number]`` answers
+that many 503s before accepting. Accepted messages are appended to
+``server.sent`` as (to, body) pairs.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        time.sleep(self.server.latency)
+
+        server = self.server
+        to = form.get('To', [''])[0]
+        with server.lock:
+            server.requests += 1
+            if to in server.rejected:
+                return self._error(400, 21211, f"The 'To' number {to} is not a valid phone number.")
+            if server.failures.get(to):
+                server.failures[to] -= 1
+                return self._error(503, 20500, 'Service unavailable')
+            sid = f"SM{next(server.sids):032d}"
+            server.sent.append((to, form.get('Body', [''])[0]))
+
+        body = json.dumps({
+            'sid': sid,
+            'status': 'queued',
+            'to': form.get('To', [''])[0],
+            'from': form.get('From', [''])[0],
+            'body': form.get('Body', [''])[0]
+        }).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, message):
+        body = json.dumps({'code': code, 'message': message, 'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_twilio(latency=0.15):
+    """
+    Start the fake Twilio server on a free local port.
+
+    Args:
+        latency (float): Seconds each request takes to answer
+
+    Returns:
+        ThreadingHTTPServer: The running server; ``server.base_url`` points at it
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTwilioHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.rejected = set()
+    server.failures = {}
+    server.sent = []
+    server.sids = itertools.count(1)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
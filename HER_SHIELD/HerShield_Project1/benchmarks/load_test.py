@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Load test: /sos and /chatbot throughput as gevent workers are added.
+
+Starts the production profile (``gunicorn -c gunicorn.conf.py wsgi:app``)
+with 1, 2, 4... workers against local fake Twilio and Gemini servers, signs
+up one user per client, then has every client press SOS (or ask the
+chatbot a new question, so the answer cache never hits) back to back for a
+fixed time. Reports requests per second, latency and scaling over one
+worker. The clients are greenlets in this process, so it drives the server
+with many connections while using a single core itself.
+
+A worker uses one core, so throughput can only grow with workers up to the
+cores left over after the client; on a machine with fewer cores the
+numbers stay flat and no scaling is claimed.
+
+Usage: python benchmarks/load_test.py [workers,...] [clients] [seconds]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gevent_patch import patch_all
+
+# The clients are greenlets; requests must use the patched socket module
+patch_all()
+
+import datetime
+import itertools
+import socket
+import subprocess
+import tempfile
+import time
+
+import gevent
+import requests
+
+from fake_gemini import start_fake_gemini
+from fake_twilio import start_fake_twilio
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'load-test-password'
+METRICS_TOKEN = 'load-test-metrics'
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(workers, twilio_url, gemini_url):
+    """Run the gunicorn profile in a scratch directory; returns (process, base URL)."""
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), PYTHONPATH=PROJECT_DIR,
+               SECRET_KEY='load-test', METRICS_TOKEN=METRICS_TOKEN, TWILIO_API_BASE_URL=twilio_url, GEMINI_API_KEY='load-test',
+               GEMINI_TRANSPORT='rest', GEMINI_API_ENDPOINT=gemini_url, SOS_DEDUPE_WINDOW='0',
+               # Every client signs up from 127.0.0.1; that is the load, not an attack
+               RATE_LIMIT_LOGIN_IP='0/1', RATE_LIMIT_LOGIN_EMAIL='0/1', RATE_LIMIT_SIGNUP_IP='0/1')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.join(PROJECT_DIR, 'gunicorn.conf.py'),
+                                '--chdir', tempfile.mkdtemp(), 'wsgi:app'], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        try:
+            requests.get(f'{base_url}/login', timeout=1)
+            return process, base_url
+        # Refused until gunicorn listens, then slow while the workers import the app
+        except (requests.ConnectionError, requests.Timeout):
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('gunicorn did not start')
+
+def sign_up(base_url, i):
+    client = requests.Session()
+    email = f'load{i}@example.com'
+    client.post(f'{base_url}/signup', data={'name': f'Load {i}', 'email': email, 'phone': '+919800000000',
+                                            'password': PASSWORD, 'confirm_password': PASSWORD})
+    response = client.post(f'{base_url}/login', allow_redirects=False, data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302, response.status_code
+    client.post(f'{base_url}/emergency-contacts', data={'name': 'Contact', 'phone': '+919876543210',
+                                                        'relationship': 'Friend', 'priority': '1'})
+    return client
+
+def press_sos(client, base_url, n):
+    # A distinct timestamp per press keeps each SOS's outbox messages apart
+    response = client.post(f'{base_url}/sos', json={
+        'location': {'latitude': 28.6139, 'longitude': 77.2090},
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()})
+    assert response.status_code == 200, response.status_code
+
+def ask_chatbot(client, base_url, n):
+    # A new question every time, so each one reaches the model
+    response = client.post(f'{base_url}/chatbot', data={'user_input': f'What should I pack for a late train home, trip {n}?'})
+    assert response.status_code == 200, response.status_code
+    assert response.json()['source'] == 'model', response.json()
+
+def drive(clients, base_url, send, seconds):
+    """Run every client back to back for ``seconds``; returns (requests/s, p50, p95)."""
+    latencies = []
+    numbers = itertools.count()
+    deadline = time.perf_counter() + seconds
+
+    def run(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            send(client, base_url, next(numbers))
+            latencies.append(time.perf_counter() - start)
+
+    gevent.joinall([gevent.spawn(run, client) for client in clients], raise_error=True)
+    latencies.sort()
+    return len(latencies) / seconds, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+def worker_pids(base_url, tries=40):
+    # New connections are spread over the workers by the kernel
+    return {requests.get(f'{base_url}/metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'}).json()['worker']['pid'] for _ in range(tries)}
+
+def main():
+    worker_counts = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1 else '1,2,4').split(',')]
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    twilio = start_fake_twilio(0.05)
+    gemini = start_fake_gemini(0.2)
+
+    print(f"\n📊 {clients} clients back to back for {seconds:.0f} s per endpoint, {cores} cores")
+    results = {}
+    for workers in worker_counts:
+        process, base_url = start_server(workers, twilio.base_url, gemini.base_url)
+        try:
+            sessions = gevent.joinall([gevent.spawn(sign_up, base_url, i) for i in range(clients)], raise_error=True)
+            sessions = [greenlet.value for greenlet in sessions]
+            for endpoint, send in [('/sos', press_sos), ('/chatbot', ask_chatbot)]:
+                rate, p50, p95 = drive(sessions, base_url, send, seconds)
+                results[endpoint, workers] = rate
+                scaling = rate / results[endpoint, worker_counts[0]]
+                print(f"  {endpoint:9s} {workers} worker(s)  {rate:7.1f} req/s   p50 {p50 * 1000:6.0f} ms   "
+                      f"p95 {p95 * 1000:6.0f} ms   {scaling:4.2f}x {worker_counts[0]} worker(s)")
+            pids = worker_pids(base_url)
+            print(f"  {'':9s} requests served by {len(pids)} of {workers} worker process(es)")
+            assert len(pids) <= workers
+        finally:
+            process.terminate()
+            process.wait()
+    twilio.shutdown()
+    gemini.shutdown()
+
+    most = max(worker_counts)
+    if cores > most:
+        for endpoint in ('/sos', '/chatbot'):
+            ratio = results[endpoint, most] / results[endpoint, min(worker_counts)]
+            assert ratio > 1.5, f'{endpoint} did not scale with workers ({ratio:.2f}x)'
+        print("✅ /sos and /chatbot throughput grows with the worker count")
+    else:
+        print(f"⚠️ {cores} core(s) is not enough for {most} workers and the client; scaling not checked")
+        print("✅ Every worker count served every request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Build step for static/: fingerprinted copies, pre-compressed variants and responsive images.
+
+Every file under static/ is copied to static/dist/ under a name that carries
+a hash of its contents (css/style.css -> css/style.3f9c2a41d07e.css), so it
+can be cached forever and a change simply gets a new URL. Text files also get
+.gz and .br variants. Photos are recompressed, capped at the widest
+responsive size and also resized to narrower widths for srcset. The
+manifest written next to them is read by assets.py at startup.
+
+Pillow and Brotli are only needed here, not while serving; without them the
+images are copied as they are and only gzip variants are written.
+
+Usage: python build_assets.py [static_dir]
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from assets import DIST_DIR, MANIFEST_NAME
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Text types worth compressing; images, audio and fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+IMAGES = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+# srcset widths; the widest is also the cap for the default image
+IMAGE_WIDTHS = (480, 960, 1600)
+IMAGE_QUALITY = 80
+
+def fingerprint(path, data):
+    """Return path with a content hash before the extension: css/style.css -> css/style.<hash>.css."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def encode_image(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=IMAGE_QUALITY, method=6)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+def resize_image(data, image_format):
+    """
+    Recompress an image and resize it for srcset.
+
+    Args:
+        data (bytes): Original file
+        image_format (str): Pillow format name, e.g. 'JPEG'
+
+    Returns:
+        tuple: (bytes for the default image, its width, {width: bytes} for each narrower srcset width)
+    """
+    image = Image.open(io.BytesIO(data))
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    widths = {}
+    for width in IMAGE_WIDTHS:
+        if width < image.width:
+            height = round(image.height * width / image.width)
+            widths[width] = encode_image(image.resize((width, height), Image.LANCZOS), image_format)
+
+    if image.width > IMAGE_WIDTHS[-1]:
+        return widths.pop(IMAGE_WIDTHS[-1]), IMAGE_WIDTHS[-1], widths
+
+    default = encode_image(image, image_format)
+    # Recompressing a small, already tight file can make it bigger
+    return min(default, data, key=len), image.width, widths
+
+def compress(data):
+    """Return {'gzip': bytes, 'br': bytes} for the variants that come out smaller than data."""
+    variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def write(static_dir, path, data):
+    full_path = os.path.join(static_dir, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'wb') as f:
+        f.write(data)
+
+def build(static_dir=None):
+    """
+    Rebuild static/dist/ and its manifest from the files under static/.
+
+    Args:
+        static_dir (str): Folder to build, defaults to this project's static/
+
+    Returns:
+        dict: The manifest: {'css/style.css': {'file': 'dist/css/style.<hash>.css',
+            'encodings': ['br', 'gzip'], 'srcset': [[480, 'dist/...'], ...]}, ...}
+    """
+    static_dir = static_dir or STATIC_DIR
+    if Image is None:
+        print("⚠️ Pillow is not installed; images are copied without resizing")
+    if brotli is None:
+        print("⚠️ Brotli is not installed; only gzip variants are written")
+
+    shutil.rmtree(os.path.join(static_dir, DIST_DIR), ignore_errors=True)
+    manifest = {}
+    before = after = 0
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != os.path.join(static_dir, DIST_DIR))
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+            ext = os.path.splitext(name)[1].lower()
+            with open(os.path.join(root, name), 'rb') as f:
+                data = f.read()
+
+            entry = {}
+            widths = {}
+            if ext in IMAGES and Image is not None:
+                data_out, width_out, widths = resize_image(data, IMAGES[ext])
+            else:
+                data_out = data
+            entry['file'] = f"{DIST_DIR}/{fingerprint(path, data_out)}"
+            write(static_dir, entry['file'], data_out)
+
+            if ext in COMPRESSIBLE:
+                variants = compress(data_out)
+                for encoding, body in variants.items():
+                    write(static_dir, entry['file'] + ('.br' if encoding == 'br' else '.gz'), body)
+                entry['encodings'] = sorted(variants)
+            if widths:
+                entry['srcset'] = []
+                for width, body in sorted(widths.items()):
+                    stem, suffix = os.path.splitext(path)
+                    variant = f"{DIST_DIR}/{fingerprint(f'{stem}.{width}w{suffix}', body)}"
+                    write(static_dir, variant, body)
+                    entry['srcset'].append([width, variant])
+                entry['srcset'].append([width_out, entry['file']])
+            manifest[path] = entry
+
+            before += len(data)
+            after += len(data_out)
+            print(f"  {path} -> {entry['file']} ({len(data) / 1024:.0f} KiB -> {len(data_out) / 1024:.0f} KiB"
+                  f"{', ' + '/'.join(entry['encodings']) if entry.get('encodings') else ''}"
+                  f"{', ' + str(len(widths)) + ' widths' if widths else ''})")
+
+    with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"✅ Built {len(manifest)} static assets: {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+    return manifest
+
+if __name__ == "__main__":
+    build(sys.argv[1] if len(sys.argv) > 1 else None)
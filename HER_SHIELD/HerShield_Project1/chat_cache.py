@@ -0,0 +1,160 @@
+"""
+Response cache for chatbot answers.
+
+Answers to context-free questions (no conversation history) are cached
+under a key built from the normalized question, the model name, the
+generation config and the user-context fields the prompt depends on.
+Entries expire after a TTL and the least recently used ones are evicted
+first. The backend is pluggable:
+
+- ``memory``: per-process LRU (default)
+- ``sqlite``: ``database/chat_cache.db``, shared by every gunicorn worker
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from db import CHAT_CACHE_DB, connection
+
+# Seconds an answer stays valid
+cache_ttl = float(os.getenv('CHAT_CACHE_TTL', '86400'))
+# Entries kept before least recently used ones are evicted
+max_entries = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '1000'))
+# 'memory' or 'sqlite'
+backend_name = os.getenv('CHAT_CACHE_BACKEND', 'memory')
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.,;:]+$')
+
+def normalize_question(question):
+    """Fold case, whitespace and trailing punctuation so rephrasings share a key."""
+    question = _WHITESPACE.sub(' ', question.strip().lower())
+    return _TRAILING_PUNCTUATION.sub('', question)
+
+def make_key(question, model_name, generation_config, context=None):
+    """
+    Build the cache key for a question.
+
+    Args:
+        question (str): The user's question
+        model_name (str): Model that produces the answer
+        generation_config (dict): Sampling parameters passed to the model
+        context (dict): User-context fields that appear in the prompt
+
+    Returns:
+        str: Hex digest identifying the answer
+    """
+    payload = json.dumps([normalize_question(question), model_name, generation_config, context or {}],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class MemoryBackend:
+    """In-process LRU store."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteBackend:
+    """Store shared by every worker process through a local SQLite file."""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+
+    def get(self, key):
+        now = time.time()
+        with connection(self.path) as conn:
+            row = conn.execute('SELECT value FROM chat_cache WHERE key = ? AND expires_at > ?',
+                               (key, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE chat_cache SET last_used = ? WHERE key = ?', (now, key))
+        return row['value']
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with connection(self.path) as conn:
+            conn.execute('''INSERT OR REPLACE INTO chat_cache (key, value, expires_at, last_used)
+                            VALUES (?, ?, ?, ?)''', (key, value, now + ttl, now))
+            conn.execute('''DELETE FROM chat_cache WHERE expires_at <= ? OR key IN
+                            (SELECT key FROM chat_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)''',
+                         (now, self.max_entries))
+
+    def __len__(self):
+        with connection(self.path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM chat_cache').fetchone()[0]
+
+class ResponseCache:
+    """TTL cache of chatbot answers with hit/miss counters."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Chat cache read error: {e}")
+            self._count('errors')
+            return None
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value, self.ttl)
+            self._count('stores')
+        except Exception as e:
+            print(f"Chat cache write error: {e}")
+            self._count('errors')
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__
+        return stats
+
+def create_cache(name=None):
+    """Build the response cache for the configured backend."""
+    name = name or backend_name
+    if name == 'sqlite':
+        return ResponseCache(SQLiteBackend(CHAT_CACHE_DB, max_entries), cache_ttl)
+    return ResponseCache(MemoryBackend(max_entries), cache_ttl)
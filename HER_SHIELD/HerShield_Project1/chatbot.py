@@ -0,0 +1,509 @@
+"""
+Gemini model and prompt assembly for the HerShield chatbot.
+
+The model object is created once per worker process and carries the
+generation config, so requests do not rebuild either. The instructions
+that never change are kept in ``SYSTEM_PROMPT``; each request only adds the
+user-context block, recent history and the question.
+
+Model calls run on a small pool with a latency budget. When the budget runs
+out the route answers from the local fallback instead of waiting for a
+network timeout, and the late answer is handed to a callback so it can be
+cached for next time. A call is not repeated while it is still running: the
+same prompt asked again (a retry after the fallback, or the page falling
+back from the stream to the JSON route) waits on the call in flight.
+
+Keyword routing (the emergency shortcut, offline fallback answers and
+follow-up suggestions) is driven by one regex compiled at import time;
+``classify()`` runs it once per message and every consumer reads the result.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import os
+import queue
+import re
+import threading
+
+import google.generativeai as genai
+
+# Chatbot model and sampling parameters (both are part of the response cache key)
+CHAT_MODEL_NAME = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro-latest')
+CHAT_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.9,
+    'top_k': 40,
+    'max_output_tokens': 2048
+}
+
+# Seconds to wait for the model (for streaming: for each chunk) before falling back
+llm_timeout = float(os.getenv('CHATBOT_LLM_TIMEOUT', '6'))
+# Model calls in flight at once per worker process
+llm_workers = int(os.getenv('CHATBOT_LLM_WORKERS', '8'))
+
+SYSTEM_PROMPT = """You are HerShield AI, an intelligent, empathetic, and highly responsive AI assistant designed specifically to help women with any questions, concerns, or challenges they may face. You are warm, supportive, and always prioritize safety and empowerment.
+
+**Your Core Expertise:**
+- Women's safety and personal security (primary focus)
+- Self-defense techniques and strategies
+- Emergency procedures and crisis management
+- Physical and mental health for women
+- Legal rights and resources (especially Indian context)
+- Personal development and empowerment
+- Relationship advice and boundaries
+- Career guidance and workplace issues
+- General life advice and support
+
+**Response Guidelines:**
+1. **Be Comprehensive**: Provide detailed, thorough answers that address all aspects of the question
+2. **Be Supportive**: Always maintain an empathetic and encouraging tone
+3. **Be Practical**: Offer actionable advice and concrete steps when applicable
+4. **Be Accurate**: Provide fact-based information and cite reliable sources when possible
+5. **Be Safety-Focused**: Prioritize safety in all responses, especially for emergency situations
+6. **Be Inclusive**: Consider diverse perspectives and experiences
+7. **Be Professional**: Maintain appropriate boundaries while being warm and approachable
+8. **Be Contextual**: Reference previous conversation context when relevant
+9. **Be Proactive**: Anticipate follow-up questions and provide comprehensive information
+10. **Be Encouraging**: Always end with a supportive or empowering note
+
+**Emergency Protocol:**
+- If someone mentions being in immediate danger, emphasize calling emergency services (100 in India)
+- Encourage using the SOS feature in the HerShield app
+- Provide clear, step-by-step emergency procedures
+- Offer immediate, actionable safety advice
+
+**Response Style:**
+- Use clear, accessible language
+- Include relevant emojis for warmth and visual appeal
+- Structure responses with bullet points or numbered lists when helpful
+- Provide examples and scenarios when relevant
+- Use markdown formatting for better readability
+- Keep responses conversational but informative
+- Always end with encouragement or a supportive note
+
+**Context Awareness:**
+- Remember previous conversation topics
+- Build on previous advice given
+- Maintain conversation continuity
+- Reference earlier points when relevant
+
+**Smart Features:**
+- Provide personalized advice based on context
+- Offer proactive suggestions and tips
+- Anticipate user needs and concerns
+- Provide multiple options and alternatives
+- Include relevant resources and references
+
+"""
+
+# Intent labels produced by classify()
+URGENT = 'urgent'
+
+# First-person, present-tense phrases meaning someone is in danger right now; these
+# get the local emergency answer and suggestions without waiting for the model. Questions about
+# danger ("what should I do if I'm attacked", "is it not safe to walk at night")
+# still go to the model for a full answer.
+URGENT_KEYWORDS = ['i am in danger', "i'm in danger", 'i’m in danger', 'being attacked', 'attacking me',
+                   'being followed', 'following me', 'threatening me', 'i feel unsafe', 'i am not safe',
+                   "i'm not safe", 'i’m not safe']
+
+# Follow-up suggestions, checked in this order; the first matching category wins
+SUGGESTION_KEYWORDS = {
+    'emergency': ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe'],
+    'safety': ['safety', 'safe', 'protect', 'security'],
+    'health': ['health', 'healthy', 'wellness', 'medical', 'doctor'],
+    'relationship': ['relationship', 'dating', 'partner', 'marriage'],
+    'career': ['career', 'job', 'work', 'profession']
+}
+
+SUGGESTIONS = {
+    'emergency': ["How to use the SOS feature", "Emergency contact setup", "Self-defense techniques",
+                  "Safety planning tips"],
+    'safety': ["Daily safety practices", "Technology safety tips", "Travel safety guidelines",
+               "Self-defense basics"],
+    'health': ["Mental health resources", "Physical wellness tips", "Preventive care guide",
+               "Stress management techniques"],
+    'relationship': ["Setting healthy boundaries", "Communication skills", "Red flags to watch for",
+                     "Building self-worth"],
+    'career': ["Career development tips", "Workplace rights", "Salary negotiation", "Professional confidence"]
+}
+
+# When no category matches, suggestions follow the topics the answer covered
+RESPONSE_TOPIC_SUGGESTIONS = {
+    'safety': "More safety tips",
+    'health': "Health and wellness resources",
+    'confidence': "Building self-confidence",
+    'legal': "Legal rights and resources"
+}
+
+GENERAL_SUGGESTIONS = ["Ask me anything else", "Emergency contacts setup", "Self-defense techniques"]
+
+# Offline answers, checked in this order; the first matching category wins
+FALLBACK_KEYWORDS = {
+    'emergency': ['emergency', 'danger', 'help', 'sos', 'attack', 'threat', 'unsafe', 'scared', 'fear'],
+    'safety': ['safety', 'safe', 'protect', 'security', 'secure', 'dangerous', 'unsafe'],
+    'self defense': ['self defense', 'self-defense', 'defend', 'fight', 'protect', 'martial arts', 'attack'],
+    'health': ['health', 'healthy', 'wellness', 'medical', 'doctor', 'exercise', 'diet', 'sick', 'pain'],
+    'confidence': ['confidence', 'confident', 'self-esteem', 'self worth', 'empowerment', 'shy', 'nervous'],
+    'mental': ['mental health', 'mental', 'anxiety', 'depression', 'stress', 'therapy', 'sad', 'worried'],
+    'legal': ['legal', 'rights', 'law', 'lawyer', 'court', 'harassment', 'discrimination', 'abuse'],
+    'transport': ['transport', 'bus', 'train', 'metro', 'travel', 'commute', 'public transport', 'traveling'],
+    'relationship': ['relationship', 'dating', 'marriage', 'partner', 'boyfriend', 'girlfriend', 'love', 'breakup'],
+    'career': ['career', 'job', 'work', 'profession', 'business', 'employment', 'salary', 'promotion']
+}
+
+FALLBACK_RESPONSES = {
+    'emergency': "🚨 **EMERGENCY RESPONSE** 🚨\n\nIf you're in immediate danger:\n\n1. **Call 100 immediately** - Police emergency number\n2. **Use the SOS button** in this app to alert your emergency contacts\n3. **Find a safe location** - Go to a well-lit, public area\n4. **Stay visible** - Make yourself seen by others\n5. **Trust your instincts** - If something feels wrong, act on it\n\n**Remember**: Your safety is the absolute priority. Don't hesitate to call for help.\n\n💪 You're stronger than you think, and help is always available.",
+    
+    'safety': "🛡️ **COMPREHENSIVE SAFETY GUIDELINES** 🛡️\n\n**Daily Safety Practices:**\n• Trust your instincts - if something feels wrong, it probably is\n• Stay aware of your surroundings at all times\n• Keep your phone charged and easily accessible\n• Share your location with trusted contacts when traveling\n• Carry a personal safety alarm or whistle\n• Learn basic self-defense techniques\n\n**Technology Safety:**\n• Use location-sharing apps with trusted friends\n• Keep emergency contacts updated\n• Consider safety apps like HerShield\n• Be cautious with social media location sharing\n\n**Mental Safety:**\n• Build confidence through self-care\n• Practice situational awareness\n• Develop a safety mindset\n• Trust your judgment\n\n💪 Remember: You have the right to feel safe and secure.",
+    
+    'self defense': "🥋 **SELF-DEFENSE COMPREHENSIVE GUIDE** 🥋\n\n**Mental Preparation:**\n• Develop situational awareness\n• Trust your instincts\n• Stay calm under pressure\n• Be mentally prepared to defend yourself\n\n**Basic Techniques:**\n• **Voice as weapon**: Yell 'FIRE!' to attract attention\n• **Target vulnerable areas**: Eyes, nose, throat, groin\n• **Use your body**: Elbows, knees, head for striking\n• **Create distance**: Push, kick, or run when possible\n\n**Prevention Strategies:**\n• Avoid isolated areas\n• Walk with confidence\n• Keep hands free and ready\n• Learn pressure points\n• Practice basic moves regularly\n\n**Training Recommendations:**\n• Take a self-defense class\n• Practice with a partner\n• Learn martial arts basics\n• Attend women's safety workshops\n\n💪 Knowledge is power - the more you know, the safer you are!",
+    
+    'health': "💪 **WOMEN'S HEALTH & WELLNESS GUIDE** 💪\n\n**Physical Health:**\n• Regular health checkups and screenings\n• Balanced nutrition with adequate vitamins\n• Regular exercise (30+ minutes daily)\n• Adequate sleep (7-9 hours)\n• Stay hydrated (8+ glasses of water)\n\n**Mental Health:**\n• Practice mindfulness and meditation\n• Maintain social connections\n• Seek professional help when needed\n• Practice stress management techniques\n• Set healthy boundaries\n\n**Preventive Care:**\n• Annual gynecological exams\n• Breast self-examinations\n• Bone density screenings\n• Mental health check-ins\n• Regular dental care\n\n**Lifestyle Tips:**\n• Limit alcohol and avoid smoking\n• Practice safe sex\n• Manage stress effectively\n• Prioritize self-care\n• Build a support network\n\n💪 Your health is your foundation - invest in it daily!",
+    
+    'confidence': "💎 **BUILDING UNSTOPPABLE CONFIDENCE** 💎\n\n**Self-Care Foundation:**\n• Practice daily self-love and acceptance\n• Celebrate small wins and achievements\n• Take care of your physical appearance\n• Maintain good posture and body language\n\n**Mental Strength:**\n• Challenge negative self-talk\n• Practice positive affirmations\n• Set and achieve small goals\n• Learn from failures and setbacks\n• Develop a growth mindset\n\n**Social Confidence:**\n• Practice speaking up in safe environments\n• Set and maintain healthy boundaries\n• Surround yourself with supportive people\n• Learn to say 'no' without guilt\n• Express your opinions respectfully\n\n**Professional Confidence:**\n• Develop your skills and expertise\n• Take on new challenges\n• Advocate for yourself at work\n• Build a professional network\n• Ask for what you deserve\n\n**Daily Practices:**\n• Power posing for 2 minutes daily\n• Gratitude journaling\n• Visualization exercises\n• Positive self-talk\n• Regular exercise\n\n💎 Confidence is a skill you can develop - start today!",
+    
+    'mental': "🧠 **MENTAL HEALTH & WELLNESS COMPREHENSIVE GUIDE** 🧠\n\n**Understanding Mental Health:**\n• Mental health is as important as physical health\n• It's okay to not be okay sometimes\n• Seeking help is a sign of strength, not weakness\n• Everyone experiences mental health challenges\n\n**Daily Wellness Practices:**\n• **Mindfulness**: Practice meditation or deep breathing\n• **Gratitude**: Keep a gratitude journal\n• **Movement**: Exercise releases endorphins\n• **Connection**: Maintain meaningful relationships\n• **Sleep**: Prioritize quality sleep\n• **Nutrition**: Eat brain-healthy foods\n\n**Stress Management:**\n• Identify your stress triggers\n• Practice time management\n• Learn to delegate tasks\n• Take regular breaks\n• Use relaxation techniques\n• Set realistic expectations\n\n**When to Seek Help:**\n• Persistent sadness or anxiety\n• Changes in sleep or appetite\n• Difficulty concentrating\n• Withdrawal from activities\n• Thoughts of self-harm\n• Feeling overwhelmed\n\n**Professional Support:**\n• Therapists and counselors\n• Psychiatrists for medication\n• Support groups\n• Crisis hotlines\n• Online therapy platforms\n\n🧠 Remember: Your mental health matters, and you deserve support!",
+    
+    'legal': "⚖️ **WOMEN'S LEGAL RIGHTS & RESOURCES** ⚖️\n\n**Key Legal Protections in India:**\n• **Protection of Women from Domestic Violence Act, 2005**\n• **Sexual Harassment of Women at Workplace Act, 2013**\n• **Maternity Benefit Act, 1961**\n• **Equal Remuneration Act, 1976**\n• **Dowry Prohibition Act, 1961**\n\n**Your Rights Include:**\n• Right to live free from violence and harassment\n• Right to equal pay for equal work\n• Right to maternity benefits\n• Right to file complaints without fear\n• Right to legal aid and support\n\n**Emergency Contacts:**\n• **Women Helpline**: 1091\n• **Domestic Violence Helpline**: 181\n• **Police Emergency**: 100\n• **Child Helpline**: 1098\n\n**Legal Resources:**\n• National Commission for Women\n• State Women Commissions\n• Legal Aid Services\n• Women's Rights Organizations\n• Pro Bono Legal Services\n\n**Steps to Take:**\n• Document incidents with dates and details\n• Keep evidence (photos, messages, medical reports)\n• File complaints with appropriate authorities\n• Seek legal counsel when needed\n• Connect with support groups\n\n⚖️ Knowledge of your rights is your first line of defense!",
+    
+    'transport': "🚌 **PUBLIC TRANSPORT SAFETY COMPREHENSIVE GUIDE** 🚌\n\n**Before Traveling:**\n• Plan your route in advance\n• Share your travel plans with trusted contacts\n• Keep emergency contacts easily accessible\n• Charge your phone fully\n• Carry a personal safety alarm\n\n**While Traveling:**\n• Stay alert and aware of surroundings\n• Keep belongings close and secure\n• Sit near other women when possible\n• Avoid isolated areas of transport\n• Trust your instincts about people\n\n**Safety Strategies:**\n• **Bus Safety**: Sit near the driver or conductor\n• **Train Safety**: Choose women's compartments when available\n• **Metro Safety**: Stay in well-lit areas\n• **Auto/Taxi Safety**: Share ride details with contacts\n• **Walking**: Stay in well-lit, populated areas\n\n**Technology Safety:**\n• Use ride-sharing apps with safety features\n• Share live location with trusted contacts\n• Keep emergency apps ready\n• Use women-only transport options when available\n\n**Emergency Response:**\n• Know emergency numbers by heart\n• Use panic buttons on transport apps\n• Alert authorities if you feel unsafe\n• Exit at the next stop if uncomfortable\n• Call for help immediately if threatened\n\n🚌 Stay safe, stay alert, and trust your instincts!",
+    
+    'relationship': "💕 **HEALTHY RELATIONSHIPS & BOUNDARIES** 💕\n\n**Building Healthy Relationships:**\n• **Communication**: Open, honest, and respectful dialogue\n• **Trust**: Foundation of any strong relationship\n• **Respect**: Mutual respect for boundaries and feelings\n• **Support**: Emotional and practical support for each other\n• **Equality**: Balanced power dynamics\n\n**Setting Boundaries:**\n• **Identify your limits**: Know what you're comfortable with\n• **Communicate clearly**: Express boundaries respectfully\n• **Be consistent**: Maintain boundaries consistently\n• **Respect others**: Honor others' boundaries too\n• **Self-care**: Prioritize your well-being\n\n**Red Flags to Watch For:**\n• Controlling behavior or jealousy\n• Disrespect for your boundaries\n• Emotional or physical abuse\n• Isolation from friends and family\n• Financial control or manipulation\n• Gaslighting or manipulation\n\n**Building Self-Worth:**\n• Practice self-love and acceptance\n• Develop independence and interests\n• Maintain your own friendships\n• Pursue your goals and dreams\n• Don't compromise your values\n\n**Seeking Help:**\n• Talk to trusted friends or family\n• Consider professional counseling\n• Contact domestic violence hotlines\n• Join support groups\n• Prioritize your safety\n\n💕 You deserve relationships that lift you up, not bring you down!",
+    
+    'career': "💼 **WOMEN'S CAREER DEVELOPMENT & EMPOWERMENT** 💼\n\n**Career Planning:**\n• **Self-Assessment**: Identify your strengths and interests\n• **Goal Setting**: Set clear, achievable career goals\n• **Skill Development**: Continuously upgrade your skills\n• **Networking**: Build professional relationships\n• **Mentorship**: Seek guidance from experienced professionals\n\n**Overcoming Challenges:**\n• **Gender Bias**: Address bias professionally and assertively\n• **Work-Life Balance**: Set boundaries and prioritize effectively\n• **Imposter Syndrome**: Recognize your achievements and worth\n• **Salary Negotiation**: Research and advocate for fair compensation\n• **Leadership**: Develop leadership skills and confidence\n\n**Professional Development:**\n• **Continuous Learning**: Stay updated with industry trends\n• **Certifications**: Pursue relevant certifications\n• **Public Speaking**: Develop communication skills\n• **Leadership Training**: Take on leadership opportunities\n• **Mentoring Others**: Share your knowledge and experience\n\n**Workplace Rights:**\n• **Equal Pay**: Advocate for fair compensation\n• **Safe Environment**: Report harassment and discrimination\n• **Maternity Benefits**: Know your rights and benefits\n• **Flexible Work**: Request reasonable accommodations\n• **Professional Growth**: Seek advancement opportunities\n\n**Building Confidence:**\n• **Celebrate Achievements**: Acknowledge your successes\n• **Take Risks**: Step out of your comfort zone\n• **Learn from Failures**: View setbacks as learning opportunities\n• **Self-Advocacy**: Speak up for yourself professionally\n• **Support Network**: Build relationships with other professionals\n\n💼 Your career is your journey - own it with confidence and purpose!"
+}
+
+GENERAL_FALLBACK = "I'm here to help you with any questions or concerns you might have! Whether it's about safety, health, relationships, career, or anything else, I'm ready to provide detailed, supportive guidance. Please feel free to ask me anything - no question is too big or too small. 💪\n\n**Some topics I can help with:**\n• Safety and self-defense\n• Physical and mental health\n• Relationships and boundaries\n• Career development\n• Legal rights and resources\n• Personal growth and confidence\n• Emergency procedures\n• And much more!"
+
+def _trie_pattern(keywords, anchored=()):
+    # Factor shared prefixes ("safe", "safety", "secure", ...) into a trie so
+    # the regex engine tries one branch per character instead of every keyword
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        # The end marker holds whether the keyword must end at a word boundary
+        node[''] = node.get('', False) or keyword in anchored
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        end = r'\b' if node.get('') else ''
+        if not branches:
+            return end
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' not in node:
+            return body
+        # Longer keywords are tried first, so the longest keyword at a position wins
+        return f'(?:{body}|{end})' if end else f'(?:{body})?'
+
+    return build(trie)
+
+def _build_matcher(labelled_keywords):
+    """
+    Compile every keyword into one regex.
+
+    Keywords must start at a word boundary. A single word may be followed
+    by more letters, so "safe" still matches "safely" while "work" no
+    longer matches "homework". Phrases, and every urgent keyword, must also
+    end at one, so "following me" does not match "following medical
+    advice". A keyword found inside a longer one ("health" in "mental
+    health") contributes its labels too, because the regex only reports
+    the longest keyword at each position.
+    """
+    labels = {}
+    for label, keywords in labelled_keywords:
+        for keyword in keywords:
+            labels.setdefault(keyword, set()).add(label)
+    for keyword in labels:
+        for other in labels:
+            if other != keyword and re.search(r'\b' + re.escape(other), keyword):
+                labels[keyword] |= labels[other]
+    anchored = {keyword for keyword, found in labels.items() if ' ' in keyword or URGENT in found}
+    pattern = re.compile(r'\b' + _trie_pattern(labels, anchored))
+    return pattern, {keyword: frozenset(found) for keyword, found in labels.items()}
+
+_INTENT_PATTERN, _KEYWORD_LABELS = _build_matcher(
+    # An urgent message skips the model, so it must also pick the emergency answer and suggestions
+    [(label, URGENT_KEYWORDS) for label in (URGENT, 'suggest:emergency', 'fallback:emergency')] +
+    [('suggest:' + category, keywords) for category, keywords in SUGGESTION_KEYWORDS.items()] +
+    [('fallback:' + category, keywords) for category, keywords in FALLBACK_KEYWORDS.items()]
+)
+_SUGGESTION_ORDER = [('suggest:' + category, SUGGESTIONS[category]) for category in SUGGESTION_KEYWORDS]
+_FALLBACK_ORDER = [('fallback:' + category, FALLBACK_RESPONSES[category]) for category in FALLBACK_KEYWORDS]
+_TOPIC_PATTERN = re.compile(r'\b(?:' + '|'.join(RESPONSE_TOPIC_SUGGESTIONS) + ')')
+
+def classify(text):
+    """
+    Find every intent a message mentions in one pass.
+
+    Args:
+        text (str): The user's message
+
+    Returns:
+        frozenset: Labels such as ``URGENT``, ``'suggest:safety'`` or ``'fallback:legal'``
+    """
+    return frozenset().union(*[_KEYWORD_LABELS[keyword] for keyword in _INTENT_PATTERN.findall(text.lower())])
+
+def is_emergency(intents):
+    """Whether classified intents say someone is in danger right now."""
+    return URGENT in intents
+
+def suggestions_for(intents, ai_response):
+    """
+    Pick up to four follow-up suggestions.
+
+    Args:
+        intents (frozenset): classify() result for the user's message
+        ai_response (str): The answer being shown
+
+    Returns:
+        list: Suggestion strings
+    """
+    suggestions = []
+    for label, category_suggestions in _SUGGESTION_ORDER:
+        if label in intents:
+            suggestions.extend(category_suggestions)
+            break
+    else:
+        covered = set(_TOPIC_PATTERN.findall(ai_response.lower()))
+        suggestions.extend(text for topic, text in RESPONSE_TOPIC_SUGGESTIONS.items() if topic in covered)
+    suggestions.extend(GENERAL_SUGGESTIONS)
+    # Unique suggestions, at most 4
+    return list(dict.fromkeys(suggestions))[:4]
+
+def fallback_for(intents):
+    """Return the offline answer (markdown) for classified intents."""
+    for label, response in _FALLBACK_ORDER:
+        if label in intents:
+            return response
+    return GENERAL_FALLBACK
+
+_model = None
+_model_pid = None
+_model_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_inflight = {}
+_inflight_pid = None
+_inflight_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'llm_calls': 0, 'joined_calls': 0, 'timeouts': 0, 'late_answers': 0, 'errors': 0,
+          'emergency_shortcuts': 0}
+
+def get_model():
+    """Return this process's chatbot model, creating it on first use."""
+    global _model, _model_pid
+    if _model is not None and _model_pid == os.getpid():
+        return _model
+    with _model_lock:
+        # A forked worker must not share the parent's gRPC channel
+        if _model is None or _model_pid != os.getpid():
+            _model = genai.GenerativeModel(
+                CHAT_MODEL_NAME,
+                generation_config=genai.types.GenerationConfig(**CHAT_GENERATION_CONFIG)
+            )
+            _model_pid = os.getpid()
+    return _model
+
+def reset_model():
+    """Drop the cached model so the next request builds a new one."""
+    global _model
+    with _model_lock:
+        _model = None
+
+def build_prompt(user_input, history, user_context):
+    """
+    Assemble the full prompt for one question.
+
+    Args:
+        user_input (str): The user's question
+        history (list): Earlier messages ({'type': 'user'|'bot', 'content': ...})
+        user_context (dict): Output of get_user_context()
+
+    Returns:
+        str: SYSTEM_PROMPT followed by the per-request sections
+    """
+    parts = [
+        SYSTEM_PROMPT,
+        "**User Context:**\n",
+        f"- User Name: {user_context.get('name', 'User')}\n",
+        f"- Has Emergency Contacts: {user_context.get('has_emergency_contacts', False)}\n",
+        f"- User ID: {user_context.get('user_id', 'Not logged in')}\n\n",
+        "Now, please respond to the user's question with a comprehensive, helpful, and supportive answer "
+        "that takes into account the conversation history and provides the most relevant and actionable "
+        "information.\n"
+    ]
+    if history:
+        parts.append("\n\n**Conversation History:**\n")
+        for msg in history[-5:]:  # Last 5 messages for context
+            if msg.get('type') == 'user':
+                parts.append(f"User: {msg.get('content', '')}\n")
+            elif msg.get('type') == 'bot':
+                parts.append(f"Assistant: {msg.get('content', '')}\n")
+    parts.append(f"\n\n**Current User Question:** {user_input}\n\nPlease provide a detailed, comprehensive "
+                 "response that addresses all aspects of this question, considers the conversation context, "
+                 "and offers actionable advice.")
+    return ''.join(parts)
+
+def count(name):
+    """Increment one of the chatbot counters reported by chat_metrics()."""
+    with _stats_lock:
+        _stats[name] += 1
+
+def chat_metrics():
+    """Return the chatbot model-call counters."""
+    with _stats_lock:
+        return dict(_stats, llm_timeout=llm_timeout)
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _model_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix='chatbot-llm')
+            _executor_pid = os.getpid()
+        return _executor
+
+def _generate(prompt):
+    return get_model().generate_content(prompt).text.strip()
+
+def _submit(prompt, call):
+    """
+    Run ``call`` on the model pool unless a call for ``prompt`` is already running.
+
+    Returns:
+        tuple: (future, started) where ``future`` resolves to the answer text
+        and ``started`` is False when an earlier call was joined
+    """
+    global _inflight, _inflight_pid
+    with _inflight_lock:
+        # A forked worker inherits the parent's futures but not the threads running them
+        if _inflight_pid != os.getpid():
+            _inflight, _inflight_pid = {}, os.getpid()
+        future = _inflight.get(prompt)
+        if future is not None:
+            count('joined_calls')
+            return future, False
+        count('llm_calls')
+        future = _inflight[prompt] = _get_executor().submit(call)
+    future.add_done_callback(lambda done: _forget(prompt, done))
+    return future, True
+
+def _forget(prompt, future):
+    with _inflight_lock:
+        if _inflight.get(prompt) is future:
+            del _inflight[prompt]
+
+def generate_with_deadline(prompt, timeout=None, on_late=None):
+    """
+    Ask the model for an answer, giving up after ``timeout`` seconds.
+
+    If the same prompt is already being answered, this waits on that call
+    instead of starting another.
+
+    Args:
+        prompt (str): The full prompt
+        timeout (float): Latency budget in seconds (defaults to CHATBOT_LLM_TIMEOUT)
+        on_late (callable): Called with the answer if it arrives after the deadline
+
+    Returns:
+        str: The answer, or None if the deadline passed first
+
+    Raises:
+        Exception: Whatever the model call raised before the deadline
+    """
+    future, _ = _submit(prompt, lambda: _generate(prompt))
+    return _wait(future, llm_timeout if timeout is None else timeout, on_late)
+
+def _wait(future, timeout, on_late):
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        count('timeouts')
+        if on_late:
+            future.add_done_callback(lambda done: _deliver_late(done, on_late))
+        return None
+    except Exception:
+        count('errors')
+        raise
+
+def _deliver_late(future, on_late):
+    if future.exception() is not None:
+        return
+    count('late_answers')
+    try:
+        on_late(future.result())
+    except Exception as e:
+        print(f"Error storing late chatbot answer: {e}")
+
+def stream_with_deadline(prompt, timeout=None, on_late=None):
+    """
+    Stream the model's answer, giving up if any chunk takes longer than ``timeout``.
+
+    If the same prompt is already being answered, the answer of that call is
+    yielded as one chunk once it is ready, within ``timeout``.
+
+    Args:
+        prompt (str): The full prompt
+        timeout (float): Seconds allowed per chunk (defaults to CHATBOT_LLM_TIMEOUT)
+        on_late (callable): Called with the full answer if the stream is abandoned
+            but the model finishes anyway
+
+    Yields:
+        str: Text chunks as the model produces them
+
+    Raises:
+        TimeoutError: A chunk missed the deadline
+        Exception: Whatever the model call raised
+    """
+    timeout = llm_timeout if timeout is None else timeout
+    chunks = queue.Queue()
+    abandoned = threading.Event()
+
+    def produce():
+        text = []
+        try:
+            for chunk in get_model().generate_content(prompt, stream=True):
+                if chunk.text:
+                    text.append(chunk.text)
+                    chunks.put(chunk.text)
+        except Exception as e:
+            chunks.put(e)
+            raise
+        chunks.put(None)
+        answer = ''.join(text).strip()
+        if abandoned.is_set() and on_late:
+            count('late_answers')
+            try:
+                on_late(answer)
+            except Exception as e:
+                print(f"Error storing late chatbot answer: {e}")
+        # Callers that joined this call wait on the future for the whole answer
+        return answer
+
+    future, started = _submit(prompt, produce)
+    if not started:
+        answer = _wait(future, timeout, on_late)
+        if answer is None:
+            raise TimeoutError(f"no model answer within {timeout}s")
+        if answer:
+            yield answer
+        return
+    try:
+        while True:
+            try:
+                item = chunks.get(timeout=timeout)
+            except queue.Empty:
+                abandoned.set()
+                count('timeouts')
+                raise TimeoutError(f"no model output within {timeout}s")
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                count('errors')
+                raise item
+            yield item
+    except GeneratorExit:
+        # The client went away; let the model finish for the cache
+        abandoned.set()
+        raise
@@ -0,0 +1,124 @@
+"""
+Registry of the static content pages: health tips, self-defense and latest articles.
+
+Their tips, videos and articles live in ``content/*.json`` and only change
+with a deploy. Each page is rendered once per worker and the HTML bytes are
+kept with a strong ETag (a hash of the body) and a Last-Modified taken from
+the template and data files. A repeat visit that sends If-None-Match or
+If-Modified-Since gets an empty 304.
+
+When Flask reloads templates (debug or TEMPLATES_AUTO_RELOAD), the files'
+mtimes are checked on every request and a changed page is rendered again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from flask import Response, current_app, render_template, request
+from werkzeug.http import http_date
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content')
+
+# Page name -> (template, data file whose keys are the template's variables)
+PAGES = {
+    'health_tips': ('health_tips.html', 'health_tips.json'),
+    'self_defense': ('self_defense.html', 'self_defense.json'),
+    'latest_articles': ('latest_articles.html', 'latest_articles.json')
+}
+
+class RenderedPage:
+    __slots__ = ('version', 'body', 'etag', 'last_modified', 'headers')
+
+    def __init__(self, version, body, etag, last_modified):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # The pages sit behind login: private, and revalidated on every visit rather than cached blindly
+        self.headers = [('ETag', f'"{etag}"'), ('Last-Modified', http_date(last_modified)),
+                        ('Cache-Control', 'private, no-cache')]
+
+_pages = {}
+_lock = threading.Lock()
+_stats = {'renders': 0, 'served': 0, 'not_modified': 0}
+
+def _paths(name):
+    template, data_file = PAGES[name]
+    app = current_app
+    return os.path.join(app.root_path, app.template_folder, template), os.path.join(CONTENT_DIR, data_file)
+
+def _version(name):
+    return tuple(os.stat(path).st_mtime_ns for path in _paths(name))
+
+def load_content(name):
+    """
+    Read a page's data file.
+
+    Args:
+        name (str): Page name, a key of PAGES
+
+    Returns:
+        dict: Template variables, e.g. {'articles': [...]}
+    """
+    with open(_paths(name)[1], encoding='utf-8') as f:
+        return json.load(f)
+
+def render_page(name):
+    """
+    Return a page's rendered HTML, rendering it only the first time (or after its files change).
+
+    Args:
+        name (str): Page name, a key of PAGES
+
+    Returns:
+        RenderedPage: body bytes, ETag, Last-Modified (whole seconds since the epoch), response headers
+            and the version they were rendered at
+    """
+    page = _pages.get(name)
+    if page is not None and not current_app.jinja_env.auto_reload:
+        return page
+
+    version = _version(name)
+    if page is not None and page.version == version:
+        return page
+
+    body = render_template(PAGES[name][0], **load_content(name)).encode('utf-8')
+    page = RenderedPage(version, body, hashlib.sha256(body).hexdigest()[:32], max(version) // 1_000_000_000)
+    with _lock:
+        _pages[name] = page
+        _stats['renders'] += 1
+    return page
+
+def page_response(name):
+    """
+    Build the response for a content page, a 304 if the browser's copy is current.
+
+    If-None-Match wins over If-Modified-Since, as RFC 9110 asks. The headers
+    are built once per render, so a hit does no header parsing or formatting
+    beyond reading the request's validators.
+
+    Args:
+        name (str): Page name, a key of PAGES
+
+    Returns:
+        flask.Response: 200 with the cached HTML, or 304 Not Modified
+    """
+    page = render_page(name)
+    if 'If-None-Match' in request.headers:
+        not_modified = request.if_none_match.contains(page.etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and since.timestamp() >= page.last_modified
+
+    with _lock:
+        _stats['not_modified' if not_modified else 'served'] += 1
+    if not_modified:
+        return Response(status=304, headers=page.headers)
+    return Response(page.body, headers=page.headers, mimetype='text/html')
+
+def content_metrics():
+    """Return render, 200 and 304 counts and the pages currently cached."""
+    with _lock:
+        return dict(_stats, cached_pages=sorted(_pages))
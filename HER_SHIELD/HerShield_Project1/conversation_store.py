@@ -0,0 +1,203 @@
+"""
+Chatbot conversation history storage.
+
+Recent turns are kept in a bounded per-user ring buffer, so building the
+chatbot prompt normally does not touch disk. New turns go into the buffer
+at once and are written to ``conversation_history`` in batches by a
+background writer. The schema comes from the migrations, not from the
+request path.
+
+Other worker processes write to the same table, so a buffer older than
+``max_staleness`` seconds is checked against the user's newest row id
+before it is used, and reloaded if that has moved. Writing this process's
+own turns moves the buffer's newest id along with them, so only turns
+from elsewhere cause a reload. A batch that fails to write goes back on
+the queue for the next pass.
+"""
+
+import atexit
+from collections import OrderedDict, deque
+import datetime
+import os
+import threading
+import time
+
+from db import USERS_DB, connect, connection
+
+# Turns remembered per user in memory
+buffer_turns = int(os.getenv('HISTORY_BUFFER_TURNS', '10'))
+# Users whose buffers are kept (least recently used are evicted)
+max_users = int(os.getenv('HISTORY_CACHE_USERS', '1000'))
+# Reload a buffer from the database after this many seconds regardless
+buffer_ttl = float(os.getenv('HISTORY_BUFFER_TTL', '300'))
+# How long a buffer is trusted before checking for turns written by other workers (seconds)
+max_staleness = float(os.getenv('HISTORY_MAX_STALENESS', '2'))
+# Seconds between background batch writes
+flush_interval = float(os.getenv('HISTORY_FLUSH_INTERVAL', '1'))
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+# user_id -> {'loaded_at': float, 'checked_at': float, 'newest_id': int, 'complete': bool,
+#             'turns': deque of turns, oldest first}
+_buffers = OrderedDict()
+_pending = []
+_flush_requested = threading.Event()
+_writer = None
+_writer_pid = None
+
+def record_turn(user_id, user_input, ai_response, context_used=False):
+    """
+    Remember a chatbot exchange and queue it for the database.
+
+    Args:
+        user_id (int): The logged-in user
+        user_input (str): What the user asked
+        ai_response (str): The rendered answer
+        context_used (bool): Whether earlier history was part of the prompt
+    """
+    timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    turn = {'user_input': user_input, 'ai_response': ai_response, 'timestamp': timestamp}
+    with _lock:
+        buffer = _buffers.get(user_id)
+        if buffer is not None:
+            buffer['turns'].append(turn)
+            _buffers.move_to_end(user_id)
+        _pending.append((user_id, user_input, ai_response, context_used, timestamp))
+
+    _start_writer()
+    if len(_pending) >= 50:
+        _flush_requested.set()
+
+def recent_turns(user_id, limit=10):
+    """
+    Return a user's most recent turns, newest first.
+
+    Args:
+        user_id (int): The logged-in user
+        limit (int): Maximum number of turns
+
+    Returns:
+        list: Dicts with user_input, ai_response and timestamp
+    """
+    now = time.monotonic()
+    with _lock:
+        buffer = _buffers.get(user_id)
+        usable = (buffer is not None and now - buffer['loaded_at'] < buffer_ttl
+                  and (limit <= len(buffer['turns']) or buffer['complete']))
+        if usable and now - buffer['checked_at'] < max_staleness:
+            _buffers.move_to_end(user_id)
+            return list(reversed(buffer['turns']))[:limit]
+
+    # Holding the flush lock, a turn is either in the database or still in _pending, never in between
+    with _flush_lock:
+        with connection(USERS_DB) as conn:
+            newest_id = conn.execute('SELECT MAX(id) FROM conversation_history WHERE user_id = ?',
+                                     (user_id,)).fetchone()[0] or 0
+            if usable and newest_id == buffer['newest_id']:
+                # Nothing new from any process since the buffer was loaded
+                with _lock:
+                    if _buffers.get(user_id) is buffer:
+                        buffer['checked_at'] = now
+                        _buffers.move_to_end(user_id)
+                        return list(reversed(buffer['turns']))[:limit]
+            load = max(limit, buffer_turns)
+            rows = conn.execute('''SELECT user_input, ai_response, timestamp
+                                   FROM conversation_history
+                                   WHERE user_id = ?
+                                   ORDER BY timestamp DESC, id DESC
+                                   LIMIT ?''', (user_id, load)).fetchall()
+        saved = [{'user_input': row['user_input'], 'ai_response': row['ai_response'],
+                  'timestamp': row['timestamp']} for row in rows]
+
+        # Under the same lock record_turn() takes, so a turn is either merged here or appended to the new buffer
+        with _lock:
+            unwritten = [{'user_input': pending[1], 'ai_response': pending[2], 'timestamp': pending[4]}
+                         for pending in _pending if pending[0] == user_id]
+            turns = unwritten[::-1] + saved
+            _buffers[user_id] = {
+                'loaded_at': now,
+                'checked_at': now,
+                'newest_id': newest_id,
+                'complete': len(rows) < load,
+                'turns': deque(reversed(turns[:buffer_turns]), maxlen=buffer_turns)
+            }
+            _buffers.move_to_end(user_id)
+            while len(_buffers) > max_users:
+                _buffers.popitem(last=False)
+    return turns[:limit]
+
+def flush(conn=None):
+    """
+    Write queued turns to the database in one transaction.
+
+    Raises:
+        Exception: Whatever the write raised; the turns are queued again first
+    """
+    global _pending
+    with _flush_lock:
+        with _lock:
+            rows, _pending = _pending, []
+        if not rows:
+            return
+        try:
+            if conn is None:
+                with connection(USERS_DB) as conn:
+                    written = _write(conn, rows)
+            else:
+                written = _write(conn, rows)
+        except Exception:
+            with _lock:
+                # Ahead of anything recorded meanwhile, so the order is kept
+                _pending[:0] = rows
+            raise
+
+        with _lock:
+            for user_id, (previous_id, newest_id) in written.items():
+                buffer = _buffers.get(user_id)
+                # The buffer already holds these turns; if it was current before them it still is
+                if buffer is not None and buffer['newest_id'] == previous_id:
+                    buffer['newest_id'] = newest_id
+
+def _write(conn, rows):
+    """Insert turns; returns {user_id: (newest id before them, newest id after)}."""
+    written = {}
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for row in rows:
+            row_id = conn.execute('''INSERT INTO conversation_history
+                                     (user_id, user_input, ai_response, context_used, timestamp)
+                                     VALUES (?, ?, ?, ?, ?)''', row).lastrowid
+            first_id = written.get(row[0], (row_id,))[0]
+            written[row[0]] = (first_id, row_id)
+        # Nobody else can write during the transaction, so the rows before each user's first new one are the rest
+        for user_id, (first_id, newest_id) in written.items():
+            previous_id = conn.execute('SELECT MAX(id) FROM conversation_history WHERE user_id = ? AND id < ?',
+                                       (user_id, first_id)).fetchone()[0] or 0
+            written[user_id] = (previous_id, newest_id)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return written
+
+def _run_writer():
+    conn = connect(USERS_DB)
+    while True:
+        _flush_requested.wait(flush_interval)
+        _flush_requested.clear()
+        try:
+            flush(conn)
+        except Exception as e:
+            print(f"❌ Error saving conversation history, will retry: {str(e)}")
+
+def _start_writer():
+    global _writer, _writer_pid
+    if _writer is not None and _writer_pid == os.getpid():
+        return
+    with _lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = threading.Thread(target=_run_writer, name='conversation-writer', daemon=True)
+            _writer_pid = os.getpid()
+            _writer.start()
+
+atexit.register(flush)
@@ -0,0 +1,92 @@
+"""
+SQLite connection management.
+
+Each request gets at most one connection per database, stored on Flask's
+``g`` and closed when the app context tears down. Connections run in
+autocommit mode: every statement is its own short transaction, so a write
+lock is never held while a greenlet is switched out waiting on network
+I/O, which is what made concurrent SOS inserts fail with
+"database is locked".
+"""
+
+from contextlib import contextmanager
+import os
+import sqlite3
+
+from flask import g, has_app_context
+
+DATABASE_DIR = 'database'
+USERS_DB = os.path.join(DATABASE_DIR, 'users.db')
+ALERTS_DB = os.path.join(DATABASE_DIR, 'alerts.db')
+OUTBOX_DB = os.path.join(DATABASE_DIR, 'outbox.db')
+CHAT_CACHE_DB = os.path.join(DATABASE_DIR, 'chat_cache.db')
+RATE_LIMIT_DB = os.path.join(DATABASE_DIR, 'rate_limits.db')
+
+# How long a writer waits for another process's write to finish (milliseconds)
+busy_timeout = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# Page cache per connection (KiB)
+cache_size_kib = int(os.getenv('SQLITE_CACHE_SIZE_KIB', '8192'))
+
+def connect(path):
+    """
+    Open a SQLite connection with the app's pragmas applied.
+
+    Args:
+        path (str): Database file path
+
+    Returns:
+        sqlite3.Connection: Autocommit connection returning ``sqlite3.Row`` rows
+    """
+    conn = sqlite3.connect(path, timeout=busy_timeout / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f'PRAGMA cache_size = -{cache_size_kib}')
+    return conn
+
+def enable_wal(path):
+    """Switch a database to WAL journaling; the setting persists in the file."""
+    os.makedirs(DATABASE_DIR, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.close()
+
+def get_connection(path):
+    """Return the current request's connection to ``path``, opening it on first use."""
+    connections = g.setdefault('db_connections', {})
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = connect(path)
+    return conn
+
+@contextmanager
+def connection(path):
+    """
+    Borrow a connection to ``path``.
+
+    Inside a request this is the request's shared connection; elsewhere
+    (background workers, scripts) a dedicated connection is opened and
+    closed around the block.
+    """
+    if has_app_context():
+        yield get_connection(path)
+        return
+    conn = connect(path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def get_db_connection():
+    """Return the current request's users.db connection."""
+    return get_connection(USERS_DB)
+
+def get_alert_connection():
+    """Return the current request's alerts.db connection."""
+    return get_connection(ALERTS_DB)
+
+def close_connections(exception=None):
+    """Close every connection opened during the request."""
+    for conn in g.pop('db_connections', {}).values():
+        conn.close()
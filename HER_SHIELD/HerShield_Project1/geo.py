@@ -0,0 +1,180 @@
+"""
+Geohash helpers for finding alerts by location.
+
+A geohash names a cell of a recursive grid, and every point inside the
+cell has a hash that starts with the cell's name. Stored in an indexed
+text column, geohashes turn "alerts near here" into a few index range
+scans: cover the search area with cells, read each cell's range, then
+keep the candidates that are really inside, using the exact distance.
+"""
+
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+EARTH_RADIUS_M = 6371000
+METRES_PER_DEGREE = 111320
+# Precision stored on alerts: cells of about 5 m x 5 m
+STORED_PRECISION = 9
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    """
+    Return the geohash of a point.
+
+    Args:
+        latitude (float): Latitude in degrees
+        longitude (float): Longitude in degrees
+        precision (int): Number of characters
+
+    Returns:
+        str: The geohash
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        coordinate, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+def decode_bbox(geohash):
+    """Return the (lat_min, lat_max, lon_min, lon_max) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+def cell_size(precision):
+    """Return the (height, width) of cells at ``precision``, in degrees."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+def cover_bbox(lat_min, lat_max, lon_min, lon_max, max_cells=32):
+    """
+    Cover a bounding box with as fine geohash cells as ``max_cells`` allows.
+
+    Boxes that cross the antimeridian are not split; see split_antimeridian().
+
+    Returns:
+        list: Sorted geohash prefixes whose cells together contain the box
+    """
+    lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+    lon_min, lon_max = max(lon_min, -180.0), min(lon_max, 180.0)
+    precision = 1
+    for candidate in range(1, STORED_PRECISION + 1):
+        height, width = cell_size(candidate)
+        rows = math.floor((lat_max + 90) / height) - math.floor((lat_min + 90) / height) + 1
+        columns = math.floor((lon_max + 180) / width) - math.floor((lon_min + 180) / width) + 1
+        if rows * columns > max_cells:
+            break
+        precision = candidate
+
+    height, width = cell_size(precision)
+    cells = set()
+    row = math.floor((lat_min + 90) / height)
+    while row * height - 90 <= lat_max and row * height < 180:
+        column = math.floor((lon_min + 180) / width)
+        while column * width - 180 <= lon_max and column * width < 360:
+            # Encode the middle of the cell so rounding cannot pick a neighbour
+            cells.add(encode(row * height - 90 + height / 2, column * width - 180 + width / 2, precision))
+            column += 1
+        row += 1
+    return sorted(cells)
+
+def _successor(prefix):
+    """The smallest same-length string after every hash starting with ``prefix``, or None."""
+    chars = list(prefix)
+    for position in range(len(chars) - 1, -1, -1):
+        index = _DECODE[chars[position]]
+        if index < len(BASE32) - 1:
+            chars[position] = BASE32[index + 1]
+            return ''.join(chars)
+        chars[position] = BASE32[0]
+    return None
+
+def prefix_ranges(prefixes):
+    """
+    Turn sorted geohash prefixes into half-open ``[low, high)`` string ranges.
+
+    Neighbouring cells that are also consecutive in geohash order share
+    one range, so a range scan covers them together. ``high`` is None for
+    a range that runs to the end of the keyspace.
+    """
+    ranges = []
+    for prefix in prefixes:
+        high = _successor(prefix)
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1][1] = high
+        else:
+            ranges.append([prefix, high])
+    return [tuple(bounds) for bounds in ranges]
+
+def split_antimeridian(lat_min, lat_max, lon_min, lon_max):
+    """
+    Split a box into boxes that stay within -180..180 degrees longitude.
+
+    A box crosses the antimeridian when ``lon_min > lon_max`` or when a
+    bound lies outside -180..180, as radius_bbox() produces near it.
+
+    Returns:
+        list: One or two (lat_min, lat_max, lon_min, lon_max) boxes
+    """
+    if lon_min > lon_max:
+        lon_max += 360
+    if lon_max - lon_min >= 360:
+        return [(lat_min, lat_max, -180.0, 180.0)]
+    if lon_min < -180:
+        return [(lat_min, lat_max, lon_min + 360, 180.0), (lat_min, lat_max, -180.0, lon_max)]
+    if lon_max > 180:
+        return [(lat_min, lat_max, lon_min, 180.0), (lat_min, lat_max, -180.0, lon_max - 360)]
+    return [(lat_min, lat_max, lon_min, lon_max)]
+
+def radius_bbox(latitude, longitude, radius_m):
+    """Return the (lat_min, lat_max, lon_min, lon_max) box around a circle."""
+    dlat = radius_m / METRES_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    # Near the poles the box spans every longitude
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, radius_m / (METRES_PER_DEGREE * cos_lat))
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
+
+def parse_location(text):
+    """
+    Read the ``"lat,lon"`` text stored in alerts.location.
+
+    Returns:
+        tuple: (latitude, longitude), or None if the text is not a valid pair
+    """
+    try:
+        latitude, longitude = (float(part) for part in str(text).split(','))
+    except (TypeError, ValueError):
+        return None
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None
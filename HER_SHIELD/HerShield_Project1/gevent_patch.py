@@ -0,0 +1,34 @@
+"""
+gevent monkey-patching for the production server.
+
+Patching has to happen before anything imports ``socket``, ``ssl`` or
+``threading``; a module that grabbed the unpatched versions first keeps
+blocking the whole worker. ``gunicorn.conf.py`` calls ``patch_all()`` in
+each worker right after it forks, leaving the arbiter unpatched, and
+``wsgi.py`` calls it on its first line, so the app is never imported
+unpatched whichever way the server is started.
+
+gRPC, which the Gemini client uses by default, has its own I/O loop and is
+made cooperative separately.
+"""
+
+def patch_all():
+    """
+    Monkey-patch the standard library for gevent, once per process.
+
+    Returns:
+        bool: True if gevent is installed and the process is patched
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if not monkey.is_module_patched('socket'):
+        monkey.patch_all()
+        try:
+            from grpc.experimental import gevent as grpc_gevent
+        except ImportError:
+            pass
+        else:
+            grpc_gevent.init_gevent()
+    return True
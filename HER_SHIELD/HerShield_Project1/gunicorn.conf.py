@@ -0,0 +1,63 @@
+"""
+Production server profile for gunicorn: ``gunicorn -c gunicorn.conf.py wsgi:app``
+
+One gevent worker process per CPU core the host gives us, each serving many
+connections as greenlets. A worker only ever uses one core, so extra cores
+need extra processes; blocking work inside a worker (password hashes,
+hotspot aggregation) runs on native threads, see ``offload.py``.
+
+Workers share nothing in memory, so anything that must hold across them
+lives in SQLite or the environment: the session signing key is generated
+once here, before the workers fork, if SECRET_KEY is not set, and rate limits
+move to the SQLite store.
+
+The arbiter (master) process stays unpatched; gevent is only for the
+workers. Each worker patches right after it forks, in ``post_fork``, before
+it imports the app.
+"""
+
+import os
+import secrets
+
+from dotenv import load_dotenv
+
+# The same settings the app will see, so a SECRET_KEY in .env is not replaced below
+load_dotenv()
+
+def _cpu_count():
+    try:
+        # Cores this process may run on, which a container can limit below the host's
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Worker processes (Heroku sets WEB_CONCURRENCY from the dyno size)
+workers = int(os.getenv('WEB_CONCURRENCY') or _cpu_count())
+worker_class = 'gevent'
+# Open connections each worker serves at once, SSE streams included
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '1000'))
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Seconds a worker may go without checking in before it is restarted
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+# Idle seconds a keep-alive connection is held open
+keepalive = 5
+# Each worker imports the app itself, after forking, so it opens its own databases and threads
+preload_app = False
+
+if not os.getenv('SECRET_KEY'):
+    # Every worker must sign sessions with the same key; this one lasts until the next restart
+    os.environ['SECRET_KEY'] = secrets.token_hex(32)
+    print("⚠️ SECRET_KEY is not set; sessions will not survive a restart")
+if workers > 1:
+    # A per-process store would give each worker its own budget
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'sqlite')
+
+def post_fork(server, worker):
+    from gevent_patch import patch_all
+
+    # Before the worker imports ssl, socket or threading
+    patch_all()
+
+def when_ready(server):
+    print(f"🚀 Serving on {bind}: {workers} gevent workers x {worker_connections} connections")
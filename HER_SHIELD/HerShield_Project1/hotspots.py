@@ -0,0 +1,274 @@
+"""
+Incident hotspot tiles for the ops map.
+
+Alerts are binned by where the SOS was raised into geohash tiles at a few
+precisions, and by hour and by day, and the counts are stored in the
+``alert_tiles`` table. A background job folds in new alerts after a
+watermark (the last alert id aggregated), so each alert is binned exactly
+once. The binning is vectorized with NumPy, one chunk of alerts at a time,
+outside any write transaction so /sos inserts are never held up by it.
+Viewport reads are index range scans over the pre-aggregated tiles and
+never touch the alerts themselves.
+"""
+
+from itertools import repeat
+import os
+import threading
+import time
+
+import numpy as np
+
+from db import ALERTS_DB, connection
+from offload import run_blocking
+from geo import BASE32, cell_size, cover_bbox, decode_bbox, prefix_ranges, split_antimeridian
+
+# Tile precisions kept, in geohash characters (4: ~39 km, 5: ~4.9 km, 6: ~1.2 km)
+precisions = tuple(sorted(int(p) for p in os.getenv('HOTSPOT_PRECISIONS', '4,5,6').split(',')))
+# Seconds between aggregation passes of the background job
+job_interval = float(os.getenv('HOTSPOT_JOB_INTERVAL', '60'))
+# Alerts binned per transaction
+chunk_size = int(os.getenv('HOTSPOT_CHUNK', '5000'))
+# A viewport read picks the finest precision that needs at most this many tiles
+max_tiles = int(os.getenv('HOTSPOT_MAX_TILES', '2000'))
+
+# Time bucket widths in seconds; buckets start on UTC hour and day boundaries
+GRANULARITIES = {'hour': 3600, 'day': 86400}
+
+_BASE32_CHARS = np.array(list(BASE32))
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def geohash_codes(latitudes, longitudes, precision):
+    """
+    Geohash many points at once.
+
+    Returns:
+        numpy.ndarray: The geohashes as integers, 5 bits per character
+    """
+    bits = precision * 5
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_cells = np.floor((np.asarray(longitudes, dtype=np.float64) + 180) / 360 * 2 ** lon_bits)
+    lat_cells = np.floor((np.asarray(latitudes, dtype=np.float64) + 90) / 180 * 2 ** lat_bits)
+    # 180 degrees of longitude and 90 of latitude belong to the last cell
+    lon_cells = np.clip(lon_cells, 0, 2 ** lon_bits - 1).astype(np.int64)
+    lat_cells = np.clip(lat_cells, 0, 2 ** lat_bits - 1).astype(np.int64)
+
+    # Interleave the bits, longitude first, most significant first
+    codes = np.zeros(lon_cells.shape, dtype=np.int64)
+    for bit in range(bits):
+        if bit % 2 == 0:
+            value = (lon_cells >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_cells >> (lat_bits - 1 - bit // 2)) & 1
+        codes = (codes << 1) | value
+    return codes
+
+def codes_to_geohashes(codes, precision):
+    """Turn integers from geohash_codes() back into geohash strings."""
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    chars = _BASE32_CHARS[(np.asarray(codes, dtype=np.int64)[:, None] >> shifts) & 31]
+    return np.ascontiguousarray(chars).view(f'<U{precision}').ravel()
+
+def bin_alerts(latitudes, longitudes, created_at):
+    """
+    Count alerts per tile and time bucket.
+
+    Args:
+        latitudes, longitudes (array-like): Where each alert was raised
+        created_at (array-like): Unix time of each alert
+
+    Returns:
+        list: (precision, granularity, tile, bucket start, count) rows
+    """
+    created_at = np.asarray(created_at, dtype=np.float64)
+    if not len(created_at):
+        return []
+    finest = max(precisions)
+    codes = geohash_codes(latitudes, longitudes, finest)
+    rows = []
+    for granularity, width in GRANULARITIES.items():
+        buckets = np.floor(created_at / width).astype(np.int64)
+        offset = buckets.min()
+        span = int(buckets.max() - offset) + 1
+        for precision in precisions:
+            # Coarser tiles are prefixes of the finest one
+            tiles = codes >> (5 * (finest - precision))
+            keys, counts = np.unique(tiles * span + (buckets - offset), return_counts=True)
+            rows.extend(zip(repeat(precision), repeat(granularity),
+                            codes_to_geohashes(keys // span, precision).tolist(),
+                            ((keys % span + offset) * width).tolist(), counts.tolist()))
+    return rows
+
+def _parse_locations(locations):
+    """Split "lat,lon" texts into two float arrays."""
+    parts = np.char.partition(np.array(locations, dtype=str), ',')
+    return parts[:, 0].astype(np.float64), parts[:, 2].astype(np.float64)
+
+def _read_chunk(conn, limit):
+    """Return (watermark, alerts after it) from one read snapshot."""
+    conn.execute('BEGIN')
+    try:
+        row = conn.execute("SELECT last_alert_id FROM hotspot_state WHERE name = 'alert_tiles'").fetchone()
+        watermark = row['last_alert_id'] if row else 0
+        # Alerts without coordinates have location text that is not a "lat,lon" pair
+        alerts = conn.execute('''
+            SELECT id, location, COALESCE(created_at, 0) AS created_at, latitude IS NOT NULL AS placed
+            FROM alerts WHERE id > ?
+            ORDER BY id LIMIT ?
+        ''', (watermark, limit)).fetchall()
+    finally:
+        conn.execute('COMMIT')
+    return watermark, alerts
+
+def aggregate_pending(conn, limit=None):
+    """
+    Bin alerts added since the last pass into alert_tiles.
+
+    Each chunk is read and binned without a write lock. The counts are then
+    written in a short transaction that only commits if the watermark is
+    still the one the chunk was read after, so concurrent workers never
+    count an alert twice; a worker that lost the race reads again.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        limit (int): Alerts per chunk (defaults to ``chunk_size``)
+
+    Returns:
+        int: Number of alerts aggregated by this call
+    """
+    total = 0
+    while True:
+        watermark, alerts = _read_chunk(conn, limit or chunk_size)
+        if not alerts:
+            return total
+        placed = [alert for alert in alerts if alert['placed']]
+        rows = []
+        if placed:
+            latitudes, longitudes = _parse_locations([alert['location'] for alert in placed])
+            rows = bin_alerts(latitudes, longitudes, [alert['created_at'] for alert in placed])
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute("INSERT OR IGNORE INTO hotspot_state (name, last_alert_id) VALUES ('alert_tiles', 0)")
+            advanced = conn.execute('''
+                UPDATE hotspot_state SET last_alert_id = ?
+                WHERE name = 'alert_tiles' AND last_alert_id = ?
+            ''', (alerts[-1]['id'], watermark)).rowcount
+            if not advanced:
+                # Another worker aggregated this chunk first
+                conn.execute('ROLLBACK')
+                continue
+            conn.executemany('''
+                INSERT INTO alert_tiles (precision, granularity, tile, bucket, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (precision, granularity, tile, bucket) DO UPDATE SET count = count + excluded.count
+            ''', rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        total += len(alerts)
+
+def choose_precision(lat_min, lat_max, lon_min, lon_max):
+    """Return the finest stored precision that covers the viewport in at most ``max_tiles`` tiles."""
+    width_degrees = sum(box[3] - box[2] for box in split_antimeridian(lat_min, lat_max, lon_min, lon_max))
+    for precision in reversed(precisions):
+        height, width = cell_size(precision)
+        if ((lat_max - lat_min) / height + 1) * (width_degrees / width + 1) <= max_tiles:
+            return precision
+    return precisions[0]
+
+def read_tiles(conn, lat_min, lat_max, lon_min, lon_max, granularity='day', since=None, until=None,
+               precision=None, series=False):
+    """
+    Read the alert counts of the tiles in a viewport.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        lat_min, lat_max, lon_min, lon_max (float): The viewport; lon_min > lon_max crosses the antimeridian
+        granularity (str): 'hour' or 'day'
+        since, until (float): Count buckets starting in [since, until) (Unix times)
+        precision (int): Tile precision (defaults to choose_precision())
+        series (bool): Also return each tile's count per bucket
+
+    Returns:
+        dict: precision, granularity and tiles, each tile with its geohash,
+        bounds, and count (and ``series`` of [bucket, count] pairs)
+
+    Raises:
+        ValueError: If the granularity or precision is not stored
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    precision = precision or choose_precision(lat_min, lat_max, lon_min, lon_max)
+    if precision not in precisions:
+        raise ValueError(f"precision must be one of {', '.join(map(str, precisions))}")
+
+    tiles = {}
+    for box in split_antimeridian(lat_min, lat_max, lon_min, lon_max):
+        prefixes = sorted({prefix[:precision] for prefix in cover_bbox(*box)})
+        for low, high in prefix_ranges(prefixes):
+            clauses, params = ['precision = ?', 'granularity = ?', 'tile >= ?'], [precision, granularity, low]
+            if high is not None:
+                clauses.append('tile < ?')
+                params.append(high)
+            if since is not None:
+                clauses.append('bucket >= ?')
+                params.append(since)
+            if until is not None:
+                clauses.append('bucket < ?')
+                params.append(until)
+            group = 'tile, bucket' if series else 'tile'
+            for row in conn.execute(f'''
+                SELECT tile, {'bucket' if series else 'NULL'} AS bucket, SUM(count) AS count
+                FROM alert_tiles WHERE {' AND '.join(clauses)}
+                GROUP BY {group}
+            ''', params):
+                south, north, west, east = decode_bbox(row['tile'])
+                # Cover cells overhang the viewport; keep only tiles that overlap it
+                if north < box[0] or south > box[1] or east < box[2] or west > box[3]:
+                    continue
+                tile = tiles.setdefault(row['tile'], {
+                    'tile': row['tile'], 'south': south, 'north': north, 'west': west, 'east': east, 'count': 0
+                })
+                tile['count'] += row['count']
+                if series:
+                    tile.setdefault('series', []).append([row['bucket'], row['count']])
+    return {'precision': precision, 'granularity': granularity, 'tiles': list(tiles.values())}
+
+def _aggregate():
+    with connection(ALERTS_DB) as conn:
+        return aggregate_pending(conn)
+
+def _run_worker():
+    while True:
+        try:
+            # Binning a backlog takes seconds; on a native thread it does not stall a gevent worker
+            aggregated = run_blocking(_aggregate)
+            if aggregated:
+                print(f"🗺️ Hotspot tiles: aggregated {aggregated} alerts")
+        except Exception as e:
+            print(f"❌ Hotspot worker error: {str(e)}")
+        time.sleep(job_interval)
+
+def start_hotspot_worker():
+    """Start the background aggregation job for this process if it is not running."""
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        # A forked worker process inherits the variables but not the thread
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = threading.Thread(target=_run_worker, name='hotspot-tiles', daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
+
+if __name__ == "__main__":
+    # Catch up in one go, e.g. after restoring a backup: python hotspots.py
+    from migrations import migrate_all
+
+    migrate_all()
+    with connection(ALERTS_DB) as conn:
+        print(f"✅ Aggregated {aggregate_pending(conn)} alerts into hotspot tiles")
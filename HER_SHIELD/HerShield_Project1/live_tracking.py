@@ -0,0 +1,228 @@
+"""
+Live location tracking for active SOS alerts.
+
+While an SOS is active the dashboard posts each position fix it gets. The
+fixes are appended to the ``alert_locations`` table in alerts.db.
+Emergency contacts get a single link to ``/track/<share_token>``, and that
+page follows the alert over Server-Sent Events. They no longer get an SMS
+for every fix. The link is a bearer token, so it stops working
+``resolved_grace`` seconds after the alert is resolved.
+
+A new fix wakes the streams in the same process straight away. Streams
+served by other worker processes see it at their next poll of the table.
+"""
+
+import os
+import secrets
+import threading
+import time
+
+# Seconds a tracking stream waits for a fix before checking the table again
+poll_interval = float(os.getenv('TRACK_POLL_INTERVAL', '1'))
+# Seconds between keep-alive comments on an idle tracking stream
+keepalive_interval = float(os.getenv('TRACK_KEEPALIVE_INTERVAL', '15'))
+# Seconds before a tracking stream ends; the browser reconnects where it left off
+stream_lifetime = float(os.getenv('TRACK_STREAM_LIFETIME', '600'))
+# Most fixes sent in one event batch when a page (re)connects
+backlog_limit = int(os.getenv('TRACK_BACKLOG_LIMIT', '500'))
+# Most fixes the dashboard may upload in one request
+max_batch = int(os.getenv('TRACK_MAX_BATCH', '200'))
+# Oldest device timestamp accepted for a fix (seconds); anything else gets the server's time
+max_fix_age = float(os.getenv('TRACK_MAX_FIX_AGE', '86400'))
+# Seconds a tracking link keeps working after its alert is resolved
+resolved_grace = float(os.getenv('TRACK_RESOLVED_GRACE', '900'))
+
+# Latest fix id per alert, for waking streams in this process
+_latest = {}
+_changed = threading.Condition()
+
+def new_share_token():
+    """Return an unguessable token for an alert's tracking link."""
+    return secrets.token_urlsafe(16)
+
+def parse_fix(location, now=None):
+    """
+    Validate one posted location.
+
+    Args:
+        location (dict): latitude, longitude and optionally accuracy (metres)
+            and recorded_at (Unix time the device took the fix)
+        now (float): Current Unix time (defaults to now)
+
+    Returns:
+        tuple: (latitude, longitude, accuracy, recorded_at) for record_locations()
+
+    Raises:
+        KeyError, TypeError, ValueError: If the coordinates are missing or invalid
+    """
+    now = now or time.time()
+    latitude, longitude = float(location['latitude']), float(location['longitude'])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range')
+    accuracy = location.get('accuracy')
+    accuracy = float(accuracy) if accuracy is not None else None
+    try:
+        recorded_at = float(location.get('recorded_at'))
+    except (TypeError, ValueError):
+        recorded_at = now
+    # A device clock that is far off would put the fix in the wrong place on the track
+    if not now - max_fix_age <= recorded_at <= now + 60:
+        recorded_at = now
+    return latitude, longitude, accuracy, recorded_at
+
+def record_location(conn, alert_id, latitude, longitude, accuracy=None, recorded_at=None):
+    """
+    Append a position fix to an alert's track and wake its streams.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert_id (int): Id of the active alert
+        latitude (float): Latitude in degrees
+        longitude (float): Longitude in degrees
+        accuracy (float): Reported accuracy radius in metres, if known
+        recorded_at (float): Unix time of the fix (defaults to now)
+
+    Returns:
+        int: Id of the stored fix
+    """
+    return record_locations(conn, alert_id, [(latitude, longitude, accuracy, recorded_at)])
+
+def record_locations(conn, alert_id, fixes):
+    """
+    Append a batch of position fixes to an alert's track in one transaction.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert_id (int): Id of the active alert
+        fixes (list): (latitude, longitude, accuracy, recorded_at) tuples;
+            accuracy and recorded_at may be None
+
+    Returns:
+        int: Id of the last stored fix
+    """
+    now = time.time()
+    rows = [(alert_id, latitude, longitude, accuracy, now if recorded_at is None else recorded_at)
+            for latitude, longitude, accuracy, recorded_at in fixes]
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany('''
+            INSERT INTO alert_locations (alert_id, latitude, longitude, accuracy, recorded_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    notify(alert_id, last_id)
+    return last_id
+
+def notify(alert_id, location_id):
+    """Tell this process's streams for ``alert_id`` about a new fix."""
+    with _changed:
+        _latest[alert_id] = max(location_id, _latest.get(alert_id, 0))
+        _changed.notify_all()
+
+def wait_for_update(alert_id, last_id, timeout):
+    """
+    Block until this process records a fix newer than ``last_id``.
+
+    Returns:
+        bool: True if woken by a fix, False on timeout (another process
+        may still have written one)
+    """
+    deadline = time.monotonic() + timeout
+    with _changed:
+        while _latest.get(alert_id, 0) <= last_id:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _changed.wait(remaining)
+        return True
+
+def locations_since(conn, alert_id, after_id=0, limit=None):
+    """
+    Read an alert's fixes in the order they were recorded.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert_id (int): Alert id
+        after_id (int): Only return fixes with a larger id
+        limit (int): Most fixes to return (defaults to ``backlog_limit``)
+
+    Returns:
+        list: Dicts with id, latitude, longitude, accuracy and recorded_at
+    """
+    rows = conn.execute('''
+        SELECT id, latitude, longitude, accuracy, recorded_at FROM alert_locations
+        WHERE alert_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (alert_id, after_id, limit or backlog_limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def track_between(conn, alert_id, start=None, end=None, limit=None):
+    """
+    Read the part of an alert's trajectory recorded in a time range.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert_id (int): Alert id
+        start (float): Earliest Unix time to include (defaults to no limit)
+        end (float): Latest Unix time to include (defaults to no limit)
+        limit (int): Most fixes to return (defaults to ``backlog_limit``)
+
+    Returns:
+        list: Dicts with id, latitude, longitude, accuracy and recorded_at,
+        oldest first
+    """
+    rows = conn.execute('''
+        SELECT id, latitude, longitude, accuracy, recorded_at FROM alert_locations
+        WHERE alert_id = ? AND recorded_at >= ? AND recorded_at <= ?
+        ORDER BY recorded_at
+        LIMIT ?
+    ''', (alert_id, float('-inf') if start is None else start, float('inf') if end is None else end,
+          limit or backlog_limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def latest_location(conn, alert_id):
+    """Return an alert's most recent fix as a dict, or None if it has none."""
+    row = conn.execute('''
+        SELECT id, latitude, longitude, accuracy, recorded_at FROM alert_locations
+        WHERE alert_id = ?
+        ORDER BY recorded_at DESC
+        LIMIT 1
+    ''', (alert_id,)).fetchone()
+    return dict(row) if row else None
+
+def find_alert(conn, share_token):
+    """Return the alert a tracking link points at, or None."""
+    return conn.execute('SELECT id, name, status, timestamp, resolved_at FROM alerts WHERE share_token = ?',
+                        (share_token,)).fetchone()
+
+def link_expired(alert, now=None):
+    """
+    Whether a tracking link may no longer show its alert.
+
+    Args:
+        alert (sqlite3.Row): Row from find_alert()
+        now (float): Unix time (defaults to the current time)
+
+    Returns:
+        bool: True once the alert has been resolved for longer than ``resolved_grace``;
+        an ended alert with no resolution time has expired
+    """
+    if alert['status'] == 'active':
+        return False
+    if alert['resolved_at'] is None:
+        return True
+    return (time.time() if now is None else now) - alert['resolved_at'] > resolved_grace
+
+def active_alert(conn, user_id):
+    """Return the user's most recent active alert, or None."""
+    return conn.execute('''
+        SELECT id, name, share_token FROM alerts
+        WHERE user_id = ? AND status = 'active'
+        ORDER BY id DESC
+        LIMIT 1
+    ''', (user_id,)).fetchone()
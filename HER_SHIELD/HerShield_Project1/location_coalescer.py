@@ -0,0 +1,263 @@
+"""
+Movement-based throttling of location-update SMS.
+
+Contacts follow an active SOS on its live tracking page. On top of that,
+they get a location SMS only when it tells them something new:
+
+- the user has moved ``min_distance_m`` from the position in the last SMS,
+- or ``heartbeat_interval`` has passed without one.
+
+Gaps are measured on the server clock, between the times fixes arrive; a
+phone's clock can be wrong or change, so the time it stamps on a fix is only
+stored with the position. A fix that is held back is kept as the alert's pending position, and a background job
+texts it once it qualifies. That way the last known position still goes
+out when the phone stops reporting, for example because its battery died.
+No number gets more than ``hourly_cap`` location updates in any hour,
+however many alerts it is a contact for.
+
+The last position texted for each alert, and each number's recent sends,
+are stored in alerts.db. That way every worker process makes the same
+decision.
+"""
+
+import os
+import threading
+import time
+
+from db import ALERTS_DB, connection
+from geo import haversine_m
+
+# Distance from the last texted position that is worth a new SMS (metres)
+min_distance_m = float(os.getenv('LOCATION_SMS_MIN_DISTANCE', '250'))
+# Shortest gap between two location SMS for one alert (seconds)
+min_interval = float(os.getenv('LOCATION_SMS_MIN_INTERVAL', '120'))
+# Send an update after this long even without movement (seconds, 0 to disable)
+heartbeat_interval = float(os.getenv('LOCATION_SMS_HEARTBEAT', '900'))
+# Most location SMS one phone number receives per hour
+hourly_cap = int(os.getenv('LOCATION_SMS_HOURLY_CAP', '6'))
+# Seconds between checks for held-back positions that are due
+flush_interval = float(os.getenv('LOCATION_SMS_FLUSH_INTERVAL', '15'))
+
+_stats_lock = threading.Lock()
+_stats = {'fixes': 0, 'updates': 0, 'sms': 0, 'too_soon': 0, 'not_moved': 0, 'capped': 0, 'held_updates': 0}
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def decide(last, latitude, longitude, now):
+    """
+    Decide whether a fix is worth a location SMS.
+
+    Args:
+        last (tuple): (latitude, longitude, sent_at) of the alert's last SMS
+        latitude (float): Latitude of the new fix
+        longitude (float): Longitude of the new fix
+        now (float): Server Unix time the fix arrived
+
+    Returns:
+        str: 'moved' or 'heartbeat' to send, 'too_soon' or 'not_moved' to hold it back
+    """
+    last_latitude, last_longitude, sent_at = last
+    elapsed = now - sent_at
+    if elapsed < min_interval:
+        return 'too_soon'
+    if haversine_m(last_latitude, last_longitude, latitude, longitude) >= min_distance_m:
+        return 'moved'
+    if heartbeat_interval and elapsed >= heartbeat_interval:
+        return 'heartbeat'
+    return 'not_moved'
+
+def start_alert(conn, alert_id, latitude, longitude, now=None, tracking_url=None):
+    """Record the SOS alert itself as the alert's last texted position, and the link later SMS carry."""
+    conn.execute('''
+        INSERT OR REPLACE INTO location_sms_state (alert_id, latitude, longitude, sent_at, tracking_url)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (alert_id, latitude, longitude, now or time.time(), tracking_url))
+
+def check_fix(conn, alert_id, latitude, longitude, recorded_at=None, now=None):
+    """
+    Decide whether a fix should be texted, claiming the send if so.
+
+    The check and the update of the alert's last texted position happen in
+    one write transaction, so two workers handling fixes for the same alert
+    cannot both send. A fix that is held back becomes the alert's pending
+    position, unless a fix the device took later is already pending; see
+    due_updates().
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        alert_id (int): Id of the active alert
+        latitude (float): Latitude of the new fix
+        longitude (float): Longitude of the new fix
+        recorded_at (float): Unix time the device took the fix (defaults to ``now``)
+        now (float): Server Unix time the fix arrived (defaults to now)
+
+    Returns:
+        tuple: (decision, distance_m) where decision is the decide() result
+        ('moved' and 'heartbeat' mean send) and distance_m is the distance
+        from the last texted position
+    """
+    now = now or time.time()
+    recorded_at = recorded_at or now
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT latitude, longitude, sent_at FROM location_sms_state WHERE alert_id = ?',
+                           (alert_id,)).fetchone()
+        if row is None:
+            # Alerts created before this table existed start from their first fix
+            decision, distance = 'not_moved', 0.0
+        else:
+            decision = decide(tuple(row), latitude, longitude, now)
+            distance = haversine_m(row['latitude'], row['longitude'], latitude, longitude)
+        if row is None:
+            conn.execute('''
+                INSERT INTO location_sms_state (alert_id, latitude, longitude, sent_at)
+                VALUES (?, ?, ?, ?)
+            ''', (alert_id, latitude, longitude, now))
+        elif decision in ('moved', 'heartbeat'):
+            conn.execute('''
+                UPDATE location_sms_state
+                SET latitude = ?, longitude = ?, sent_at = ?,
+                    pending_latitude = NULL, pending_longitude = NULL, pending_at = NULL
+                WHERE alert_id = ?
+            ''', (latitude, longitude, now, alert_id))
+        else:
+            # An older fix from a late batch must not replace a newer pending one. Both times come
+            # from the same device clock, so they order its fixes even when that clock is off.
+            conn.execute('''
+                UPDATE location_sms_state SET pending_latitude = ?, pending_longitude = ?, pending_at = ?
+                WHERE alert_id = ? AND (pending_at IS NULL OR pending_at <= ?)
+            ''', (latitude, longitude, recorded_at, alert_id, recorded_at))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    _count('fixes')
+    _count('updates' if decision in ('moved', 'heartbeat') else decision)
+    return decision, distance
+
+def due_updates(conn, now=None):
+    """
+    Claim the held-back positions that now deserve a location SMS.
+
+    A pending position is texted once ``min_interval`` has passed since the
+    last SMS, if it is ``min_distance_m`` from that SMS's position or
+    ``heartbeat_interval`` has passed. Otherwise it stays pending. Positions
+    held for alerts that are no longer active are dropped.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        now (float): Current Unix time (defaults to now)
+
+    Returns:
+        list: Dicts with alert_id, user_id, name, latitude, longitude,
+        distance_m, tracking_url and recorded_at, one per SMS to send
+    """
+    now = now or time.time()
+    updates = []
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        rows = conn.execute('''
+            SELECT s.alert_id, s.latitude, s.longitude, s.sent_at, s.pending_latitude, s.pending_longitude,
+                   s.pending_at, s.tracking_url, a.user_id, a.name, a.status
+            FROM location_sms_state s JOIN alerts a ON a.id = s.alert_id
+            WHERE s.pending_at IS NOT NULL AND s.sent_at <= ?
+        ''', (now - min_interval,)).fetchall()
+        for row in rows:
+            if row['status'] != 'active':
+                conn.execute('''UPDATE location_sms_state SET pending_latitude = NULL, pending_longitude = NULL,
+                                pending_at = NULL WHERE alert_id = ?''', (row['alert_id'],))
+                continue
+            latitude, longitude = row['pending_latitude'], row['pending_longitude']
+            decision = decide((row['latitude'], row['longitude'], row['sent_at']), latitude, longitude, now)
+            if decision not in ('moved', 'heartbeat'):
+                continue
+            conn.execute('''
+                UPDATE location_sms_state
+                SET latitude = ?, longitude = ?, sent_at = ?,
+                    pending_latitude = NULL, pending_longitude = NULL, pending_at = NULL
+                WHERE alert_id = ?
+            ''', (latitude, longitude, now, row['alert_id']))
+            updates.append({
+                'alert_id': row['alert_id'], 'user_id': row['user_id'], 'name': row['name'],
+                'latitude': latitude, 'longitude': longitude, 'recorded_at': row['pending_at'],
+                'distance_m': haversine_m(row['latitude'], row['longitude'], latitude, longitude),
+                'tracking_url': row['tracking_url']
+            })
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    _count('held_updates', len(updates))
+    return updates
+
+def claim_recipients(conn, phone_numbers, now=None):
+    """
+    Filter out numbers that have had ``hourly_cap`` location SMS in the last hour.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        phone_numbers (list): Numbers an update is about to be sent to
+        now (float): Current Unix time (defaults to now)
+
+    Returns:
+        list: The numbers to text; their sends are recorded against the cap
+    """
+    now = now or time.time()
+    allowed = []
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for number in phone_numbers:
+            conn.execute('DELETE FROM location_sms_sends WHERE to_number = ? AND sent_at <= ?',
+                         (number, now - 3600))
+            sent = conn.execute('SELECT COUNT(*) FROM location_sms_sends WHERE to_number = ?',
+                                (number,)).fetchone()[0]
+            if sent >= hourly_cap:
+                _count('capped')
+                continue
+            conn.execute('INSERT INTO location_sms_sends (to_number, sent_at) VALUES (?, ?)', (number, now))
+            allowed.append(number)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    _count('sms', len(allowed))
+    return allowed
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def _run_worker(send):
+    while True:
+        try:
+            with connection(ALERTS_DB) as conn:
+                for update in due_updates(conn):
+                    send(conn, update)
+        except Exception as e:
+            print(f"❌ Location SMS worker error: {str(e)}")
+        time.sleep(flush_interval)
+
+def start_location_worker(send):
+    """
+    Start the background job that texts held-back positions, if it is not running in this process.
+
+    Args:
+        send (callable): Called as ``send(conn, update)`` with an alerts.db
+            connection and each update from due_updates()
+    """
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        # A forked worker process inherits the variables but not the thread
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = threading.Thread(target=_run_worker, args=(send,), name='location-sms', daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
+
+def location_sms_metrics():
+    """Return the location SMS counters and thresholds."""
+    with _stats_lock:
+        return dict(_stats, min_distance_m=min_distance_m, min_interval=min_interval,
+                    heartbeat_interval=heartbeat_interval, hourly_cap=hourly_cap)
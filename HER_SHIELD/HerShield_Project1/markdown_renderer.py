@@ -0,0 +1,170 @@
+"""
+Markdown-to-HTML rendering for chatbot answers.
+
+Produces the same HTML the chatbot has always shown (bold, italic, ``•``
+and numbered list items grouped into ``<ul>``, line breaks as ``<br>``) in a
+single pass over the lines. Escaping and the inline patterns run over whole
+blocks of complete lines at once; only lines that can start a list item go
+through the slower per-line path. On top of the old output it escapes
+``&``, ``<`` and ``>`` in the model's text, and nests indented list items
+inside their parent item.
+
+``MarkdownRenderer`` accepts the text in pieces, so a streamed answer can be
+shown as it arrives without re-rendering everything before the last line.
+"""
+
+import copy
+import re
+
+_BOLD = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC = re.compile(r'\*(.*?)\*')
+_NUMBERED = re.compile(r'(\d+)\.\s*')
+# First characters of lines that may be (indented) list items
+_ITEM_START = frozenset(' \t•0123456789')
+
+def _inline(text):
+    # Neither pattern crosses a newline, so this works on one line or many
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '*' in text:
+        text = _BOLD.sub(r'<strong>\1</strong>', text)
+        text = _ITALIC.sub(r'<em>\1</em>', text)
+    return text
+
+class MarkdownRenderer:
+    """
+    Incremental renderer.
+
+    Call ``feed()`` with each piece of text, ``html()`` for a preview of
+    everything so far, and ``close()`` once the text is complete.
+    """
+
+    def __init__(self):
+        self._lines = []
+        self._partial = ''
+        # Indents of the open <ul> elements, outermost first
+        self._stack = []
+        # The last list item, held back until we know whether a nested list follows
+        self._held = None
+        # A list marker with nothing after it takes its text from the next non-blank line
+        self._pending_item = None
+
+    def feed(self, text):
+        """Add more text; complete lines are rendered straight away."""
+        text = self._partial + text
+        end = text.rfind('\n')
+        if end < 0:
+            self._partial = text
+            return
+        self._partial = text[end + 1:]
+        self._block(_inline(text[:end]).split('\n'))
+
+    def _block(self, lines):
+        output = self._lines
+        for line in lines:
+            if self._pending_item is None and not self._stack and (not line or line[0] not in _ITEM_START):
+                # Plain text outside a list: nothing to decide
+                output.append(line)
+            else:
+                self._line(line)
+
+    def close(self):
+        """
+        Finish rendering.
+
+        Returns:
+            str: The complete HTML
+        """
+        self._block([_inline(self._partial)])
+        self._partial = ''
+        if self._pending_item:
+            indent, prefix = self._pending_item
+            self._pending_item = None
+            self._item(indent, prefix, '')
+        self._close_lists()
+        return '<br>'.join(self._lines)
+
+    def html(self):
+        """Render everything fed so far as if the text ended here."""
+        preview = copy.copy(self)
+        preview._lines = []
+        preview._stack = list(self._stack)
+        preview.close()
+        return '<br>'.join(self._lines + preview._lines)
+
+    def _line(self, line):
+        if self._pending_item:
+            if not line.strip():
+                return
+            indent, prefix = self._pending_item
+            self._pending_item = None
+            self._item(indent, prefix, line.lstrip())
+            return
+
+        content = line.lstrip(' \t')
+        indent = len(line) - len(content)
+        if content.startswith('•'):
+            prefix, rest = '', content[1:]
+        else:
+            match = _NUMBERED.match(content)
+            if match is None:
+                self._text(line)
+                return
+            prefix, rest = match.group(1) + '. ', content[match.end():]
+
+        rest = rest.lstrip()
+        if not rest:
+            self._pending_item = (indent, prefix)
+            return
+        self._item(indent, prefix, rest)
+
+    def _item(self, indent, prefix, content):
+        item = f'<li>{prefix}{content}'
+        if not self._stack:
+            self._lines.append('<ul>')
+            self._stack.append(indent)
+        elif self._held is not None and indent > self._held[1]:
+            # Nested list: it goes inside the held item, which stays open
+            self._lines.append(self._held[0])
+            self._lines.append('<ul>')
+            self._stack.append(indent)
+            self._held = None
+        else:
+            self._release()
+            while len(self._stack) > 1 and indent < self._stack[-1]:
+                self._lines.append('</ul></li>')
+                self._stack.pop()
+        self._held = (item, indent)
+
+    def _text(self, line):
+        self._close_lists()
+        self._lines.append(line)
+
+    def _release(self):
+        if self._held is not None:
+            self._lines.append(self._held[0] + '</li>')
+            self._held = None
+
+    def _close_lists(self):
+        self._release()
+        while self._stack:
+            self._stack.pop()
+            self._lines.append('</ul></li>' if self._stack else '</ul>')
+
+def render_markdown(text):
+    """
+    Render a complete answer to HTML.
+
+    Args:
+        text (str): Markdown produced by the model or a fallback answer
+
+    Returns:
+        str: HTML safe to insert into the chat window
+    """
+    renderer = MarkdownRenderer()
+    renderer.feed(text)
+    return renderer.close()
@@ -0,0 +1,298 @@
+"""
+Versioned schema migrations for the HerShield databases.
+
+Each database records the last migration applied in ``PRAGMA user_version``.
+Migrations are applied in order, each one inside its own transaction, so
+both ``app.py`` and ``deploy.py`` can call ``migrate_all()`` at startup and
+several workers starting at once will not apply a step twice.
+
+A step is a list of SQL statements or callables taking the connection.
+Never edit a released step; append a new one instead.
+"""
+
+from alert_queries import parse_time
+from db import USERS_DB, ALERTS_DB, OUTBOX_DB, CHAT_CACHE_DB, RATE_LIMIT_DB, connect, enable_wal
+from geo import encode, parse_location
+
+def _backfill_alert_created_at(conn):
+    # alerts.timestamp holds whatever the client or datetime.now() produced
+    rows = conn.execute('SELECT id, timestamp FROM alerts WHERE created_at IS NULL').fetchall()
+    # Unreadable timestamps sort as the oldest alerts
+    conn.executemany('UPDATE alerts SET created_at = ? WHERE id = ?',
+                     ((parse_time(row['timestamp']) or 0.0, row['id']) for row in rows))
+
+def _backfill_alert_coordinates(conn):
+    # alerts.location is "lat,lon" text; alerts without a readable pair stay NULL
+    rows = conn.execute('SELECT id, location FROM alerts WHERE geohash IS NULL').fetchall()
+    points = ((parse_location(row['location']), row['id']) for row in rows)
+    conn.executemany('UPDATE alerts SET latitude = ?, longitude = ?, geohash = ? WHERE id = ?',
+                     ((point[0], point[1], encode(*point), alert_id) for point, alert_id in points if point))
+
+USERS_MIGRATIONS = [
+    (1, 'baseline schema', [
+        '''CREATE TABLE IF NOT EXISTS users
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT NOT NULL,
+            password TEXT NOT NULL)''',
+        '''CREATE TABLE IF NOT EXISTS emergency_contacts
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            relationship TEXT,
+            priority INTEGER DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users (id))''',
+        '''CREATE TABLE IF NOT EXISTS user_experiences
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            category TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            likes INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id))''',
+        '''CREATE TABLE IF NOT EXISTS conversation_history
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            user_input TEXT NOT NULL,
+            ai_response TEXT NOT NULL,
+            context_used BOOLEAN DEFAULT FALSE,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id))'''
+    ]),
+    (2, 'index contact and conversation lookups', [
+        # sos(), update_location(), emergency_contacts(): WHERE user_id = ? ORDER BY priority
+        '''CREATE INDEX IF NOT EXISTS idx_emergency_contacts_user_priority
+           ON emergency_contacts (user_id, priority)''',
+        # get_conversation_history(): WHERE user_id = ? ORDER BY timestamp DESC
+        '''CREATE INDEX IF NOT EXISTS idx_conversation_history_user_timestamp
+           ON conversation_history (user_id, timestamp)'''
+    ]),
+    (3, 'user cache versions', [
+        # user_cache: bumped whenever a user's contacts change, so every worker drops its copy
+        '''CREATE TABLE IF NOT EXISTS user_cache_versions
+           (user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL)'''
+    ])
+]
+
+ALERTS_MIGRATIONS = [
+    (1, 'baseline schema', [
+        '''CREATE TABLE IF NOT EXISTS alerts
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            location TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'active',
+            priority TEXT DEFAULT 'normal')'''
+    ]),
+    (2, 'index alert listing and active-alert updates', [
+        # admin(): ORDER BY timestamp DESC
+        'CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)',
+        # update_location(): WHERE user_id = ? AND status = 'active'
+        'CREATE INDEX IF NOT EXISTS idx_alerts_user_status ON alerts (user_id, status)'
+    ]),
+    (3, 'live location tracks', [
+        # /track/<token>: the link sent to emergency contacts
+        'ALTER TABLE alerts ADD COLUMN share_token TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_share_token ON alerts (share_token)',
+        '''CREATE TABLE IF NOT EXISTS alert_locations
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_id INTEGER NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            accuracy REAL,
+            recorded_at REAL NOT NULL,
+            FOREIGN KEY (alert_id) REFERENCES alerts (id))''',
+        # locations_since(): WHERE alert_id = ? AND id > ? ORDER BY id
+        'CREATE INDEX IF NOT EXISTS idx_alert_locations_alert ON alert_locations (alert_id, id)'
+    ]),
+    (4, 'location SMS throttling', [
+        # location_coalescer.check_fix(): the position in each alert's last location SMS
+        '''CREATE TABLE IF NOT EXISTS location_sms_state
+           (alert_id INTEGER PRIMARY KEY,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            sent_at REAL NOT NULL)''',
+        # location_coalescer.claim_recipients(): sends per number in the last hour
+        '''CREATE TABLE IF NOT EXISTS location_sms_sends
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_number TEXT NOT NULL,
+            sent_at REAL NOT NULL)''',
+        'CREATE INDEX IF NOT EXISTS idx_location_sms_sends_number ON location_sms_sends (to_number, sent_at)'
+    ]),
+    (5, 'index alert trajectories by time', [
+        # track_between(), latest_location(): WHERE alert_id = ? ORDER BY recorded_at
+        '''CREATE INDEX IF NOT EXISTS idx_alert_locations_alert_recorded
+           ON alert_locations (alert_id, recorded_at)'''
+    ]),
+    (6, 'admin console keyset indexes', [
+        'ALTER TABLE alerts ADD COLUMN created_at REAL',
+        _backfill_alert_created_at,
+        # list_alerts(): ORDER BY created_at DESC, id DESC, optionally filtered on one column
+        'CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_status_created ON alerts (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_priority_created ON alerts (priority, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_user_created ON alerts (user_id, created_at)'
+    ]),
+    (7, 'alert coordinates and geohash index', [
+        'ALTER TABLE alerts ADD COLUMN latitude REAL',
+        'ALTER TABLE alerts ADD COLUMN longitude REAL',
+        'ALTER TABLE alerts ADD COLUMN geohash TEXT',
+        _backfill_alert_coordinates,
+        # alert_queries radius, bounding-box and nearest searches: geohash range scans
+        'CREATE INDEX IF NOT EXISTS idx_alerts_geohash ON alerts (geohash)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_status_geohash ON alerts (status, geohash)'
+    ]),
+    (8, 'hotspot tiles', [
+        # hotspots.read_tiles(): tile ranges of one precision and granularity, then buckets
+        '''CREATE TABLE IF NOT EXISTS alert_tiles
+           (precision INTEGER NOT NULL,
+            granularity TEXT NOT NULL,
+            tile TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (precision, granularity, tile, bucket)) WITHOUT ROWID''',
+        # hotspots.aggregate_pending(): the last alert id binned into alert_tiles
+        '''CREATE TABLE IF NOT EXISTS hotspot_state
+           (name TEXT PRIMARY KEY,
+            last_alert_id INTEGER NOT NULL)'''
+    ]),
+    (9, 'SOS request deduplication', [
+        '''CREATE TABLE IF NOT EXISTS sos_requests
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            idempotency_key TEXT,
+            alert_id INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            state TEXT NOT NULL,
+            response TEXT,
+            created_at REAL NOT NULL,
+            FOREIGN KEY (alert_id) REFERENCES alerts (id))''',
+        # sos_requests.claim_sos(): a repeated key
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_sos_requests_user_key
+           ON sos_requests (user_id, idempotency_key)''',
+        # sos_requests.claim_sos(): the request that raised an alert
+        'CREATE INDEX IF NOT EXISTS idx_sos_requests_alert ON sos_requests (alert_id, id)',
+        # Expiring old keys
+        'CREATE INDEX IF NOT EXISTS idx_sos_requests_created ON sos_requests (created_at)'
+    ]),
+    (10, 'alert resolution time', [
+        # Tracking links stop working a grace period after this
+        'ALTER TABLE alerts ADD COLUMN resolved_at REAL'
+    ]),
+    (11, 'held-back location SMS', [
+        # location_coalescer.check_fix(): the newest fix not texted yet
+        'ALTER TABLE location_sms_state ADD COLUMN pending_latitude REAL',
+        'ALTER TABLE location_sms_state ADD COLUMN pending_longitude REAL',
+        'ALTER TABLE location_sms_state ADD COLUMN pending_at REAL',
+        'ALTER TABLE location_sms_state ADD COLUMN tracking_url TEXT',
+        # location_coalescer.due_updates(): alerts holding a position, oldest SMS first
+        '''CREATE INDEX IF NOT EXISTS idx_location_sms_state_pending
+           ON location_sms_state (sent_at) WHERE pending_at IS NOT NULL'''
+    ])
+]
+
+OUTBOX_MIGRATIONS = [
+    (1, 'outbox table', [
+        '''CREATE TABLE IF NOT EXISTS outbox
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT UNIQUE,
+            to_number TEXT NOT NULL,
+            body TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            lease_until REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL)''',
+        '''CREATE INDEX IF NOT EXISTS idx_outbox_delivery
+           ON outbox (status, priority, available_at, id)'''
+    ]),
+    # An SOS follow-up is 'held' until the alert it follows is sent
+    (2, 'follow-ups held for their alert', [
+        'ALTER TABLE outbox ADD COLUMN after_id INTEGER',
+        '''CREATE INDEX IF NOT EXISTS idx_outbox_after
+           ON outbox (after_id) WHERE after_id IS NOT NULL'''
+    ])
+]
+
+CHAT_CACHE_MIGRATIONS = [
+    (1, 'chat response cache', [
+        '''CREATE TABLE IF NOT EXISTS chat_cache
+           (key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used REAL NOT NULL)''',
+        'CREATE INDEX IF NOT EXISTS idx_chat_cache_last_used ON chat_cache (last_used)'
+    ])
+]
+
+RATE_LIMIT_MIGRATIONS = [
+    (1, 'rate limit buckets', [
+        # full_at: when the key's token bucket is full again; rows in the past can be deleted
+        '''CREATE TABLE IF NOT EXISTS rate_limits
+           (key TEXT PRIMARY KEY,
+            full_at REAL NOT NULL) WITHOUT ROWID'''
+    ])
+]
+
+MIGRATIONS = {
+    USERS_DB: USERS_MIGRATIONS,
+    ALERTS_DB: ALERTS_MIGRATIONS,
+    OUTBOX_DB: OUTBOX_MIGRATIONS,
+    CHAT_CACHE_DB: CHAT_CACHE_MIGRATIONS,
+    RATE_LIMIT_DB: RATE_LIMIT_MIGRATIONS
+}
+
+def migrate(path, migrations, target=None):
+    """
+    Apply pending migrations to one database.
+
+    Args:
+        path (str): Database file path
+        migrations (list): (version, description, steps) tuples in order
+        target (int): Stop after this version (defaults to the latest)
+
+    Returns:
+        int: The schema version after migrating
+    """
+    enable_wal(path)
+    conn = connect(path)
+    try:
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        for version, description, steps in migrations:
+            if target is not None and version > target:
+                break
+            if version <= current:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Re-read inside the write lock in case another worker got here first
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            print(f"✓ {path}: applied migration {version} ({description})")
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def migrate_all():
+    """Bring every database up to the latest schema version."""
+    for path, migrations in MIGRATIONS.items():
+        migrate(path, migrations)
@@ -0,0 +1,82 @@
+"""
+Native threads for work that would otherwise stall a gevent worker.
+
+Under gevent every request is a greenlet on one thread, so anything that
+holds that thread without doing socket I/O (password hashing, a long
+SQLite transaction, NumPy binning) freezes every other request in the
+worker, SOS included. ``run_blocking()`` runs such a call on a small pool of
+real OS threads and parks only the calling greenlet until it returns.
+hashlib, sqlite3 and NumPy release the GIL while they work, so the loop
+keeps serving meanwhile.
+
+Under gevent the pool is a gevent ``ThreadPool``, since a monkey-patched
+``ThreadPoolExecutor`` would only give more greenlets; otherwise (the
+Flask dev server, scripts) a regular ``ThreadPoolExecutor``.
+
+Short queries stay on the loop: a query that takes a fraction of a
+millisecond costs less than the hand-off to a thread.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+# Native threads per worker process for blocking calls
+max_threads = int(os.getenv('BLOCKING_THREADS', '4'))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'calls': 0, 'seconds': 0.0}
+
+def gevent_patched():
+    """Return True if this process runs under gevent's monkey-patching."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def _get_pool():
+    """Return this process's pool, creating it on first use."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked worker must not share its parent's threads
+        if _pool is None or _pool_pid != os.getpid():
+            if gevent_patched():
+                from gevent.threadpool import ThreadPool
+                _pool = ThreadPool(max_threads)
+            else:
+                _pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='blocking')
+            _pool_pid = os.getpid()
+        return _pool
+
+def run_blocking(func, *args):
+    """
+    Call ``func(*args)`` on a native thread and wait for the result.
+
+    Args:
+        func (callable): The blocking call; must not touch Flask's ``g`` or request
+        *args: Its arguments
+
+    Returns:
+        Whatever ``func`` returns; exceptions are re-raised in the caller
+    """
+    pool = _get_pool()
+    start = time.perf_counter()
+    try:
+        if isinstance(pool, ThreadPoolExecutor):
+            return pool.submit(func, *args).result()
+        # Blocks only the calling greenlet
+        return pool.spawn(func, *args).get()
+    finally:
+        with _stats_lock:
+            _stats['calls'] += 1
+            _stats['seconds'] += time.perf_counter() - start
+
+def offload_metrics():
+    """Return this worker process's id, whether it runs under gevent, and its blocking calls."""
+    with _stats_lock:
+        return dict(_stats, pid=os.getpid(), gevent=gevent_patched(), threads=max_threads)
@@ -0,0 +1,122 @@
+"""
+Password hashing off the request loop, with a configurable cost.
+
+Hashing and checking a password costs tens of milliseconds of pure CPU.
+Under the gevent worker that would freeze every other request, SOS
+included, so the work runs on the native threads of ``offload.py`` instead.
+``hashlib``'s scrypt and PBKDF2 release the GIL, so the loop keeps serving
+while a hash runs.
+
+New hashes use ``hash_method``, by default PBKDF2-SHA256 with 600,000
+iterations, which is what Werkzeug 2.3 itself generates. A stored hash made
+with another method or cost is replaced the next time its owner logs in
+(see ``needs_rehash``), so changing the method migrates every account that
+logs in afterwards. scrypt is stronger against GPU cracking but costs
+128 * N * r bytes per hash (32 MiB for 'scrypt:32768:8:1') on top of the
+CPU time; switch to it deliberately, with memory to spare for
+``PASSWORD_HASH_THREADS`` hashes at once.
+
+Run ``python passwords.py`` to time candidate methods on this machine.
+"""
+
+import os
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from offload import run_blocking
+
+# Werkzeug method string for new hashes: 'scrypt:N:r:p' or 'pbkdf2:sha256:iterations'
+hash_method = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+# Hashes running at once on offload.py's threads (0 hashes inline, blocking the worker)
+max_threads = int(os.getenv('PASSWORD_HASH_THREADS', '2'))
+
+# Keeps a burst of logins from taking every pool thread (and, with scrypt, its memory)
+_slots = threading.BoundedSemaphore(max(max_threads, 1))
+_stats_lock = threading.Lock()
+_stats = {'hashed': 0, 'verified': 0, 'rejected': 0, 'rehashed': 0, 'seconds': 0.0}
+
+def _run(func, *args):
+    start = time.perf_counter()
+    if max_threads <= 0:
+        result = func(*args)
+    else:
+        with _slots:
+            result = run_blocking(func, *args)
+    with _stats_lock:
+        _stats['seconds'] += time.perf_counter() - start
+    return result
+
+def hash_new_password(password):
+    """
+    Hash a password with the current policy.
+
+    Args:
+        password (str): Plain-text password
+
+    Returns:
+        str: Werkzeug hash string to store, e.g. 'pbkdf2:sha256:600000$salt$hash'
+    """
+    hashed = _run(generate_password_hash, password, hash_method)
+    with _stats_lock:
+        _stats['hashed'] += 1
+    return hashed
+
+def verify_password(stored_hash, password):
+    """
+    Check a password against its stored hash.
+
+    Args:
+        stored_hash (str): Hash from the users table
+        password (str): Plain-text password to check
+
+    Returns:
+        bool: True if the password matches
+    """
+    matched = _run(check_password_hash, stored_hash, password)
+    with _stats_lock:
+        _stats['verified' if matched else 'rejected'] += 1
+    return matched
+
+def needs_rehash(stored_hash):
+    """Return True if a stored hash was made with a method or cost other than ``hash_method``."""
+    return stored_hash.split('$', 1)[0] != hash_method
+
+def upgrade_hash(conn, user_id, stored_hash, password):
+    """
+    After a successful login, store the password again if its hash is outdated.
+
+    Args:
+        conn (sqlite3.Connection): users.db connection
+        user_id (int): The user who just logged in
+        stored_hash (str): Hash the password was verified against
+        password (str): The verified plain-text password
+
+    Returns:
+        bool: True if the stored hash was replaced
+    """
+    if not needs_rehash(stored_hash):
+        return False
+    # Only replace the hash that was checked, not a password changed in the meantime
+    replaced = conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                            (hash_new_password(password), user_id, stored_hash)).rowcount > 0
+    if replaced:
+        with _stats_lock:
+            _stats['rehashed'] += 1
+    return replaced
+
+def password_metrics():
+    """Return hash, verification and rehash counts, time spent, and the policy in use."""
+    with _stats_lock:
+        calls = _stats['hashed'] + _stats['verified'] + _stats['rejected']
+        return dict(_stats, avg_ms=round(_stats['seconds'] / calls * 1000, 1) if calls else 0.0,
+                    method=hash_method, threads=max_threads)
+
+if __name__ == "__main__":
+    print(f"⏱️ Hash cost on this machine (current policy: {hash_method})")
+    for method in dict.fromkeys([hash_method, 'scrypt:16384:8:1', 'scrypt:32768:8:1', 'scrypt:65536:8:1',
+                                 'pbkdf2:sha256:600000', 'pbkdf2:sha256:1000000']):
+        start = time.perf_counter()
+        generate_password_hash('calibration-password', method)
+        print(f"  {method:24s} {(time.perf_counter() - start) * 1000:7.1f} ms")
@@ -0,0 +1,213 @@
+"""
+Token-bucket rate limits for /login and /signup.
+
+Each rule allows ``count`` requests per ``period`` seconds for one key
+(a client IP or an email address), in bursts of up to ``count``. A bucket is
+stored as a single number: the time at which it will be full again. A
+request adds ``period / count`` seconds to it and is refused if that would
+push it more than ``period`` seconds past now. Any bucket whose time has
+passed is full and can be forgotten.
+
+Checks run before any database or password-hash work, so a burst of
+credential stuffing costs a dictionary lookup per request. The per-email
+bucket is only looked at up front and only charged for a wrong password,
+so a user's own logins never use it up. Its budget is larger than one
+address's, so it only comes into play when guesses at one account arrive
+from many addresses. The store is pluggable:
+
+- ``memory``: per-process dict of floats (default)
+- ``sqlite``: ``database/rate_limits.db``, shared by every gunicorn worker
+
+A store that fails lets the request through; a rate limiter must never lock
+users out on its own.
+"""
+
+import os
+import threading
+import time
+
+from db import RATE_LIMIT_DB, connection
+
+# Limits as 'count/seconds'; a count of 0 turns the rule off
+login_ip_limit = os.getenv('RATE_LIMIT_LOGIN_IP', '20/300')
+login_email_limit = os.getenv('RATE_LIMIT_LOGIN_EMAIL', '50/3600')
+signup_ip_limit = os.getenv('RATE_LIMIT_SIGNUP_IP', '10/3600')
+# 'memory' or 'sqlite'
+backend_name = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# Buckets kept per process by the memory store
+max_keys = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on Heroku)
+trusted_proxies = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+
+class Rule:
+    """``count`` requests per ``period`` seconds for each key."""
+
+    __slots__ = ('name', 'count', 'period', 'emission')
+
+    def __init__(self, name, spec):
+        count, period = spec.split('/')
+        self.name = name
+        self.count = int(count)
+        self.period = float(period)
+        # Seconds of budget one request uses up
+        self.emission = self.period / self.count if self.count else 0.0
+
+LOGIN_IP = Rule('login_ip', login_ip_limit)
+LOGIN_EMAIL = Rule('login_email', login_email_limit)
+SIGNUP_IP = Rule('signup_ip', signup_ip_limit)
+
+class MemoryBackend:
+    """In-process store: bucket key -> time the bucket is full again."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._full_at = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, now, emission, window):
+        with self._lock:
+            full_at = max(self._full_at.get(key, now), now) + emission
+            if full_at - now > window:
+                return full_at - now - window
+            self._full_at[key] = full_at
+            if len(self._full_at) > self.max_keys:
+                self._prune(now)
+            return 0.0
+
+    def peek(self, key, now, emission, window):
+        with self._lock:
+            return max(max(self._full_at.get(key, now), now) + emission - now - window, 0.0)
+
+    def _prune(self, now):
+        # Full buckets carry no information; if that is not enough, drop the oldest keys
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > now}
+        excess = len(self._full_at) - self.max_keys * 9 // 10
+        for key in list(self._full_at)[:max(excess, 0)]:
+            del self._full_at[key]
+
+    def __len__(self):
+        return len(self._full_at)
+
+class SQLiteBackend:
+    """Store shared by every worker process through a local SQLite file."""
+
+    # One statement: the conflict branch only updates, and only returns a row, if the request fits
+    TAKE = '''
+        INSERT INTO rate_limits (key, full_at) VALUES (:key, :now + :emission)
+        ON CONFLICT (key) DO UPDATE SET full_at = MAX(full_at, :now) + :emission
+        WHERE MAX(full_at, :now) + :emission - :now <= :window
+        RETURNING full_at
+    '''
+
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._takes = 0
+
+    def take(self, key, now, emission, window):
+        params = {'key': key, 'now': now, 'emission': emission, 'window': window}
+        with connection(self.path) as conn:
+            if conn.execute(self.TAKE, params).fetchone() is not None:
+                self._takes += 1
+                if self._takes % self.prune_every == 0:
+                    conn.execute('DELETE FROM rate_limits WHERE full_at <= ?', (now,))
+                return 0.0
+            full_at = conn.execute('SELECT full_at FROM rate_limits WHERE key = ?', (key,)).fetchone()[0]
+        return max(full_at, now) + emission - now - window
+
+    def peek(self, key, now, emission, window):
+        with connection(self.path) as conn:
+            row = conn.execute('SELECT full_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        return max(max(row[0] if row else now, now) + emission - now - window, 0.0)
+
+    def __len__(self):
+        with connection(self.path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+
+class RateLimiter:
+    """Applies rules against a backend and counts what it allowed and refused."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = {'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] = self._stats.get(name, 0) + 1
+
+    def check(self, *hits):
+        """
+        Take one request from each bucket, stopping at the first that is empty.
+
+        Args:
+            *hits: (Rule, key) pairs, e.g. (LOGIN_IP, '203.0.113.9')
+
+        Returns:
+            float: 0.0 if the request may proceed, otherwise seconds until it would be allowed
+        """
+        return self._apply(self.backend.take, hits, True)
+
+    def peek(self, *hits):
+        """
+        Like check(), but without using up any of the buckets' budget.
+
+        Args:
+            *hits: (Rule, key) pairs
+
+        Returns:
+            float: 0.0 if a request would be allowed, otherwise seconds until it would be
+        """
+        return self._apply(self.backend.peek, hits, False)
+
+    def _apply(self, operation, hits, charged):
+        now = time.time()
+        for rule, key in hits:
+            if not rule.count or not key:
+                continue
+            try:
+                retry_after = operation(f"{rule.name}:{key}", now, rule.emission, rule.period)
+            except Exception as e:
+                print(f"Rate limit store error: {e}")
+                self._count('errors')
+                continue
+            if retry_after > 0:
+                self._count(f"{rule.name}_limited")
+                return retry_after
+            if charged:
+                self._count(f"{rule.name}_allowed")
+        return 0.0
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = type(self.backend).__name__
+        stats['rules'] = {rule.name: f"{rule.count}/{rule.period:g}"
+                          for rule in (LOGIN_IP, LOGIN_EMAIL, SIGNUP_IP)}
+        if isinstance(self.backend, MemoryBackend):
+            stats['keys'] = len(self.backend)
+        return stats
+
+def create_limiter(name=None):
+    """Build the rate limiter for the configured backend."""
+    name = name or backend_name
+    if name == 'sqlite':
+        return RateLimiter(SQLiteBackend(RATE_LIMIT_DB))
+    return RateLimiter(MemoryBackend(max_keys))
+
+def client_ip(request):
+    """
+    Return the address to rate limit a request by.
+
+    Args:
+        request (flask.Request): The current request
+
+    Returns:
+        str: The client address, read from X-Forwarded-For only as far as trusted proxies wrote it
+    """
+    route = request.headers.get('X-Forwarded-For', '')
+    if trusted_proxies and route:
+        # Each trusted proxy appended the address it received from; anything further left is client-supplied
+        addresses = [address.strip() for address in route.split(',')]
+        return addresses[max(len(addresses) - trusted_proxies, 0)]
+    return request.remote_addr
@@ -0,0 +1,40 @@
+"""
+Concurrent SMS fan-out.
+
+Messages are sent from a bounded worker pool instead of one after another;
+the outbox worker hands each batch it claims to this pool. The pool is
+created lazily, so when the gevent worker has monkey-patched ``threading``
+and ``socket`` the workers are greenlets and the Twilio HTTP calls yield to
+the event loop instead of blocking it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+# Maximum number of SMS requests in flight at once
+max_workers = int(os.getenv('SMS_DISPATCH_WORKERS', '10'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the shared dispatch pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sms-dispatch')
+        return _executor
+
+def submit(func, *args):
+    """
+    Run a send function on the dispatch pool.
+
+    Args:
+        func (callable): The function to run, e.g. ``send_sms``
+        *args: Arguments passed to ``func``
+
+    Returns:
+        concurrent.futures.Future: Future resolving to the function's result
+    """
+    return get_executor().submit(func, *args)
@@ -0,0 +1,323 @@
+"""
+Durable outbound SMS queue.
+
+Routes write messages to an outbox table in ``database/outbox.db`` and return
+straight away; a background worker drains the table through the dispatcher
+pool. Rows are claimed with a lease, so messages held by a worker that dies
+mid-send are picked up again once the lease expires, and nothing is lost
+with the process.
+
+Each send is recorded as soon as it finishes, and new rows are claimed as
+soon as a send slot frees up, so a fresh SOS never waits for a slow batch
+of lower-priority messages to finish.
+
+A message can be queued to follow another (an SOS follow-up after its
+alert). It is 'held' until that message is sent, then waits its delay;
+if that message is dead-lettered, so is the follow-up. Messages Twilio
+rejects outright (an invalid number) are dead-lettered at once instead of
+being retried.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+from db import OUTBOX_DB, connect, connection
+from sms_dispatcher import submit, max_workers
+from twilio_alert import SMS_REJECTED, SMS_SENT, deliver_sms, format_emergency_alert, format_follow_up
+
+# Lower numbers are delivered first
+PRIORITY_SOS = 0
+PRIORITY_SOS_FOLLOW_UP = 1
+PRIORITY_LOCATION = 2
+PRIORITY_CONFIRMATION = 3
+
+# Attempts before a message is dead-lettered
+max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+# Retry delay is backoff_base ** attempts seconds, capped at backoff_max
+backoff_base = float(os.getenv('OUTBOX_BACKOFF_BASE', '2'))
+backoff_max = float(os.getenv('OUTBOX_BACKOFF_MAX', '300'))
+# How long a claimed message stays invisible to other workers (seconds)
+lease_seconds = float(os.getenv('OUTBOX_LEASE_SECONDS', '60'))
+# Idle poll interval; new messages wake the worker immediately
+poll_interval = float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))
+# Delay between an SOS alert and its follow-up instructions (seconds)
+follow_up_delay = float(os.getenv('SOS_FOLLOW_UP_DELAY', '2'))
+# How long the SOS route waits for first-priority contacts to be confirmed (seconds)
+confirm_timeout = float(os.getenv('SOS_CONFIRM_TIMEOUT', '8'))
+
+_wake = threading.Event()
+_delivered = threading.Condition()
+# (row, future) for each send that has finished but is not recorded yet
+_finished = queue.Queue()
+# Sends this process has claimed and not yet recorded; only the worker touches it
+_in_flight = 0
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def enqueue_sms(to_number, body, priority, idempotency_key=None, delay=0, after=None):
+    """
+    Durably queue an SMS for background delivery.
+
+    Args:
+        to_number (str): The recipient's phone number
+        body (str): The message to send
+        priority (int): One of the PRIORITY_* constants
+        idempotency_key (str): Messages sharing a key are only queued once
+        delay (float): Seconds to wait before the message may be sent
+        after (int): Outbox id of a message this one must follow; the delay
+            then counts from the moment that message is sent
+
+    Returns:
+        int: The outbox id of the (possibly already queued) message
+    """
+    now = time.time()
+    with connection(OUTBOX_DB) as conn:
+        # One statement, so the message it follows cannot be recorded between the check and the insert
+        cursor = conn.execute('''INSERT OR IGNORE INTO outbox
+                                 (idempotency_key, to_number, body, priority, status, available_at,
+                                  created_at, after_id)
+                                 VALUES (:key, :to, :body, :priority,
+                                         CASE WHEN :after IS NULL THEN 'queued'
+                                              ELSE COALESCE((SELECT CASE status WHEN 'sent' THEN 'queued'
+                                                                                WHEN 'dead' THEN 'dead' END
+                                                             FROM outbox WHERE id = :after), 'held') END,
+                                         :now + :delay, :now, :after)''',
+                              {'key': idempotency_key, 'to': to_number, 'body': body, 'priority': priority,
+                               'now': now, 'delay': delay, 'after': after})
+        if cursor.rowcount:
+            message_id = cursor.lastrowid
+        else:
+            message_id = conn.execute('SELECT id FROM outbox WHERE idempotency_key = ?',
+                                      (idempotency_key,)).fetchone()['id']
+
+    start_outbox_worker()
+    _wake.set()
+    return message_id
+
+def get_statuses(message_ids):
+    """Return a mapping of outbox id to delivery status."""
+    if not message_ids:
+        return {}
+    with connection(OUTBOX_DB) as conn:
+        rows = conn.execute(f'''SELECT id, status FROM outbox
+                                WHERE id IN ({",".join("?" * len(message_ids))})''',
+                            list(message_ids)).fetchall()
+    return {row['id']: row['status'] for row in rows}
+
+def wait_for_delivery(message_ids, timeout):
+    """
+    Wait until the given messages are sent or dead-lettered.
+
+    Args:
+        message_ids (list): Outbox ids to wait on
+        timeout (float): Maximum seconds to wait
+
+    Returns:
+        dict: Outbox id to status ('queued', 'sending', 'sent' or 'dead')
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = get_statuses(message_ids)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or all(status in ('sent', 'dead') for status in statuses.values()):
+            return statuses
+        # Delivery in this process notifies immediately; the timeout covers other workers
+        with _delivered:
+            _delivered.wait(min(remaining, 0.25))
+
+def get_outbox_stats():
+    """Count outbox messages by status."""
+    with connection(OUTBOX_DB) as conn:
+        rows = conn.execute('SELECT status, COUNT(*) AS count FROM outbox GROUP BY status').fetchall()
+    return {row['status']: row['count'] for row in rows}
+
+def _claim_batch(conn, limit):
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        rows = conn.execute('''SELECT id, to_number, body, attempts FROM outbox
+                               WHERE (status = 'queued' AND available_at <= ?)
+                                  OR (status = 'sending' AND lease_until <= ?)
+                               ORDER BY priority, id
+                               LIMIT ?''', (now, now, limit)).fetchall()
+        conn.executemany('''UPDATE outbox SET status = 'sending', lease_until = ?, attempts = attempts + 1
+                            WHERE id = ?''', [(now + lease_seconds, row['id']) for row in rows])
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return rows
+
+def _record_results(conn, finished):
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for row, future in finished:
+            outcome = future.result() if future.exception() is None else None
+            attempts = row['attempts'] + 1
+            # A row whose lease ran out may have been claimed again; only the current holder moves it on
+            if outcome == SMS_SENT:
+                conn.execute('''UPDATE outbox SET status = 'sent', sent_at = ?, lease_until = NULL
+                                WHERE status = 'sending' AND id = ?''', (now, row['id']))
+                # Follow-ups wait their own delay from now
+                conn.execute('''UPDATE outbox SET status = 'queued', available_at = ? + available_at - created_at
+                                WHERE status = 'held' AND after_id = ?''', (now, row['id']))
+            elif outcome == SMS_REJECTED or attempts >= max_attempts:
+                error = 'rejected by Twilio' if outcome == SMS_REJECTED else 'send failed'
+                conn.execute('''UPDATE outbox SET status = 'dead', lease_until = NULL, last_error = ?
+                                WHERE status = 'sending' AND id = ?''', (error, row['id']))
+                conn.execute('''UPDATE outbox SET status = 'dead', last_error = 'not sent: the message it follows failed'
+                                WHERE status = 'held' AND after_id = ?''', (row['id'],))
+                print(f"☠️ SMS {row['id']} to {row['to_number']} dead-lettered after {attempts} attempts ({error})")
+            else:
+                retry_in = min(backoff_max, backoff_base ** attempts) + random.uniform(0, 1)
+                conn.execute('''UPDATE outbox SET status = 'queued', available_at = ?, lease_until = NULL,
+                                last_error = ? WHERE status = 'sending' AND id = ?''',
+                             (now + retry_in, 'send failed', row['id']))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    with _delivered:
+        _delivered.notify_all()
+
+def _on_sent(row, future):
+    _finished.put((row, future))
+    _wake.set()
+
+def drain_once(conn=None):
+    """
+    Record the sends that have finished, then fill the free send slots with due messages.
+
+    A send that has not finished stays 'sending'; if it never does, its
+    lease runs out and the message is claimed again.
+
+    Returns:
+        int: Number of messages recorded or claimed
+    """
+    global _in_flight
+    if conn is None:
+        with connection(OUTBOX_DB) as conn:
+            return drain_once(conn)
+
+    finished = []
+    while True:
+        try:
+            finished.append(_finished.get_nowait())
+        except queue.Empty:
+            break
+    if finished:
+        try:
+            _record_results(conn, finished)
+        except Exception:
+            # Keep the results for the next pass rather than sending the messages again
+            for item in finished:
+                _finished.put(item)
+            raise
+        _in_flight -= len(finished)
+
+    free = max_workers - _in_flight
+    rows = _claim_batch(conn, free) if free > 0 else []
+    for row in rows:
+        _in_flight += 1
+        submit(deliver_sms, row['to_number'], row['body']).add_done_callback(
+            lambda future, row=row: _on_sent(row, future))
+    return len(finished) + len(rows)
+
+def _run_worker():
+    conn = connect(OUTBOX_DB)
+    while True:
+        # Cleared before draining, so a send finishing meanwhile still wakes the next wait
+        _wake.clear()
+        try:
+            if drain_once(conn):
+                continue
+        except Exception as e:
+            print(f"❌ Outbox worker error: {str(e)}")
+        _wake.wait(poll_interval)
+
+def start_outbox_worker():
+    """Start the background delivery worker for this process if it is not running."""
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        # A forked worker process inherits the variables but not the thread
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = threading.Thread(target=_run_worker, name='sms-outbox', daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
+
+def queue_emergency_alerts(contacts, user_id, user_name, location, timestamp, timeout=None,
+                           tracking_url=None):
+    """
+    Queue SOS alerts and follow-ups for every contact.
+
+    Each follow-up is held until its alert is sent, then waits
+    ``follow_up_delay`` seconds, so a contact never gets the instructions
+    without the alert or ahead of it.
+
+    Waits up to ``timeout`` seconds for the first-priority contacts' alerts
+    (lowest ``priority`` value) to be delivered; everything else keeps
+    going in the background. Re-submitting the same SOS (same user and
+    timestamp) does not queue the messages twice.
+
+    Args:
+        contacts (list): Emergency contact rows (id, name, phone, relationship, priority)
+        user_id (int): Id of the user who triggered the SOS
+        user_name (str): Name of the person in emergency
+        location (dict): Location coordinates
+        timestamp (str): Time of emergency
+        timeout (float): Seconds to wait for first-priority contacts
+        tracking_url (str): Live tracking link to include in the alert
+
+    Returns:
+        dict: Per-contact results plus sent/failed/pending counts
+    """
+    if timeout is None:
+        timeout = confirm_timeout
+
+    alert_message = format_emergency_alert(user_name, location, timestamp, tracking_url)
+    follow_up_message = format_follow_up(user_name, location)
+
+    alert_ids = []
+    for contact in contacts:
+        key = f"sos:{user_id}:{timestamp}:{contact['id']}"
+        alert_id = enqueue_sms(contact['phone'], alert_message, PRIORITY_SOS, key + ':alert')
+        alert_ids.append(alert_id)
+        enqueue_sms(contact['phone'], follow_up_message, PRIORITY_SOS_FOLLOW_UP, key + ':follow-up',
+                    delay=follow_up_delay, after=alert_id)
+
+    priorities = [_contact_priority(contact) for contact in contacts]
+    top_priority = min(priorities)
+    wait_for_delivery([message_id for message_id, priority in zip(alert_ids, priorities)
+                       if priority == top_priority], timeout)
+
+    statuses = get_statuses(alert_ids)
+    results = []
+    for contact, message_id, priority in zip(contacts, alert_ids, priorities):
+        status = {'sent': 'sent', 'dead': 'failed'}.get(statuses.get(message_id), 'pending')
+        results.append({
+            'name': contact['name'],
+            'relationship': contact['relationship'],
+            'priority': priority,
+            'status': status
+        })
+    counts = [result['status'] for result in results]
+    return {
+        'results': results,
+        'sent': counts.count('sent'),
+        'failed': counts.count('failed'),
+        'pending': counts.count('pending')
+    }
+
+def _contact_priority(contact):
+    try:
+        return int(contact['priority'] or 1)
+    except (TypeError, ValueError):
+        return 1
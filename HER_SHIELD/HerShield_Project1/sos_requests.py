@@ -0,0 +1,190 @@
+"""
+Deduplication of repeated SOS triggers.
+
+A panicking user may press SOS several times, and a flaky network makes the
+dashboard retry. Each press used to insert another alert and text every
+contact again. Now a repeat attaches to the alert already raised:
+
+- a request carrying the same idempotency key (``Idempotency-Key`` header
+  or ``idempotency_key`` field) as an earlier one, however long ago,
+- or any SOS from a user whose active alert was raised in the last
+  ``dedupe_window`` seconds.
+
+A repeat gets the first request's response back, waiting for it if the
+first request is still dispatching. If the first request failed part way,
+or its worker died, the repeat takes over and dispatches again with the same outbox keys, so
+messages already queued are not sent twice.
+
+Requests are recorded in the ``sos_requests`` table of alerts.db, claimed
+under a write lock so that workers racing on the same SOS agree on one
+alert. Responses for recent keys are also kept in memory.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+# A second SOS within this many seconds of the user's active alert attaches to it
+dedupe_window = float(os.getenv('SOS_DEDUPE_WINDOW', '300'))
+# How long idempotency keys are remembered (seconds)
+key_ttl = float(os.getenv('SOS_IDEMPOTENCY_TTL', '86400'))
+# Responses kept in memory for repeated keys
+memory_size = int(os.getenv('SOS_IDEMPOTENCY_CACHE', '1024'))
+# A first request still dispatching after this long is presumed dead (seconds)
+stale_after = float(os.getenv('SOS_STALE_AFTER', '60'))
+# How often a waiting repeat re-reads the database for another worker's response (seconds)
+poll_interval = 0.25
+
+_responses = OrderedDict()
+_completed = threading.Condition()
+_stats_lock = threading.Lock()
+_stats = {'new': 0, 'repeat_key': 0, 'repeat_window': 0, 'taken_over': 0}
+
+def _remember(user_id, key, response):
+    if key is None:
+        return
+    with _completed:
+        _responses[(user_id, key)] = response
+        _responses.move_to_end((user_id, key))
+        while len(_responses) > memory_size:
+            _responses.popitem(last=False)
+
+def _origin(conn, alert_id):
+    """The request that raised ``alert_id``, with the alert's share token."""
+    return conn.execute('''
+        SELECT r.id, r.alert_id, r.timestamp, r.state, r.response, r.created_at, a.share_token
+        FROM sos_requests r JOIN alerts a ON a.id = r.alert_id
+        WHERE r.alert_id = ? AND r.state != 'repeat'
+        ORDER BY r.id LIMIT 1
+    ''', (alert_id,)).fetchone()
+
+def _claim(origin, kind):
+    return {
+        'kind': kind,
+        'request_id': origin['id'],
+        'alert_id': origin['alert_id'],
+        'share_token': origin['share_token'],
+        'timestamp': origin['timestamp'],
+        'response': json.loads(origin['response']) if origin['response'] else None
+    }
+
+def claim_sos(conn, user_id, key, timestamp, create_alert, now=None):
+    """
+    Decide whether an SOS is new or repeats one already raised.
+
+    Args:
+        conn (sqlite3.Connection): alerts.db connection
+        user_id (int): Id of the user pressing SOS
+        key (str): Client idempotency key, or None
+        timestamp (str): The client's timestamp for this SOS
+        create_alert (callable): Inserts the alert on ``conn`` and returns (alert_id, share_token)
+        now (float): Current Unix time (defaults to time.time())
+
+    Returns:
+        dict: ``kind`` is 'new' (dispatch it), 'repeat' (``response`` is the
+        first request's, or None while it is still dispatching) or
+        'taken_over' (the first request failed or died; dispatch again). Also has
+        request_id, alert_id, share_token and the original timestamp.
+    """
+    if key is not None:
+        with _completed:
+            response = _responses.get((user_id, key))
+        if response is not None:
+            _count('repeat_key')
+            return {'kind': 'repeat', 'response': response}
+
+    now = time.time() if now is None else now
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        kind, origin = 'repeat_key', None
+        if key is not None:
+            row = conn.execute('SELECT alert_id FROM sos_requests WHERE user_id = ? AND idempotency_key = ?',
+                               (user_id, key)).fetchone()
+            origin = row and _origin(conn, row['alert_id'])
+        if origin is None:
+            kind = 'repeat_window'
+            row = conn.execute('''
+                SELECT id FROM alerts
+                WHERE user_id = ? AND status = 'active' AND created_at >= ?
+                ORDER BY created_at DESC LIMIT 1
+            ''', (user_id, now - dedupe_window)).fetchone()
+            origin = row and _origin(conn, row['id'])
+            if origin is not None and key is not None:
+                # Later retries of this key find the alert even after the window
+                conn.execute('''
+                    INSERT INTO sos_requests (user_id, idempotency_key, alert_id, timestamp, state, created_at)
+                    VALUES (?, ?, ?, ?, 'repeat', ?)
+                ''', (user_id, key, origin['alert_id'], timestamp, now))
+
+        if origin is None:
+            kind = 'new'
+            alert_id, share_token = create_alert(conn)
+            request_id = conn.execute('''
+                INSERT INTO sos_requests (user_id, idempotency_key, alert_id, timestamp, state, created_at)
+                VALUES (?, ?, ?, ?, 'pending', ?)
+            ''', (user_id, key, alert_id, timestamp, now)).lastrowid
+            conn.execute('DELETE FROM sos_requests WHERE created_at < ?', (now - key_ttl,))
+            claim = {'kind': 'new', 'request_id': request_id, 'alert_id': alert_id, 'share_token': share_token,
+                     'timestamp': timestamp, 'response': None}
+        elif origin['state'] == 'failed' or (origin['state'] == 'pending' and
+                                             origin['created_at'] < now - stale_after):
+            kind = 'taken_over'
+            conn.execute("UPDATE sos_requests SET state = 'pending' WHERE id = ?", (origin['id'],))
+            claim = _claim(origin, 'taken_over')
+        else:
+            claim = _claim(origin, 'repeat')
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    _count(kind)
+    if claim['response'] is not None:
+        _remember(user_id, key, claim['response'])
+    return claim
+
+def complete_sos(conn, request_id, user_id, key, response):
+    """Store the response of a dispatched SOS and wake any repeats waiting for it."""
+    conn.execute("UPDATE sos_requests SET state = 'done', response = ? WHERE id = ?",
+                 (json.dumps(response), request_id))
+    _remember(user_id, key, response)
+    with _completed:
+        _completed.notify_all()
+
+def fail_sos(conn, request_id):
+    """Mark a SOS whose dispatch failed so that the next repeat dispatches it again."""
+    conn.execute("UPDATE sos_requests SET state = 'failed' WHERE id = ?", (request_id,))
+    with _completed:
+        _completed.notify_all()
+
+def wait_for_response(conn, request_id, timeout):
+    """
+    Wait for the first request of a repeated SOS to finish dispatching.
+
+    Returns:
+        dict: Its response, or None if it failed or is still running after ``timeout``
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        row = conn.execute('SELECT state, response FROM sos_requests WHERE id = ?', (request_id,)).fetchone()
+        if row is None or row['state'] == 'failed':
+            return None
+        if row['state'] == 'done':
+            return json.loads(row['response'])
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        # Woken at once by this worker; another worker's response is seen on the next poll
+        with _completed:
+            _completed.wait(min(remaining, poll_interval))
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def sos_metrics():
+    """Return how many SOS requests were new and how many were repeats."""
+    with _stats_lock:
+        return dict(_stats, dedupe_window=dedupe_window)
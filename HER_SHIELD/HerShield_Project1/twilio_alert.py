@@ -1,5 +1,12 @@
 from twilio.rest import Client
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from collections import deque
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,6 +17,154 @@ account_sid = os.getenv('TWILIO_ACCOUNT_SID', 'AC4b1dc92f50e014226bf9530c7fca4c6
 auth_token = os.getenv('TWILIO_AUTH_TOKEN', 'c5761d8c607821b86870e9878f25bfaa')
 from_number = os.getenv('TWILIO_PHONE_NUMBER', '+19062562899')
 
+# Per-message HTTP timeout (seconds) so one slow request cannot stall an SOS fan-out
+sms_timeout = float(os.getenv('TWILIO_SMS_TIMEOUT', '10'))
+# Optional override of the Twilio REST endpoint (used to point at a local stub server)
+api_base_url = os.getenv('TWILIO_API_BASE_URL')
+# Keep-alive connections held open to Twilio; should cover SMS_DISPATCH_WORKERS
+pool_size = int(os.getenv('TWILIO_POOL_SIZE', os.getenv('SMS_DISPATCH_WORKERS', '10')))
+
+# Shared client, rebuilt by reset_twilio_client() when its connections die
+_client = None
+_client_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    'sends': 0,
+    'failures': 0,
+    'reconnects': 0,
+    'retired_connections': 0,
+    'retired_requests': 0
+}
+_latencies = deque(maxlen=1000)
+
+def _create_client():
+    http_client = TwilioHttpClient(pool_connections=True, timeout=sms_timeout)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    http_client.session.mount('https://', adapter)
+    http_client.session.mount('http://', adapter)
+
+    client = Client(account_sid, auth_token, http_client=http_client)
+    if api_base_url:
+        client.api.base_url = api_base_url
+    return client
+
+def _pool_stats(client):
+    """Count connections opened and requests made by a client's connection pools."""
+    opened = requests = 0
+    for adapter in set(client.http_client.session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests += pool.num_requests
+    return opened, requests
+
+def get_twilio_client():
+    """
+    Return the shared Twilio client, creating it on first use.
+    
+    The client keeps a pooled keep-alive HTTP session, so repeated sends reuse
+    connections (and TLS sessions) instead of reconnecting for every SMS. It is
+    safe to share between threads and gevent greenlets.
+    
+    Returns:
+        Client: The shared Twilio REST client
+    """
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+            client = _client
+    return client
+
+def reset_twilio_client(client=None):
+    """
+    Drop the shared client so the next send opens fresh connections.
+    
+    Args:
+        client (Client): Only reset if this is still the shared client, so
+            concurrent failures on the same dead client reset it once
+    """
+    global _client
+    with _client_lock:
+        if _client is None or (client is not None and _client is not client):
+            return
+        retired, _client = _client, None
+
+    opened, requests = _pool_stats(retired)
+    retired.http_client.session.close()
+    with _metrics_lock:
+        _metrics['reconnects'] += 1
+        _metrics['retired_connections'] += opened
+        _metrics['retired_requests'] += requests
+
+def _record_send(latency, success):
+    with _metrics_lock:
+        _metrics['sends'] += 1
+        if not success:
+            _metrics['failures'] += 1
+        _latencies.append(latency)
+
+def get_sms_metrics():
+    """
+    Report SMS delivery and connection pool metrics.
+    
+    Returns:
+        dict: Send counts, latency percentiles (ms) and connection reuse figures
+    """
+    client = _client
+    opened, requests = _pool_stats(client) if client is not None else (0, 0)
+    with _metrics_lock:
+        metrics = dict(_metrics)
+        latencies = sorted(_latencies)
+
+    connections = metrics.pop('retired_connections') + opened
+    http_requests = metrics.pop('retired_requests') + requests
+    metrics['connections_opened'] = connections
+    metrics['http_requests'] = http_requests
+    metrics['connection_reuse_ratio'] = round(1 - connections / http_requests, 3) if http_requests else 0.0
+    if latencies:
+        metrics['latency_ms'] = {
+            'avg': round(sum(latencies) / len(latencies) * 1000, 1),
+            'p50': round(latencies[len(latencies) // 2] * 1000, 1),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1)
+        }
+    return metrics
+
+def _create_message(to_number, message, retry=True):
+    client = get_twilio_client()
+    try:
+        return client.messages.create(
+            body=message,
+            from_=from_number,
+            to=to_number,
+            # Add priority for emergency messages
+            status_callback=os.getenv('TWILIO_STATUS_CALLBACK_URL', None)
+        )
+    except RequestsConnectionError:
+        if not retry:
+            raise
+        # The pooled connection died (idle timeout, network change); reconnect and retry once
+        print(f"🔌 Twilio connection lost, reconnecting for {to_number}")
+        reset_twilio_client(client)
+        return _create_message(to_number, message, retry=False)
+
+# Outcomes of deliver_sms()
+SMS_SENT = 'sent'
+SMS_RETRY = 'retry'
+SMS_REJECTED = 'rejected'
+
+def _is_rejection(error):
+    # Twilio refused this message (invalid or unsubscribed number, ...); sending it again cannot help.
+    # Bad credentials (401/403), timeouts and throttling (408/429) can clear, so those are retried.
+    return (isinstance(error, TwilioRestException) and 400 <= error.status < 500
+            and error.status not in (401, 403, 408, 429))
+
 def send_sms(to_number, message):
     """
     Send an SMS message using Twilio.
@@ -21,60 +176,65 @@ def send_sms(to_number, message):
     Returns:
         bool: True if the message was sent successfully, False otherwise
     """
+    return deliver_sms(to_number, message) == SMS_SENT
+
+def deliver_sms(to_number, message):
+    """
+    Send an SMS message using Twilio, telling failures worth retrying from rejections.
+    
+    Args:
+        to_number (str): The recipient's phone number
+        message (str): The message to send
+    
+    Returns:
+        str: SMS_SENT, SMS_RETRY (network or server trouble) or SMS_REJECTED (Twilio refused the message)
+    """
+    start = time.perf_counter()
     try:
         # Format phone number (add country code if not present)
         if not to_number.startswith('+'):
             to_number = '+91' + to_number.lstrip('0')  # Add India country code by default
         
-        # Initialize Twilio client
-        client = Client(account_sid, auth_token)
-        
-        # Send message with high priority
-        message_obj = client.messages.create(
-            body=message,
-            from_=from_number,
-            to=to_number,
-            # Add priority for emergency messages
-            status_callback=os.getenv('TWILIO_STATUS_CALLBACK_URL', None)
-        )
+        # Send message with high priority over the shared, pooled client
+        message_obj = _create_message(to_number, message)
+        _record_send(time.perf_counter() - start, True)
         
         print(f"✅ Emergency SMS sent successfully to {to_number}")
         print(f"📱 Message SID: {message_obj.sid}")
         print(f"📊 Message Status: {message_obj.status}")
-        return True
+        return SMS_SENT
         
     except Exception as e:
+        _record_send(time.perf_counter() - start, False)
         print(f"❌ Error sending SMS to {to_number}: {str(e)}")
         # Print more detailed error information
         if hasattr(e, 'msg'):
             print(f"🔍 Error message: {e.msg}")
         if hasattr(e, 'code'):
             print(f"🔢 Error code: {e.code}")
-        return False
+        return SMS_REJECTED if _is_rejection(e) else SMS_RETRY
 
-def send_emergency_alert(to_number, user_name, location, timestamp, relationship):
+def format_emergency_alert(user_name, location, timestamp, tracking_url=None):
     """
-    Send a formatted emergency alert SMS.
+    Build the urgent emergency alert message body.
     
     Args:
-        to_number (str): The recipient's phone number
         user_name (str): Name of the person in emergency
         location (dict): Location coordinates
         timestamp (str): Time of emergency
-        relationship (str): Relationship with the person
+        tracking_url (str): Link to the live tracking page, if there is one
     
     Returns:
-        bool: True if the message was sent successfully, False otherwise
+        str: The formatted alert message
     """
-    try:
-        # Create urgent emergency message
-        emergency_message = f"""🚨 EMERGENCY ALERT! 🚨
+    live = f"\n🛰️ Follow live: {tracking_url}" if tracking_url else ""
+    return f"""🚨 EMERGENCY ALERT! 🚨
 
 URGENT: {user_name} is in danger and has triggered an SOS alert!
 
 Your relationship with {user_name} requires immediate attention!
 
-📍 Current Location: https://maps.google.com/?q={location['latitude']},{location['longitude']}
+📍 Current Location: https://maps.google.com/?q={location['latitude']},{location['longitude']}{live}
 ⏰ Time: {timestamp}
 
 ⚠️ PLEASE RESPOND IMMEDIATELY! ⚠️
@@ -86,12 +246,18 @@ Your relationship with {user_name} requires immediate attention!
 This is an automated emergency alert from HerShield.
 Stay safe! 🛡️"""
 
-        # Send the emergency message
-        success = send_sms(to_number, emergency_message)
-        
-        if success:
-            # Send follow-up instructions after a short delay
-            follow_up_message = f"""📋 Follow-up Instructions for {user_name}'s Emergency:
+def format_follow_up(user_name, location):
+    """
+    Build the follow-up instructions sent after an emergency alert.
+    
+    Args:
+        user_name (str): Name of the person in emergency
+        location (dict): Location coordinates
+    
+    Returns:
+        str: The formatted follow-up message
+    """
+    return f"""📋 Follow-up Instructions for {user_name}'s Emergency:
 
 1️⃣ IMMEDIATE ACTIONS:
    • Call {user_name} multiple times
@@ -114,8 +280,49 @@ Stay safe! 🛡️"""
 
 🆘 This is a real emergency - please act quickly!"""
 
+def format_location_update(user_name, location, distance_m, tracking_url=None):
+    """
+    Build the location update sent when the user has moved or gone quiet.
+    
+    Args:
+        user_name (str): Name of the person in emergency
+        location (dict): Latest location coordinates
+        distance_m (float): Distance moved since the last update, in metres
+        tracking_url (str): Link to the live tracking page, if there is one
+    
+    Returns:
+        str: The formatted update message
+    """
+    moved = f"Moved {distance_m / 1000:.1f} km since the last update" if distance_m >= 100 else "Has not moved far since the last update"
+    message = f"📍 Location Update for {user_name}:\n"
+    message += f"Current Location: https://maps.google.com/?q={location['latitude']},{location['longitude']}\n"
+    message += f"{moved}\n"
+    if tracking_url:
+        message += f"🛰️ Follow live: {tracking_url}\n"
+    message += "This is an automated location update from HerShield."
+    return message
+
+def send_emergency_alert(to_number, user_name, location, timestamp, relationship):
+    """
+    Send a formatted emergency alert SMS.
+    
+    Args:
+        to_number (str): The recipient's phone number
+        user_name (str): Name of the person in emergency
+        location (dict): Location coordinates
+        timestamp (str): Time of emergency
+        relationship (str): Relationship with the person
+    
+    Returns:
+        bool: True if the message was sent successfully, False otherwise
+    """
+    try:
+        # Send the emergency message
+        success = send_sms(to_number, format_emergency_alert(user_name, location, timestamp))
+        
+        if success:
             # Send follow-up message
-            send_sms(to_number, follow_up_message)
+            send_sms(to_number, format_follow_up(user_name, location))
         
         return success
         
@@ -123,20 +330,18 @@ Stay safe! 🛡️"""
         print(f"❌ Error sending emergency alert to {to_number}: {str(e)}")
         return False
 
-def send_alert_confirmation(to_number, user_name, contacts_notified):
+def format_alert_confirmation(user_name, contacts_notified):
     """
-    Send confirmation message to the user who triggered the alert.
+    Build the confirmation message sent to the user who triggered the alert.
     
     Args:
-        to_number (str): The user's phone number
         user_name (str): Name of the user
         contacts_notified (int): Number of contacts notified
     
     Returns:
-        bool: True if the message was sent successfully, False otherwise
+        str: The formatted confirmation message
     """
-    try:
-        confirmation_message = f"""✅ SOS Alert Confirmation
+    return f"""✅ SOS Alert Confirmation
 
 Dear {user_name},
 
@@ -154,7 +359,20 @@ Your emergency SOS alert has been successfully sent to {contacts_notified} emerg
 
 This message is from HerShield - your safety companion."""
 
-        return send_sms(to_number, confirmation_message)
+def send_alert_confirmation(to_number, user_name, contacts_notified):
+    """
+    Send confirmation message to the user who triggered the alert.
+    
+    Args:
+        to_number (str): The user's phone number
+        user_name (str): Name of the user
+        contacts_notified (int): Number of contacts notified
+    
+    Returns:
+        bool: True if the message was sent successfully, False otherwise
+    """
+    try:
+        return send_sms(to_number, format_alert_confirmation(user_name, contacts_notified))
         
     except Exception as e:
         print(f"❌ Error sending confirmation to {to_number}: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+Per-process cache of each user's profile and emergency contacts.
+
+The SOS, location update, contacts and chatbot routes all need the same
+few rows for the same user. They are read once and kept in a small LRU of
+``__slots__`` records. A record also answers ``record['field']``, so code
+written against ``sqlite3.Row`` keeps working.
+
+Routes that change a user's contacts call ``invalidate()``. It drops this
+worker's entry and bumps the user's row in ``user_cache_versions``. Other
+workers compare that counter with the version their entry was loaded at.
+They re-check at most every ``max_staleness`` seconds, so a warm entry is
+served without touching SQLite at all.
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+# Users kept per process
+max_users = int(os.getenv('USER_CACHE_SIZE', '10000'))
+# How long an entry is trusted before its version is re-checked (seconds, 0 to check every time)
+max_staleness = float(os.getenv('USER_CACHE_MAX_STALENESS', '5'))
+
+class Record:
+    """Base for the cached rows: attribute access plus ``sqlite3.Row``-style indexing."""
+
+    __slots__ = ()
+
+    def __init__(self, row):
+        for field in self.__slots__:
+            setattr(self, field, row[field])
+
+    def __getitem__(self, field):
+        return getattr(self, field)
+
+    def keys(self):
+        return list(self.__slots__)
+
+class Profile(Record):
+    __slots__ = ('id', 'name', 'email', 'phone')
+
+class Contact(Record):
+    __slots__ = ('id', 'name', 'phone', 'relationship', 'priority')
+
+class _Entry:
+    __slots__ = ('version', 'checked_at', 'profile', 'contacts')
+
+    def __init__(self, version, checked_at, profile, contacts):
+        self.version = version
+        self.checked_at = checked_at
+        self.profile = profile
+        self.contacts = contacts
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'invalidations': 0}
+
+def _version(conn, user_id):
+    row = conn.execute('SELECT version FROM user_cache_versions WHERE user_id = ?', (user_id,)).fetchone()
+    return row['version'] if row else 0
+
+def _load(conn, user_id, now):
+    # Read the version first: a write that lands in between leaves the entry stale, never wrong for good
+    version = _version(conn, user_id)
+    row = conn.execute('SELECT id, name, email, phone FROM users WHERE id = ?', (user_id,)).fetchone()
+    contacts = conn.execute('''
+        SELECT id, name, phone, relationship, priority FROM emergency_contacts
+        WHERE user_id = ?
+        ORDER BY priority
+    ''', (user_id,)).fetchall()
+    return _Entry(version, now, Profile(row) if row else None, tuple(Contact(contact) for contact in contacts))
+
+def _entry(conn, user_id):
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is not None:
+            _entries.move_to_end(user_id)
+            if now - entry.checked_at < max_staleness:
+                _stats['hits'] += 1
+                return entry
+
+    if entry is not None and _version(conn, user_id) == entry.version:
+        entry.checked_at = now
+        with _lock:
+            _stats['revalidated'] += 1
+        return entry
+
+    entry = _load(conn, user_id, now)
+    with _lock:
+        _stats['misses'] += 1
+        _entries[user_id] = entry
+        _entries.move_to_end(user_id)
+        while len(_entries) > max_users:
+            _entries.popitem(last=False)
+    return entry
+
+def get_user(conn, user_id):
+    """
+    Return a user's profile and contacts.
+
+    Args:
+        conn (sqlite3.Connection): users.db connection
+        user_id (int): User id
+
+    Returns:
+        tuple: (Profile or None if there is no such user, tuple of Contact ordered by priority)
+    """
+    entry = _entry(conn, user_id)
+    return entry.profile, entry.contacts
+
+def get_profile(conn, user_id):
+    """Return a user's Profile, or None if there is no such user."""
+    return _entry(conn, user_id).profile
+
+def get_contacts(conn, user_id):
+    """Return a user's emergency contacts as Contact records, lowest priority value first."""
+    return _entry(conn, user_id).contacts
+
+def invalidate(conn, user_id):
+    """Forget a user's cached rows here and in every other worker; call after changing them."""
+    with _lock:
+        _entries.pop(user_id, None)
+        _stats['invalidations'] += 1
+    conn.execute('''
+        INSERT INTO user_cache_versions (user_id, version) VALUES (?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+    ''', (user_id,))
+
+def user_cache_metrics():
+    """Return hit, revalidation, miss and invalidation counts and the cache size."""
+    with _lock:
+        return dict(_stats, size=len(_entries), max_users=max_users, max_staleness=max_staleness)
@@ -1,3 +1,8 @@
+from gevent_patch import patch_all
+
+# Patch before the app imports anything that does I/O
+patch_all()
+
 from app import app
 
 if __name__ == "__main__":